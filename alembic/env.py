@@ -10,7 +10,7 @@ from alembic import context
 # IMPORT OUR APPLICATION CONFIG & MODELS
 from sentinelstack.config import settings
 from sentinelstack.database import Base
-from sentinelstack.auth.models import User  # Must import models so Alembic 'sees' them
+from sentinelstack.auth.models import User, ApiKey  # Must import models so Alembic 'sees' them
 from sentinelstack.logging.models import RequestLog
 from sentinelstack.aggregation.models import RequestMetric
 from sentinelstack.incidents.models import Incident
@@ -0,0 +1,28 @@
+"""Add user rate limit tier
+
+Revision ID: a3d8e6f1c2b7
+Revises: f2c9a7e4b1d3
+Create Date: 2026-10-19 15:12:40.317905
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d8e6f1c2b7'
+down_revision: Union[str, Sequence[str], None] = 'f2c9a7e4b1d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('tier', sa.String(), server_default='free', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'tier')
@@ -0,0 +1,34 @@
+"""Add covering index for per-endpoint stats
+
+Revision ID: d4a1f2b7c9e0
+Revises: c7315705cbf6
+Create Date: 2026-10-19 10:12:03.415220
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a1f2b7c9e0'
+down_revision: Union[str, Sequence[str], None] = 'c7315705cbf6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'idx_metrics_bucket_endpoint_covering',
+        'request_metrics',
+        ['bucket_time', 'method', 'path'],
+        unique=False,
+        postgresql_include=['total_requests', 'total_errors', 'avg_latency_ms', 'p95_latency_ms']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_metrics_bucket_endpoint_covering', table_name='request_metrics')
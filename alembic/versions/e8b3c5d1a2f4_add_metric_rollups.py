@@ -0,0 +1,38 @@
+"""Add metric rollup tiers
+
+Revision ID: e8b3c5d1a2f4
+Revises: d4a1f2b7c9e0
+Create Date: 2026-10-19 11:40:27.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3c5d1a2f4'
+down_revision: Union[str, Sequence[str], None] = 'd4a1f2b7c9e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('metric_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('resolution', sa.String(length=3), nullable=False),
+    sa.Column('bucket_time', sa.DateTime(), nullable=False),
+    sa.Column('total_requests', sa.BigInteger(), nullable=True),
+    sa.Column('total_errors', sa.BigInteger(), nullable=True),
+    sa.Column('avg_latency_ms', sa.Float(), nullable=True),
+    sa.Column('p95_latency_ms', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('resolution', 'bucket_time', name='uq_rollups_resolution_bucket')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('metric_rollups')
@@ -0,0 +1,37 @@
+"""Add per-endpoint incidents
+
+Revision ID: f2c9a7e4b1d3
+Revises: e8b3c5d1a2f4
+Create Date: 2026-10-19 13:05:51.228764
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c9a7e4b1d3'
+down_revision: Union[str, Sequence[str], None] = 'e8b3c5d1a2f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('incidents', sa.Column('endpoint', sa.String(length=300), nullable=True))
+    op.drop_index('idx_incidents_status', table_name='incidents')
+    op.create_index('idx_incidents_status_endpoint', 'incidents', ['status', 'endpoint'], unique=False)
+    # Legacy system-wide incidents have no endpoint and would never resolve
+    op.execute(
+        "UPDATE incidents SET status = 'resolved', end_time = now() "
+        "WHERE status = 'active' AND endpoint IS NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_incidents_status_endpoint', table_name='incidents')
+    op.create_index('idx_incidents_status', 'incidents', ['status'], unique=False)
+    op.drop_column('incidents', 'endpoint')
@@ -0,0 +1,48 @@
+"""
+Credential verification cost: API key (warm prefix cache + HMAC) vs. bcrypt password.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_api_key_auth.py
+"""
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import bcrypt
+
+from sentinelstack.auth.api_keys import ApiKeyCache, generate_api_key
+from sentinelstack.config import settings
+
+ITERATIONS = 100_000
+BCRYPT_ITERATIONS = 5
+
+async def main():
+    api_key, prefix, key_hash = generate_api_key()
+    keys = ApiKeyCache()
+    keys._load = AsyncMock(return_value={"hash": key_hash, "user_id": "owner", "rate_limit": None})
+
+    redis = MagicMock()
+    redis.get = AsyncMock(return_value=None)
+    redis.set = AsyncMock(return_value=True)
+    redis.delete = AsyncMock()
+    with patch("sentinelstack.cache.redis_client", redis):
+        await keys.authenticate(api_key)  # Warm the local tier
+
+        started = time.perf_counter()
+        for _ in range(ITERATIONS):
+            await keys.authenticate(api_key)
+        per_key = (time.perf_counter() - started) / ITERATIONS
+
+    hashed = bcrypt.hashpw(b"correct horse", bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS))
+    started = time.perf_counter()
+    for _ in range(BCRYPT_ITERATIONS):
+        bcrypt.checkpw(b"correct horse", hashed)
+    per_password = (time.perf_counter() - started) / BCRYPT_ITERATIONS
+
+    print("Credential verification (per request)")
+    print(f"  API key, warm cache + HMAC-SHA256: {per_key * 1e6:9.1f}us")
+    print(f"  bcrypt password ({settings.BCRYPT_ROUNDS} rounds):      {per_password * 1e6:9.1f}us")
+    print(f"  ratio: {per_password / per_key:,.0f}x")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""
+Login hashing benchmark: bcrypt inline on the event loop vs. the bounded executor.
+
+Fires a burst of concurrent password verifications while a probe task ticks
+every 5ms, and reports login throughput plus how late the probe woke up
+(event-loop lag, i.e. what every other in-flight request experiences).
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_bcrypt_login.py [rounds]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import bcrypt
+
+from sentinelstack.auth.security import PasswordHasher, verify_password
+from sentinelstack.config import settings
+
+LOGINS = 32
+PROBE_INTERVAL = 0.005
+
+async def probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+async def run(name: str, login):
+    lags: list = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0.05)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[login() for _ in range(LOGINS)])
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await prober
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99) - 1] if len(lags) > 1 else lags[0]
+    print(f"  {name:<18} {LOGINS / elapsed:7.1f} logins/s | loop lag p50 {statistics.median(lags) * 1000:7.1f}ms"
+          f" | p99 {p99 * 1000:7.1f}ms | max {lags[-1] * 1000:7.1f}ms | {len(lags)} probe ticks")
+
+async def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else settings.BCRYPT_ROUNDS
+    hashed = bcrypt.hashpw(b"correct horse", bcrypt.gensalt(rounds=rounds)).decode()
+    print(f"bcrypt login burst ({LOGINS} concurrent logins, {rounds} rounds)")
+
+    async def inline_login():
+        verify_password("correct horse", hashed)
+
+    hasher = PasswordHasher(workers=settings.BCRYPT_WORKERS, max_pending=LOGINS)
+
+    async def executor_login():
+        await hasher.verify("correct horse", hashed)
+
+    await run("inline (before)", inline_login)
+    await run("executor (after)", executor_login)
+    hasher.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+Overload benchmark: unlimited admission vs. the adaptive concurrency limiter.
+
+A simulated backend serves BACKEND_SLOTS requests at a time, SERVICE_TIME
+each (think DB pool), so it tops out at BACKEND_SLOTS / SERVICE_TIME req/s.
+Requests arrive open-loop at OVERLOAD x that capacity for DURATION seconds,
+like clients that keep coming no matter how slow the gateway gets.
+
+Reports the latency of requests that got an answer, how many were shed
+with 503, and goodput (answers within SLO).
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_concurrency_limit.py [overload]
+"""
+import asyncio
+import sys
+import time
+
+from sentinelstack.gateway.concurrency import ConcurrencyLimiter, AUTHENTICATED, ANONYMOUS
+
+BACKEND_SLOTS = 20
+SERVICE_TIME = 0.010
+DURATION = 6.0
+SLO = 0.250
+TICK = 0.005
+
+class Backend:
+    def __init__(self):
+        self.slots = asyncio.Semaphore(BACKEND_SLOTS)
+
+    async def call(self):
+        async with self.slots:
+            await asyncio.sleep(SERVICE_TIME)
+
+async def run(name: str, limiter, overload: float):
+    backend = Backend()
+    served, shed = [], {AUTHENTICATED: 0, ANONYMOUS: 0}
+
+    async def request(priority):
+        arrived = time.perf_counter()
+        admitted = None
+        if limiter:
+            admitted = await limiter.acquire(priority)
+            if admitted is None:
+                shed[priority] += 1
+                return
+        try:
+            await backend.call()
+        finally:
+            if limiter:
+                limiter.release(admitted, 200)
+        served.append(time.perf_counter() - arrived)
+
+    rate = overload * BACKEND_SLOTS / SERVICE_TIME
+    tasks = []
+    started = time.perf_counter()
+    sent = 0.0
+    while time.perf_counter() - started < DURATION:
+        # Open loop: whatever is due by now arrives, half of it anonymous
+        due = (time.perf_counter() - started) * rate
+        while sent < due:
+            tasks.append(asyncio.create_task(request(ANONYMOUS if int(sent) % 2 else AUTHENTICATED)))
+            sent += 1
+        await asyncio.sleep(TICK)
+    await asyncio.gather(*tasks)
+
+    served.sort()
+    good = sum(1 for latency in served if latency <= SLO)
+    p = lambda q: served[min(len(served) - 1, int(len(served) * q))] * 1000
+    limit = f"{limiter.limit:6.1f}" if limiter else "     -"
+    print(f"  {name:<12} sent {int(sent):6d} | served p50 {p(0.5):8.1f}ms p99 {p(0.99):8.1f}ms"
+          f" | shed auth {shed[AUTHENTICATED] * 2 / sent:6.1%} anon {shed[ANONYMOUS] * 2 / sent:6.1%}"
+          f" | goodput {good / DURATION:7.0f}/s | final limit {limit}")
+
+async def main():
+    overload = float(sys.argv[1]) if len(sys.argv) > 1 else 1.5
+    capacity = BACKEND_SLOTS / SERVICE_TIME
+    print(f"Backend capacity {capacity:.0f} req/s, offered {overload * capacity:.0f} req/s for {DURATION:.0f}s"
+          f" (SLO {SLO * 1000:.0f}ms)")
+    await run("unlimited", None, overload)
+    await run("adaptive", ConcurrencyLimiter(initial_limit=50, min_limit=5, max_limit=1000, queue_timeout=0.05), overload)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,72 @@
+"""
+Incident rule evaluation benchmark.
+
+Compiles N rules (mostly exact-path, some regex/global) and evaluates them
+against one bucket holding M endpoints, i.e. the work done per minute.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_incident_rules.py
+"""
+import datetime
+import random
+import time
+
+from sentinelstack.aggregation.buckets import EndpointAggregates
+from sentinelstack.incidents.rules import RuleEngine, compile_rules
+
+ROUNDS = 20
+
+def build_bucket(endpoints: int) -> EndpointAggregates:
+    rng = random.Random(42)
+    aggregates = EndpointAggregates(datetime.datetime(2026, 1, 1))
+    for i in range(endpoints):
+        requests = rng.randint(1, 5000)
+        aggregates.append(
+            rng.choice(("GET", "POST")),
+            f"/api/v1/service{i % 50}/resource{i}",
+            requests,
+            rng.randint(0, requests // 10),
+            rng.uniform(5, 300),
+            rng.uniform(20, 2500)
+        )
+    return aggregates
+
+def build_rules(count: int, endpoints: int) -> str:
+    rng = random.Random(7)
+    lines = []
+    for i in range(count):
+        kind = i % 20
+        if kind == 0:
+            # ~5% regex rules that scan every endpoint
+            lines.append(f'r{i}: error_rate(path=~"^/api/v1/service{i % 50}/") > {rng.randint(1, 20)}%')
+        elif kind == 1:
+            lines.append(f'r{i}: avg_latency(method="POST") > {rng.randint(100, 900)}ms for 3m')
+        else:
+            path = f"/api/v1/service{rng.randrange(endpoints) % 50}/resource{rng.randrange(endpoints)}"
+            lines.append(f'r{i}: p95(path="{path}") > {rng.randint(200, 2000)}ms for {rng.randint(1, 5)}m')
+    return "\n".join(lines)
+
+def run(rule_count: int, endpoint_count: int):
+    text = build_rules(rule_count, endpoint_count)
+
+    t0 = time.perf_counter()
+    compile_rules(text)
+    compile_ms = (time.perf_counter() - t0) * 1000
+
+    engine = RuleEngine()
+    engine.load_text(text, version="bench")
+    best = float("inf")
+    matches = 0
+    for _ in range(ROUNDS):
+        aggregates = build_bucket(endpoint_count)  # Fresh bucket: path index built per round
+        t0 = time.perf_counter()
+        matches = len(engine.evaluate(aggregates, min_requests=10))
+        best = min(best, time.perf_counter() - t0)
+
+    print(f"  {rule_count:>6} rules x {endpoint_count:>6} endpoints: "
+          f"compile {compile_ms:7.1f}ms | evaluate {best * 1000:7.2f}ms/bucket | {matches} matches")
+
+if __name__ == "__main__":
+    print("Incident rule engine (best of 20)")
+    for rules, endpoints in ((1_000, 1_000), (1_000, 10_000), (5_000, 10_000)):
+        run(rules, endpoints)
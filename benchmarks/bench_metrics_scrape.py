@@ -0,0 +1,67 @@
+"""
+/metrics scrape cost: unbounded path labels vs. the cardinality guard.
+
+Records one request for each of N distinct paths (what a crawler or a
+route with IDs in the URL produces), then times a full render
+(generate_latest) and reports the body size, plus the cost of a cached
+scrape through MetricsExposition.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_metrics_scrape.py [paths]
+"""
+import asyncio
+import gzip
+import sys
+import time
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest
+
+from sentinelstack.monitoring.metrics import CardinalityGuard
+from sentinelstack.monitoring.exposition import MetricsExposition
+
+RENDERS = 5
+
+def populate(paths: int, guard=None) -> CollectorRegistry:
+    registry = CollectorRegistry()
+    requests = Counter("http_requests_total", "t", ["method", "path", "status_code"], registry=registry)
+    latency = Histogram("http_request_duration_seconds", "t", ["method", "path"], registry=registry,
+                        buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+    for i in range(paths):
+        path = f"/auth/users/{i:08x}"
+        if guard is None:
+            requests.labels(method="GET", path=path, status_code=200).inc()
+            latency.labels(method="GET", path=path).observe(0.02)
+        else:
+            guard.labels(requests, method="GET", path=path, status_code=200).inc()
+            guard.labels(latency, method="GET", path=path).observe(0.02)
+    return registry
+
+def time_render(registry) -> tuple:
+    best = float("inf")
+    for _ in range(RENDERS):
+        started = time.perf_counter()
+        body = generate_latest(registry)
+        best = min(best, time.perf_counter() - started)
+    return best, body
+
+async def cached_scrape(registry) -> float:
+    exposition = MetricsExposition(ttl=60)
+    exposition._render = lambda: (generate_latest(registry), gzip.compress(generate_latest(registry)))
+    await exposition.get()
+    started = time.perf_counter()
+    for _ in range(1000):
+        await exposition.get(gzipped=True)
+    return (time.perf_counter() - started) / 1000
+
+def main():
+    paths = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    print(f"{paths} distinct paths")
+    print(f"{'mode':<24} {'render':>10} {'body':>10} {'gzip':>10}")
+    for name, guard in (("unbounded", None), ("guarded (1000/family)", CardinalityGuard())):
+        registry = populate(paths, guard)
+        seconds, body = time_render(registry)
+        print(f"{name:<24} {seconds * 1000:>8.1f}ms {len(body) / 1024:>8.0f}KB {len(gzip.compress(body)) / 1024:>8.0f}KB")
+    print(f"cached scrape (guarded): {asyncio.run(cached_scrape(registry)) * 1e6:.1f}us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Multi-worker benchmark: /health throughput vs. gunicorn worker count.
+
+Starts the app under gunicorn.conf.py with 1, 2, 4 ... workers (up to the
+core count, or the counts given on the command line), drives it from
+separate load-generator processes, and reports requests/second.
+After each run it also checks /metrics: in multiprocess mode the
+http_requests_total served by any one worker must equal the requests sent
+to all of them.
+
+Background jobs are switched off (AGGREGATION_ROLE=off, ENABLE_AI=false)
+so only request handling is measured; Redis and Postgres are not needed.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_multiworker.py [workers ...]
+"""
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+DURATION = 10.0        # Seconds of measured load per configuration
+CONNECTIONS = 32       # Concurrent keep-alive connections per load process
+LOAD_PROCESSES = max(2, multiprocessing.cpu_count())
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def drive(url: str, duration: float) -> int:
+    done = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=CONNECTIONS, max_keepalive_connections=CONNECTIONS)
+    async with httpx.AsyncClient(limits=limits) as client:
+        async def loop():
+            nonlocal done
+            while time.perf_counter() < deadline:
+                response = await client.get(url)
+                if response.status_code == 200:
+                    done += 1
+        await asyncio.gather(*[loop() for _ in range(CONNECTIONS)])
+    return done
+
+def load_process(url: str, duration: float, results):
+    results.put(asyncio.run(drive(url, duration)))
+
+def requests_counted(base: str) -> float:
+    text = httpx.get(f"{base}/metrics").text
+    return sum(
+        float(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+        if line.startswith("http_requests_total{") and 'path="/health"' in line
+    )
+
+def run(workers: int):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(port),
+        "PROMETHEUS_MULTIPROC_DIR": tempfile.mkdtemp(prefix="sentinel-bench-"),
+        "AGGREGATION_ROLE": "off",
+        "ENABLE_AI": "false",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}",
+         "sentinelstack.gateway.main:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.time() + 60
+        while time.time() < deadline:
+            try:
+                if httpx.get(f"{base}/health").status_code == 200:
+                    break
+            except httpx.TransportError:
+                time.sleep(0.2)
+        time.sleep(2.0)  # Let every worker finish booting
+
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=load_process, args=(f"{base}/health", DURATION, results))
+                 for _ in range(LOAD_PROCESSES)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        sent = sum(results.get() for _ in procs)
+
+        counted = requests_counted(base)
+        return sent / DURATION, sent, counted
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    cores = multiprocessing.cpu_count()
+    counts = [int(a) for a in sys.argv[1:]] or sorted({1, *[2 ** i for i in range(1, 8) if 2 ** i <= cores], cores})
+    print(f"cores={cores} load_processes={LOAD_PROCESSES} connections={CONNECTIONS * LOAD_PROCESSES} duration={DURATION}s")
+    print(f"{'workers':>8} {'req/s':>10} {'sent':>9} {'/metrics':>9}")
+    for workers in counts:
+        rps, sent, counted = run(workers)
+        # /metrics also includes the readiness probes made before the load
+        print(f"{workers:>8} {rps:>10.0f} {sent:>9} {counted:>9.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Latency the proxy engine adds in front of an upstream.
+
+Starts a stub upstream (tiny ASGI app) and a gateway process serving only
+the proxy routes, both under uvicorn on localhost, then sends the same
+sequential keep-alive requests to each and compares the distributions.
+Auth, rate limiting and logging are left out: their cost is the same for
+local and proxied routes and is measured by the other benchmarks.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_proxy.py [requests]
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+UPSTREAM_PORT = 18081
+GATEWAY_PORT = 18080
+BODY = b'{"status": "ok", "items": [1, 2, 3]}'
+WARMUP = 200
+
+async def stub_app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(BODY)).encode())]})
+    await send({"type": "http.response.body", "body": BODY})
+
+def gateway_app():
+    from starlette.applications import Starlette
+    from sentinelstack.proxy.service import ProxyService
+    service = ProxyService({"/api": [f"http://127.0.0.1:{UPSTREAM_PORT}"]})
+    return Starlette(routes=service.routes())
+
+def serve(target: str, port: int):
+    import uvicorn
+    app = stub_app if target == "stub" else gateway_app()
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+async def wait_ready(url: str):
+    async with httpx.AsyncClient() as client:
+        for _ in range(100):
+            try:
+                await client.get(url)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not come up")
+
+async def measure(url: str, count: int) -> list:
+    samples = []
+    async with httpx.AsyncClient() as client:
+        for _ in range(WARMUP):
+            await client.get(url)
+        for _ in range(count):
+            started = time.perf_counter()
+            response = await client.get(url)
+            samples.append(time.perf_counter() - started)
+            assert response.content == BODY
+    return samples
+
+def percentile(samples: list, q: float) -> float:
+    return sorted(samples)[int(len(samples) * q) - 1] * 1000
+
+async def run(count: int):
+    direct_url = f"http://127.0.0.1:{UPSTREAM_PORT}/api/items"
+    proxied_url = f"http://127.0.0.1:{GATEWAY_PORT}/api/items"
+    await wait_ready(direct_url)
+    await wait_ready(proxied_url)
+
+    # Interleave rounds so drift on a shared machine hits both sides equally
+    direct, proxied = [], []
+    for _ in range(5):
+        direct += await measure(direct_url, count // 5)
+        proxied += await measure(proxied_url, count // 5)
+
+    print(f"{count} sequential keep-alive GETs")
+    print(f"{'path':<10} {'p50':>9} {'p90':>9} {'p99':>9}")
+    for name, samples in (("direct", direct), ("proxied", proxied)):
+        print(f"{name:<10} {statistics.median(samples) * 1000:>7.3f}ms "
+              f"{percentile(samples, 0.9):>7.3f}ms {percentile(samples, 0.99):>7.3f}ms")
+    print(f"added p50: {(statistics.median(proxied) - statistics.median(direct)) * 1000:.3f}ms")
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--serve":
+        serve(sys.argv[2], int(sys.argv[3]))
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    env = {**os.environ, "PYTHONPATH": os.environ.get("PYTHONPATH", ".")}
+    servers = [
+        subprocess.Popen([sys.executable, __file__, "--serve", "stub", str(UPSTREAM_PORT)], env=env),
+        subprocess.Popen([sys.executable, __file__, "--serve", "gateway", str(GATEWAY_PORT)], env=env),
+    ]
+    try:
+        asyncio.run(run(count))
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+if __name__ == "__main__":
+    main()
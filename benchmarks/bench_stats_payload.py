@@ -0,0 +1,85 @@
+"""
+Serialization + compression benchmark for large /stats payloads.
+
+Builds a /stats/metrics response for a 30 day window (one point per minute)
+and a /stats/endpoints page, then times stdlib json vs the gateway encoder
+and each negotiated encoding.
+
+Usage:
+    PYTHONPATH=. python benchmarks/bench_stats_payload.py
+"""
+import datetime
+import gzip
+import json
+import time
+
+from sentinelstack import serialization
+from sentinelstack.gateway.compression import GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ROUNDS = 20
+
+def build_metrics_payload(minutes: int) -> dict:
+    start = datetime.datetime(2026, 1, 1)
+    return {
+        "timeseries": [
+            {
+                "time": (start + datetime.timedelta(minutes=i)).isoformat(),
+                "requests": 1000 + (i * 7) % 313,
+                "errors": (i * 3) % 17
+            }
+            for i in range(minutes)
+        ]
+    }
+
+def build_endpoints_payload(routes: int) -> dict:
+    return {
+        "window_minutes": 60,
+        "sort": "rps",
+        "endpoints": [
+            {
+                "method": "GET",
+                "path": f"/api/v1/resource/{i}",
+                "requests": 10_000 - i,
+                "rps": round((10_000 - i) / 3600, 3),
+                "error_rate_percent": round((i % 13) / 10, 2),
+                "p95_latency_ms": round(20 + (i % 97) * 1.7, 2)
+            }
+            for i in range(routes)
+        ],
+        "next_cursor": None
+    }
+
+def timed(fn, rounds: int = ROUNDS) -> float:
+    """Best-of-N wall time in milliseconds."""
+    best = float("inf")
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+def run(name: str, payload: dict):
+    stdlib_ms = timed(lambda: json.dumps(payload).encode())
+    fast_ms = timed(lambda: serialization.dumps(payload))
+    body = serialization.dumps(payload)
+
+    print(f"\n{name}")
+    print(f"  {'encoder':<28}{'time (ms)':>12}{'size (KB)':>12}")
+    print(f"  {'json.dumps (default)':<28}{stdlib_ms:>12.2f}{len(json.dumps(payload)) / 1024:>12.1f}")
+    print(f"  {'serialization.dumps':<28}{fast_ms:>12.2f}{len(body) / 1024:>12.1f}")
+
+    gz_ms = timed(lambda: gzip.compress(body, GZIP_LEVEL))
+    print(f"  {f'+ gzip (level {GZIP_LEVEL})':<28}{gz_ms:>12.2f}{len(gzip.compress(body, GZIP_LEVEL)) / 1024:>12.1f}")
+    if brotli is not None:
+        br_ms = timed(lambda: brotli.compress(body, quality=BROTLI_QUALITY))
+        br_size = len(brotli.compress(body, quality=BROTLI_QUALITY))
+        print(f"  {f'+ br (quality {BROTLI_QUALITY})':<28}{br_ms:>12.2f}{br_size / 1024:>12.1f}")
+
+if __name__ == "__main__":
+    run("/stats/metrics, 30 day window (43,200 points)", build_metrics_payload(60 * 24 * 30))
+    run("/stats/endpoints, 500 routes", build_endpoints_payload(500))
@@ -0,0 +1,34 @@
+# -------------------------------------------------------------------
+# Multi-worker deployment
+#   gunicorn -c gunicorn.conf.py sentinelstack.gateway.main:app
+#
+# - All workers serve requests and flush their own log queues.
+# - Aggregation runs in exactly one process, elected through a Redis
+#   lease (AGGREGATION_ROLE, see sentinelstack/coordination.py).
+# - /metrics merges every worker's values from PROMETHEUS_MULTIPROC_DIR.
+# -------------------------------------------------------------------
+import multiprocessing
+import os
+import shutil
+
+# Must be set before prometheus_client is imported anywhere, including here:
+# it picks its mmap-backed value class at import time and workers inherit it.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/sentinelstack-metrics")
+
+from prometheus_client import multiprocess  # noqa: E402
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+graceful_timeout = 30
+keepalive = 5
+
+def on_starting(server):
+    # Values from a previous run would otherwise be merged into this one
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+def child_exit(server, worker):
+    # Covers crashed workers too; clean exits also do this in the lifespan
+    multiprocess.mark_process_dead(worker.pid)
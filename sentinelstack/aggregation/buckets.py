@@ -0,0 +1,72 @@
+import datetime
+from typing import Dict, List, Optional
+
+class EndpointAggregates:
+    """
+    Column-oriented per-endpoint stats for one bucket.
+    Built by the aggregator from rows it already holds, so detectors never
+    re-read what was just written. Index i is the same endpoint in every list,
+    which lets rules evaluate all routes in a single pass over the columns.
+    """
+    __slots__ = (
+        "bucket_time", "endpoints", "methods", "paths",
+        "requests", "errors", "avg_latency", "p95_latency", "_index", "_path_index"
+    )
+
+    def __init__(self, bucket_time: datetime.datetime):
+        self.bucket_time = bucket_time
+        self.endpoints: List[str] = []   # "METHOD /path"
+        self.methods: List[str] = []
+        self.paths: List[str] = []
+        self.requests: List[int] = []
+        self.errors: List[int] = []
+        self.avg_latency: List[float] = []
+        self.p95_latency: List[float] = []
+        self._index: Optional[Dict[str, int]] = None
+        self._path_index: Optional[Dict[str, List[int]]] = None
+
+    def append(self, method: str, path: str, requests: int, errors: int, avg_latency: float, p95_latency: float):
+        self.endpoints.append(f"{method} {path}")
+        self.methods.append(method)
+        self.paths.append(path)
+        self.requests.append(requests)
+        self.errors.append(errors)
+        self.avg_latency.append(avg_latency)
+        self.p95_latency.append(p95_latency)
+        self._index = None
+        self._path_index = None
+
+    @classmethod
+    def from_rows(cls, bucket_time: datetime.datetime, rows) -> "EndpointAggregates":
+        """Rows need: method, path, count, errors, avg_latency, p95_latency."""
+        aggregates = cls(bucket_time)
+        for row in rows:
+            aggregates.append(
+                row.method,
+                row.path,
+                int(row.count),
+                int(row.errors or 0),
+                float(row.avg_latency or 0.0),
+                float(row.p95_latency or 0.0)
+            )
+        return aggregates
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    def index_of(self, endpoint: str) -> Optional[int]:
+        if self._index is None:
+            self._index = {name: i for i, name in enumerate(self.endpoints)}
+        return self._index.get(endpoint)
+
+    def indices_for_path(self, path: str) -> List[int]:
+        """All rows for a path (one per method). O(1) after the first call."""
+        if self._path_index is None:
+            index: Dict[str, List[int]] = {}
+            for i, name in enumerate(self.paths):
+                index.setdefault(name, []).append(i)
+            self._path_index = index
+        return self._path_index.get(path, [])
+
+    def error_rates(self) -> List[float]:
+        return [e / r if r else 0.0 for e, r in zip(self.errors, self.requests)]
@@ -1,7 +1,23 @@
-from sqlalchemy import Column, String, Integer, DateTime, Float, Index, BigInteger
+from sqlalchemy import Column, String, Integer, DateTime, Float, Index, BigInteger, UniqueConstraint
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
 from datetime import datetime
 from sentinelstack.database import Base
 
+class hour_floor(FunctionElement):
+    """Start of the hour containing a timestamp, e.g. the '1h' bucket of a '1m' row."""
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(hour_floor)
+def _hour_floor_postgresql(element, compiler, **kw):
+    return "date_trunc('hour', %s)" % compiler.process(element.clauses, **kw)
+
+@compiles(hour_floor, "sqlite")
+def _hour_floor_sqlite(element, compiler, **kw):
+    # Matches SQLAlchemy's SQLite DateTime storage format
+    return "strftime('%%Y-%%m-%%d %%H:00:00.000000', %s)" % compiler.process(element.clauses, **kw)
+
 class RequestMetric(Base):
     __tablename__ = "request_metrics"
 
@@ -21,6 +37,33 @@ class RequestMetric(Base):
     p95_latency_ms = Column(Float, default=0.0)
 
     # Composite Index for fast lookups/deduplication
+    # Covering Index so per-endpoint range scans are index-only (no heap fetches)
     __table_args__ = (
         Index('idx_metrics_bucket_path', 'bucket_time', 'path', 'method', 'status_code'),
+        Index(
+            'idx_metrics_bucket_endpoint_covering', 'bucket_time', 'method', 'path',
+            postgresql_include=['total_requests', 'total_errors', 'avg_latency_ms', 'p95_latency_ms']
+        ),
+    )
+
+class MetricRollup(Base):
+    """
+    Global (all routes) pre-aggregated tiers.
+    resolution '1m' is written with each minute bucket, '1h' when an hour closes.
+    Long-window summaries read a handful of these rows instead of request_logs.
+    """
+    __tablename__ = "metric_rollups"
+
+    id = Column(Integer, primary_key=True)
+
+    resolution = Column(String(3), nullable=False)  # '1m' or '1h'
+    bucket_time = Column(DateTime, nullable=False)
+
+    total_requests = Column(BigInteger, default=0)
+    total_errors = Column(BigInteger, default=0)
+    avg_latency_ms = Column(Float, default=0.0)
+    p95_latency_ms = Column(Float, default=0.0)
+
+    __table_args__ = (
+        UniqueConstraint('resolution', 'bucket_time', name='uq_rollups_resolution_bucket'),
     )
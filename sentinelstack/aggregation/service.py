@@ -1,14 +1,49 @@
 import asyncio
 import datetime
-from sqlalchemy import select, func, text, case
+from sqlalchemy import select, func, text, case, tuple_, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+from sentinelstack.config import settings
+from sentinelstack.coordination import LeaderLease
 from sentinelstack.database import AsyncSessionLocal
 from sentinelstack.logging.models import RequestLog
-from sentinelstack.aggregation.models import RequestMetric
+from sentinelstack.aggregation.models import RequestMetric, MetricRollup, hour_floor
+from sentinelstack.aggregation.buckets import EndpointAggregates
+
+# grouping() levels for the GROUPING SETS query
+GROUP_FULL = 0      # (method, path, status_code)
+GROUP_ENDPOINT = 1  # (method, path)
+GROUP_TOTAL = 7     # ()
+
+# Closed hours re-checked for a missing '1h' row on every run
+ROLLUP_BACKFILL = datetime.timedelta(hours=24)
+
+def missing_hour_rollups(closed_before: datetime.datetime):
+    """'1h' rows for the closed hours before `closed_before` that have '1m' rows but no '1h' row yet."""
+    hour = hour_floor(MetricRollup.bucket_time)
+    existing = aliased(MetricRollup)
+    requests = func.sum(MetricRollup.total_requests)
+    return (
+        select(
+            literal("1h"),
+            hour,
+            requests,
+            func.sum(MetricRollup.total_errors),
+            func.sum(MetricRollup.avg_latency_ms * MetricRollup.total_requests) / func.nullif(requests, 0),
+            func.sum(MetricRollup.p95_latency_ms * MetricRollup.total_requests) / func.nullif(requests, 0)
+        )
+        .where(MetricRollup.resolution == "1m")
+        .where(MetricRollup.bucket_time >= closed_before - ROLLUP_BACKFILL)
+        .where(MetricRollup.bucket_time < closed_before)
+        .where(~select(existing.id).where(existing.resolution == "1h", existing.bucket_time == hour).exists())
+        .group_by(hour)
+    )
 
 class AggregationService:
     def __init__(self):
         self.is_running = False
+        self.lease = LeaderLease("aggregation")
 
     async def aggregate_last_period(self, session: AsyncSession, period_minutes: int = 1):
         """
@@ -22,15 +57,18 @@ class AggregationService:
 
         try:
             # 1. Check if we already aggregated this bucket (Idempotency)
-            # In a real distributed system, use Redis Lock here.
+            # Only the lease holder runs this (see worker); the check covers failovers.
             stmt_check = select(RequestMetric).where(RequestMetric.bucket_time == bucket_start).limit(1)
-            existing = await session.execute(stmt_check)
+            existing = await session.execute(stmt_check, execution_options={"query_name": "aggregation.check_bucket"})
             if existing.scalar():
                 # print(f"DEBUG:   Metrics for {bucket_start} already exist. Skipping.")
                 return
 
             # 2. Perform Segregated Aggregation (Group By)
-            # We calculate stats per (method, path, status) group
+            # We calculate stats per (method, path, status) group, plus per-endpoint
+            # rows for incident detection and one global row (empty grouping set)
+            # for the rollup tier, all in the same scan
+            group_cols = (RequestLog.method, RequestLog.path, RequestLog.status_code)
             stmt = (
                 select(
                     RequestLog.method,
@@ -38,18 +76,35 @@ class AggregationService:
                     RequestLog.status_code,
                     func.count(RequestLog.id).label("count"),
                     func.sum(case((RequestLog.error_flag == True, 1), else_=0)).label("errors"),
-                    func.avg(RequestLog.latency_ms).label("avg_latency")
+                    func.avg(RequestLog.latency_ms).label("avg_latency"),
+                    func.percentile_cont(0.95).within_group(RequestLog.latency_ms).label("p95_latency"),
+                    func.grouping(*group_cols).label("grouping_level")
                 )
                 .where(RequestLog.timestamp >= bucket_start)
                 .where(RequestLog.timestamp < bucket_end)
-                .group_by(RequestLog.method, RequestLog.path, RequestLog.status_code)
+                .group_by(func.grouping_sets(
+                    tuple_(*group_cols),
+                    tuple_(RequestLog.method, RequestLog.path),
+                    tuple_()
+                ))
             )
 
-            result = await session.execute(stmt)
-            rows = result.all()
+            result = await session.execute(stmt, execution_options={"query_name": "aggregation.group_bucket"})
+            all_rows = result.all()
+            # grouping() is a bitmask of rolled-up columns: 0 = full key,
+            # 1 = status rolled up (per endpoint), 7 = everything (global)
+            rows = [row for row in all_rows if row.grouping_level == GROUP_FULL]
 
             if not rows:
+                # A quiet minute still closes the hour for the rollup tier
+                await self._rollup_closed_hours(session, bucket_end)
+                await session.commit()
+                # ...and is exactly what a traffic drop looks like to the detector
+                from sentinelstack.incidents.service import incident_service
+                await incident_service.check_thresholds(session, EndpointAggregates(bucket_start))
                 return
+            total = next(row for row in all_rows if row.grouping_level == GROUP_TOTAL)
+            endpoint_rows = [row for row in all_rows if row.grouping_level == GROUP_ENDPOINT]
 
             # 3. Bulk Insert Metrics
             metrics_to_insert = []
@@ -62,36 +117,90 @@ class AggregationService:
                     total_requests=row.count,
                     total_errors=row.errors or 0, # Handle None from SUM
                     avg_latency_ms=float(row.avg_latency) if row.avg_latency else 0.0,
-                    p95_latency_ms=0.0 # Placeholder for advanced calc
+                    p95_latency_ms=float(row.p95_latency) if row.p95_latency else 0.0
                 ))
 
             session.add_all(metrics_to_insert)
+
+            # 4. Maintain the global rollup tiers (1m now, 1h for every closed hour still missing one)
+            session.add(MetricRollup(
+                resolution="1m",
+                bucket_time=bucket_start,
+                total_requests=total.count,
+                total_errors=total.errors or 0,
+                avg_latency_ms=float(total.avg_latency) if total.avg_latency else 0.0,
+                p95_latency_ms=float(total.p95_latency) if total.p95_latency else 0.0
+            ))
+            await session.flush()
+            await self._rollup_closed_hours(session, bucket_end)
+
             await session.commit()
             print(f"INFO:    Aggregated {len(metrics_to_insert)} metric groups for {bucket_start}")
             
-            # 4. Trigger Incident Check
+            # 5. Push the new bucket to live dashboards (computed from rows we already hold)
+            from sentinelstack.stats.stream import event_broadcaster
+            await event_broadcaster.publish("bucket", {
+                "time": bucket_start.isoformat(),
+                "requests": total.count,
+                "errors": total.errors or 0
+            })
+
+            # 6. Trigger Incident Check on the in-memory per-endpoint aggregates
             from sentinelstack.incidents.service import incident_service
-            await incident_service.check_thresholds(session, bucket_start)
+            aggregates = EndpointAggregates.from_rows(bucket_start, endpoint_rows)
+            await incident_service.check_thresholds(session, aggregates)
 
         except Exception as e:
             print(f"ERROR:   Aggregation failed: {e}")
             await session.rollback()
 
+    async def _rollup_closed_hours(self, session: AsyncSession, now: datetime.datetime):
+        """
+        Folds the '1m' rollups of each closed hour into one '1h' row.
+        Not tied to the :00 run: an hour whose roll-up was missed (failover,
+        late tick, failed commit) is filled in by the next run.
+        INSERT ... SELECT keeps it server-side; ON CONFLICT makes it idempotent.
+        """
+        stmt = (
+            pg_insert(MetricRollup)
+            .from_select(
+                ["resolution", "bucket_time", "total_requests", "total_errors", "avg_latency_ms", "p95_latency_ms"],
+                missing_hour_rollups(now.replace(minute=0, second=0, microsecond=0))
+            )
+            .on_conflict_do_nothing(constraint="uq_rollups_resolution_bucket")
+        )
+        await session.execute(stmt, execution_options={"query_name": "aggregation.rollup_hour"})
+
     async def worker(self):
-        """Background task that triggers aggregation every minute."""
+        """
+        Background task that triggers aggregation every minute.
+        Every process runs it, but with AGGREGATION_ROLE=auto only the holder
+        of the aggregation lease does the work; the rest stand by to take over.
+        """
+        role = settings.AGGREGATION_ROLE
+        if role == "off":
+            print("INFO:    Aggregation disabled in this process (AGGREGATION_ROLE=off)")
+            return
         self.is_running = True
-        print("INFO:    Aggregation Worker Started")
-        
-        while self.is_running:
-            # Sleep first to align with next minute boundary
-            now = datetime.datetime.utcnow()
-            next_minute = (now + datetime.timedelta(minutes=1)).replace(second=0, microsecond=0)
-            delay = (next_minute - now).total_seconds() + 2 # +2s buffer
-            
-            await asyncio.sleep(delay)
-            
-            async with AsyncSessionLocal() as db:
-                await self.aggregate_last_period(db)
+        print(f"INFO:    Aggregation Worker Started (role: {role})")
+        lease_task = asyncio.create_task(self.lease.worker()) if role == "auto" else None
+
+        try:
+            while self.is_running:
+                # Sleep first to align with next minute boundary
+                now = datetime.datetime.utcnow()
+                next_minute = (now + datetime.timedelta(minutes=1)).replace(second=0, microsecond=0)
+                delay = (next_minute - now).total_seconds() + 2 # +2s buffer
+
+                await asyncio.sleep(delay)
+
+                if role == "auto" and not self.lease.is_leader:
+                    continue
+                async with AsyncSessionLocal() as db:
+                    await self.aggregate_last_period(db)
+        finally:
+            if lease_task:
+                lease_task.cancel()
 
 # Global Instance
 aggregation_service = AggregationService()
@@ -1,7 +1,29 @@
-from typing import Protocol, Dict
-import httpx
+from typing import TYPE_CHECKING, AsyncIterator, Protocol, Dict, Optional
+import asyncio
+import hashlib
+import importlib.util
 import json
 import random
+from sentinelstack import serialization
+from sentinelstack.singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    import httpx  # Imported on first provider call; MockLLM setups never load it
+
+# HTTP/2 needs the optional `h2` package; without it the pool speaks HTTP/1.1 keep-alive
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Configuration
+REQUEST_TIMEOUT = 10.0    # Seconds per attempt
+MAX_CONCURRENCY = 4       # In-flight provider calls per process (also the connection pool size)
+MAX_ATTEMPTS = 3          # First try + 2 retries
+RETRY_BASE_DELAY = 0.5    # Seconds. Full jitter: sleep uniform(0, base * 2^attempt)
+RETRY_MAX_DELAY = 8.0
+RETRY_BUDGET_RATIO = 0.2  # Retries may add at most 20% on top of first attempts...
+RETRY_BUDGET_MIN = 3.0    # ...plus a small allowance so a quiet process can still retry
+RETRY_BUDGET_MAX = 10.0   # Tokens saved up during healthy periods
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+MOCK_STREAM_CHUNK = 64    # Characters per chunk when MockLLM simulates streaming
 
 class LLMProvider(Protocol):
     """
@@ -10,6 +32,10 @@ class LLMProvider(Protocol):
     async def generate_insight(self, system_prompt: str, context_data: Dict) -> Dict:
         ...
 
+    def stream_insight(self, system_prompt: str, context_data: Dict) -> AsyncIterator[str]:
+        """Yields the JSON answer as text fragments, as soon as the model produces them."""
+        ...
+
 class MockLLM:
     """
     Cost-free, instant responses for dev/test environments.
@@ -38,48 +64,157 @@ class MockLLM:
             "severity": "critical" if error_count > 50 else "medium"
         }
 
+    async def stream_insight(self, system_prompt: str, context_data: Dict) -> AsyncIterator[str]:
+        text = json.dumps(await self.generate_insight(system_prompt, context_data))
+        for start in range(0, len(text), MOCK_STREAM_CHUNK):
+            yield text[start:start + MOCK_STREAM_CHUNK]
+
+class LLMError(Exception):
+    """Provider call failed after retries (or with a non-retryable error)."""
+
+class RetryBudget:
+    """
+    Token bucket that caps retries to a fraction of first attempts.
+    When the provider is down, callers fail fast instead of multiplying load.
+    """
+    def __init__(self, ratio: float = RETRY_BUDGET_RATIO, minimum: float = RETRY_BUDGET_MIN,
+                 maximum: float = RETRY_BUDGET_MAX):
+        self.ratio = ratio
+        self.maximum = maximum
+        self.tokens = minimum
+
+    def record_attempt(self):
+        self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
 class OpenAI_LLM:
     """
     Production-grade LLM integration.
     Requires OPENAI_API_KEY env var.
+
+    One long-lived pooled client per process (HTTP/2 when available), a
+    semaphore bounding concurrent calls, jittered retries under a retry
+    budget, and coalescing of identical prompts: concurrent callers asking
+    the same question share one provider call.
     """
-    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo"):
+    def __init__(self, api_key: str, model: str = "gpt-3.5-turbo",
+                 base_url: str = "https://api.openai.com", transport: Optional["httpx.AsyncBaseTransport"] = None):
         self.api_key = api_key
         self.model = model
-        self.url = "https://api.openai.com/v1/chat/completions"
+        self.base_url = base_url
+        self.url = "/v1/chat/completions"
+        self._transport = transport  # Tests inject a local stub server here
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+        self._budget = RetryBudget()
+        self._inflight = SingleFlight("llm")
 
-    async def generate_insight(self, system_prompt: str, context_data: Dict) -> Dict:
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
+    def _get_client(self) -> "httpx.AsyncClient":
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=HTTP2_AVAILABLE,
+                transport=self._transport,
+                timeout=REQUEST_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONCURRENCY,
+                    max_keepalive_connections=MAX_CONCURRENCY
+                ),
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _payload(self, system_prompt: str, context_data: Dict) -> Dict:
+        return {
             "model": self.model,
             "messages": [
                 {"role": "system", "content": system_prompt},
-                {"role": "user", "content": json.dumps(context_data, indent=2)}
+                # Compact JSON: indentation is pure token cost
+                {"role": "user", "content": serialization.dumps_str(context_data)}
             ],
             "temperature": 0.3,
             "response_format": {"type": "json_object"}
         }
 
-        async with httpx.AsyncClient() as client:
+    async def generate_insight(self, system_prompt: str, context_data: Dict) -> Dict:
+        payload = self._payload(system_prompt, context_data)
+
+        # Singleflight: identical prompts in flight share one call
+        key = hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        return await self._inflight.do(key, lambda: self._complete(payload))
+
+    async def stream_insight(self, system_prompt: str, context_data: Dict) -> AsyncIterator[str]:
+        """
+        Streams content deltas from the provider's SSE response.
+        Not retried or coalesced: once bytes reach the client there is no replay.
+        """
+        import httpx
+        payload = {**self._payload(system_prompt, context_data), "stream": True}
+        client = self._get_client()
+        async with self._semaphore:
+            try:
+                async with client.stream("POST", self.url, json=payload) as response:
+                    if response.status_code != 200:
+                        raise LLMError(f"Provider returned {response.status_code}")
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data: "):
+                            continue
+                        data = line[6:]
+                        if data == "[DONE]":
+                            break
+                        delta = json.loads(data)["choices"][0]["delta"].get("content")
+                        if delta:
+                            yield delta
+            except httpx.TransportError as e:
+                raise LLMError(str(e)) from e
+
+    async def _complete(self, payload: Dict) -> Dict:
+        import httpx
+        client = self._get_client()
+        self._budget.record_attempt()
+        attempt = 0
+        while True:
+            retry_after: Optional[float] = None
             try:
-                response = await client.post(self.url, json=payload, headers=headers, timeout=10.0)
-                response.raise_for_status()
-                result = response.json()
-                content = result['choices'][0]['message']['content']
-                return json.loads(content)
-            except Exception as e:
-                # Fallback to a safe error message if LLM fails
-                print(f"LLM Error: {e}")
-                return {
-                    "summary": "AI Service Temporarily Unavailable",
-                    "analysis": "Could not contact LLM provider.",
-                    "action_items": ["Check API Keys", "Check Internet Connection"],
-                    "severity": "unknown"
-                }
+                async with self._semaphore:
+                    response = await client.post(self.url, json=payload)
+                if response.status_code not in RETRYABLE_STATUS:
+                    response.raise_for_status()
+                    content = response.json()['choices'][0]['message']['content']
+                    return json.loads(content)
+                error: Exception = LLMError(f"Provider returned {response.status_code}")
+                if "retry-after" in response.headers:
+                    try:
+                        retry_after = float(response.headers["retry-after"])
+                    except ValueError:
+                        pass
+            except httpx.HTTPStatusError as e:
+                # 4xx other than 408/429: retrying won't help
+                raise LLMError(f"Provider rejected request: {e.response.status_code}") from e
+            except (httpx.TransportError, ValueError, KeyError, IndexError) as e:
+                # Timeouts, resets, malformed bodies
+                error = e
+
+            attempt += 1
+            if attempt >= MAX_ATTEMPTS or not self._budget.try_spend():
+                print(f"LLM Error: giving up after {attempt} attempt(s): {error}")
+                raise LLMError(str(error)) from error
+
+            delay = retry_after if retry_after is not None else random.uniform(
+                0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+            )
+            await asyncio.sleep(min(delay, RETRY_MAX_DELAY))
 
 # Factory
 def get_llm_provider(env: str = "dev", api_key: str = "") -> LLMProvider:
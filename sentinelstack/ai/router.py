@@ -1,8 +1,37 @@
-from fastapi import APIRouter
+from typing import AsyncIterator
+from fastapi import APIRouter, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sentinelstack.ai.service import ai_service
+from sentinelstack.ai.llm import LLMError
 
 router = APIRouter(prefix="/ai", tags=["AI Insights"])
 
 @router.get("/insight")
-async def get_insight(minutes: int = 15):
-    return await ai_service.analyze_recent_traffic(minutes)
+async def get_insight(minutes: int = Query(15, ge=1, le=1440)):
+    """
+    LLM review of recent traffic.
+    Streams the JSON answer as the model writes it; repeat requests within
+    the same minute are served from cache.
+    """
+    cached = await ai_service.get_cached_insight(minutes)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    # Pull the first chunk before committing to a 200, so provider
+    # failures still surface as a proper error status
+    chunks = ai_service.stream_insight(minutes)
+    try:
+        first = await chunks.__anext__()
+    except StopAsyncIteration:
+        first = ""
+    except LLMError as e:
+        # Provider errors can carry upstream bodies; keep them in the server log
+        print(f"ERROR:   AI insight failed: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="AI provider unavailable")
+
+    async def body() -> AsyncIterator[str]:
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return StreamingResponse(body(), media_type="application/json")
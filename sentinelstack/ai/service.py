@@ -1,70 +1,133 @@
+import asyncio
 import datetime
-import json
+from typing import AsyncIterator, Dict, List, Optional
 from sqlalchemy import select, func, desc
-from sentinelstack.database import AsyncSessionLocal
+from sentinelstack.database import AsyncSessionLocal, read_session
 from sentinelstack.ai.llm import get_llm_provider, LLMProvider
 from sentinelstack.config import settings
-from sentinelstack.cache import redis_client
+from sentinelstack.cache import status_cache, insight_cache
+from sentinelstack import serialization
 from sentinelstack.incidents.models import Incident
 from sentinelstack.aggregation.models import RequestMetric
+from sentinelstack.stats.service import stats_service
+
+# Insight Context Configuration
+INSIGHT_TOP_K = 10           # Endpoints kept per ranking (by errors, by p95)
+CONTEXT_TOKEN_BUDGET = 1000  # Approximate tokens of context sent with each insight
+CHARS_PER_TOKEN = 4          # Rough size of a token in compact JSON
 
 class AIService:
     def __init__(self):
-        # Initialize LLM based on environment
-        api_key = getattr(settings, "OPENAI_API_KEY", "")
-        self.llm: LLMProvider = get_llm_provider(
-            env=settings.ENV,
-            api_key=api_key
-        )
+        # The provider is built by the lifespan (start), or on first use,
+        # so importing this module never constructs an HTTP client
+        self._llm: Optional[LLMProvider] = None
+
+    def start(self):
+        """Build the LLM provider. Called from the lifespan; first use builds it otherwise."""
+        if self._llm is None:
+            # Initialize LLM based on environment
+            api_key = getattr(settings, "OPENAI_API_KEY", "")
+            self._llm = get_llm_provider(
+                env=settings.ENV,
+                api_key=api_key
+            )
+
+    @property
+    def llm(self) -> LLMProvider:
+        self.start()
+        return self._llm
+
+    @llm.setter
+    def llm(self, provider: LLMProvider):
+        self._llm = provider
+
+    async def close(self):
+        close_llm = getattr(self._llm, "aclose", None)
+        if close_llm:
+            await close_llm()
 
     async def get_system_status(self) -> dict:
+        """
+        Served from the two-tier status cache; invalidated whenever an incident
+        opens, escalates, resolves or receives its analysis.
+        """
+        return await status_cache.get_or_load("current", self._load_system_status)
+
+    async def _load_system_status(self) -> dict:
         """
         Single Source of Truth Check.
         1. Check specific Incident Table.
-        2. If Incident -> Generate/Fetch Analysis.
+        2. If Incident -> Return its stored analysis (pending until the worker fills it in).
         3. If Healthy -> Return Summary Stats.
+        Never calls the LLM: analysis is produced off the request path by ai/worker.py.
+        Reads the primary: this runs right after an invalidation, and a lagging
+        replica would put the pre-change state back into the cache.
         """
         async with AsyncSessionLocal() as db:
             # 1. Check for Active Incident
             stmt = select(Incident).where(Incident.status == "active").order_by(desc(Incident.start_time)).limit(1)
-            incident = (await db.execute(stmt)).scalar_one_or_none()
-
-            if not incident:
-                return {
-                    "health": "operational",
-                    "summary": "All systems healthy. No active incidents.",
-                    "details": None
-                }
-
-            # 2. Incident Found - Contextualize
-            # Get metrics from the start of the incident
-            metrics_stmt = (
-                select(RequestMetric)
-                .where(RequestMetric.bucket_time >= incident.start_time)
-                .order_by(desc(RequestMetric.bucket_time))
-                .limit(10) # Last 10 minutes of data
-            )
-            metrics = (await db.execute(metrics_stmt)).scalars().all()
-            
-            # 3. Check if Analysis Exists/Fresh
-            # In a real system, we'd store the analysis in the DB to avoid re-generating.
-            # Here we cache it effectively.
-            cache_key = f"incident_analysis:{incident.id}"
-            cached = await redis_client.get(cache_key)
-            if cached:
-                analysis = json.loads(cached)
-            else:
-                # 4. Generate Fresh Analysis (Expensive)
-                analysis = await self._generate_analysis(incident, metrics)
-                await redis_client.setex(cache_key, 300, json.dumps(analysis))
+            incident = (await db.execute(stmt, execution_options={"query_name": "ai.active_incident"})).scalar_one_or_none()
 
+        if not incident:
             return {
-                "health": "critical" if incident.severity == "critical" else "degraded",
-                "summary": incident.description,
-                "incident_id": incident.id,
-                "analysis": analysis
+                "health": "operational",
+                "summary": "All systems healthy. No active incidents.",
+                "details": None
             }
 
+        # 2. Incident Found - Serve whatever analysis is stored
+        return {
+            "health": "critical" if incident.severity == "critical" else "degraded",
+            "summary": incident.description,
+            "incident_id": incident.id,
+            "analysis": serialization.loads(incident.ai_summary) if incident.ai_summary else None,
+            "analysis_status": "ready" if incident.ai_summary else "pending"
+        }
+
+    async def analyze_incident(self, incident_id: int) -> bool:
+        """
+        Background job: generate the analysis for one incident and store it on the row.
+        Returns False if the incident is gone or already resolved.
+        No session is open during the LLM call: it can take tens of seconds, and
+        incidents are exactly when the request path needs every pooled connection.
+        """
+        # 1. Load the incident (primary), then let its connection go
+        async with AsyncSessionLocal() as db:
+            incident = await db.get(Incident, incident_id)
+        if incident is None or incident.status != "active":
+            return False
+
+        # 2. Metrics from the start of the incident, for the affected endpoint only.
+        # A range scan, so it goes to the replica
+        metrics_stmt = (
+            select(RequestMetric)
+            .where(RequestMetric.bucket_time >= incident.start_time)
+            .order_by(desc(RequestMetric.bucket_time))
+            .limit(10) # Last 10 buckets of data
+        )
+        if incident.endpoint:
+            method, _, path = incident.endpoint.partition(" ")
+            metrics_stmt = metrics_stmt.where(RequestMetric.method == method, RequestMetric.path == path)
+        async with read_session() as read_db:
+            metrics = (await read_db.execute(metrics_stmt, execution_options={"query_name": "ai.incident_metrics"})).scalars().all()
+
+        # 3. Expensive: runs in the worker pool, never in a request, and holds no connection
+        analysis = await self._generate_analysis(incident, metrics)
+
+        # 4. Short write. Re-read the row: it may have resolved while the LLM ran
+        async with AsyncSessionLocal() as db:
+            incident = await db.get(Incident, incident_id)
+            if incident is None or incident.status != "active":
+                return False
+            incident.ai_summary = serialization.dumps_str(analysis)
+            incident.ai_action_items = serialization.dumps_str(
+                analysis.get("mitigation_steps") or analysis.get("action_items") or []
+            )
+            await db.commit()
+
+        await status_cache.invalidate("current")
+        return True
+
     async def _generate_analysis(self, incident: Incident, metrics: list[RequestMetric]) -> dict:
         """
         Private: Asks LLM to explain the incident using aggregated metrics.
@@ -93,13 +156,84 @@ class AIService:
             "recent_metrics": formatted_metrics
         }
 
-        try:
-            return await self.llm.generate_insight(system_prompt, context)
-        except Exception as e:
-             return {
-                "explanation": "AI Analysis Failed",
-                "reason": str(e)
+        # Failures propagate: nothing is stored, and the worker's sweep retries later
+        return await self.llm.generate_insight(system_prompt, context)
+
+    async def build_traffic_context(self, minutes: int) -> Dict:
+        """
+        Compact LLM context for a window, read from the rollup tiers and the
+        per-endpoint breakdown (never raw logs). Keeps the top-K endpoints by
+        errors and by p95, then drops the least relevant rows until the JSON
+        fits CONTEXT_TOKEN_BUDGET.
+        """
+        summary, by_errors, by_latency = await asyncio.gather(
+            stats_service.get_dashboard_metrics(minutes),
+            stats_service.get_endpoint_breakdown(minutes, sort="errors", limit=INSIGHT_TOP_K),
+            stats_service.get_endpoint_breakdown(minutes, sort="p95", limit=INSIGHT_TOP_K)
+        )
+
+        errors: List[Dict] = []
+        for row in by_errors["endpoints"]:
+            if row["errors"] > 0:
+                errors.append({
+                    "endpoint": f"{row['method']} {row['path']}",
+                    "count": row["errors"],
+                    "rate_pct": row["error_rate_percent"]
+                })
+        slowest = [
+            {
+                "endpoint": f"{row['method']} {row['path']}",
+                "p95_ms": round(row["p95_latency_ms"]),
+                "requests": row["requests"]
             }
+            for row in by_latency["endpoints"]
+        ]
+
+        context = {
+            "window_minutes": minutes,
+            "totals": {key: value for key, value in summary.items() if key != "window_minutes"},
+            "errors": errors,
+            "slowest": slowest
+        }
+
+        # Lists are ranked, so trimming from the tail drops the least relevant rows first
+        budget_chars = CONTEXT_TOKEN_BUDGET * CHARS_PER_TOKEN
+        while len(serialization.dumps(context)) > budget_chars and (errors or slowest):
+            (errors if len(errors) >= len(slowest) else slowest).pop()
+        return context
+
+    def insight_cache_key(self, minutes: int) -> str:
+        # One entry per window per minute: buckets (and so answers) change once a minute
+        return f"{minutes}:{datetime.datetime.utcnow():%Y%m%d%H%M}"
+
+    async def get_cached_insight(self, minutes: int) -> Optional[str]:
+        return await insight_cache.get(self.insight_cache_key(minutes))
+
+    async def stream_insight(self, minutes: int) -> AsyncIterator[str]:
+        """
+        Streams the LLM's JSON answer for the last `minutes` as it is produced.
+        The complete answer is cached for the rest of the minute.
+        """
+        cache_key = self.insight_cache_key(minutes)
+        context = await self.build_traffic_context(minutes)
+        system_prompt = (
+            "You are SentinelAI, an automated SRE responder. "
+            "Review the traffic summary for the window provided and flag anything unusual.\n"
+            "Output JSON with keys: 'summary', 'analysis', 'action_items', 'severity'."
+        )
+
+        chunks: List[str] = []
+        async for chunk in self.llm.stream_insight(system_prompt, context):
+            chunks.append(chunk)
+            yield chunk
+
+        # Only complete, well-formed answers are cached
+        text = "".join(chunks)
+        try:
+            serialization.loads(text)
+        except ValueError:
+            return
+        await insight_cache.set(cache_key, text)
 
 # Global Instance
 ai_service = AIService()
\ No newline at end of file
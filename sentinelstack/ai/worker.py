@@ -0,0 +1,98 @@
+import asyncio
+from typing import Set
+from sqlalchemy import select
+from sentinelstack.config import settings
+from sentinelstack.database import read_session
+from sentinelstack.cache import redis_client
+from sentinelstack.incidents.models import Incident
+from sentinelstack.ai.service import ai_service
+from sentinelstack.stats.stream import event_broadcaster
+
+# Configuration
+WORKER_COUNT = 2        # Concurrent LLM calls per process
+QUEUE_SIZE = 100        # Pending incidents before new jobs are dropped (the sweep recovers them)
+SWEEP_INTERVAL = 60.0   # Seconds between scans for active incidents still missing analysis
+CLAIM_TTL = 120         # Seconds. Upper bound on one analysis; keeps replicas from duplicating work
+
+class AnalysisQueue:
+    """
+    Background AI analysis for incidents.
+    IncidentService enqueues an incident when it opens or escalates; a small
+    pool of workers calls the LLM and stores the result on the incident row.
+    Status requests only ever read that stored result.
+    """
+    def __init__(self):
+        self.queue: asyncio.Queue[int] = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.pending: Set[int] = set()  # Queued but not yet started
+        self.is_running = False
+
+    def enqueue(self, incident_id: int):
+        """Non-blocking. Repeat requests for an incident that is still queued collapse into one job."""
+        if not settings.ENABLE_AI or incident_id in self.pending:
+            return
+        try:
+            self.queue.put_nowait(incident_id)
+            self.pending.add(incident_id)
+        except asyncio.QueueFull:
+            # Trade-off: drop now, the periodic sweep re-queues it
+            print(f"WARN:    AI Analysis Queue Full, deferring Incident {incident_id}")
+
+    async def worker(self):
+        """Runs the worker pool plus the recovery sweep until shutdown."""
+        self.is_running = True
+        print(f"INFO:    AI Analysis Workers Started ({WORKER_COUNT})")
+        consumers = [asyncio.create_task(self._consume()) for _ in range(WORKER_COUNT)]
+        try:
+            while self.is_running:
+                await self._sweep()
+                await asyncio.sleep(SWEEP_INTERVAL)
+        finally:
+            for consumer in consumers:
+                consumer.cancel()
+
+    async def _consume(self):
+        while True:
+            incident_id = await self.queue.get()
+            # Removed before running, so an escalation during analysis queues a fresh job
+            self.pending.discard(incident_id)
+            try:
+                await self._run(incident_id)
+            except Exception as e:
+                print(f"ERROR:   AI Analysis Failed for Incident {incident_id}: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, incident_id: int):
+        # 1. Claim the incident so only one replica pays for the LLM call
+        claim_key = f"ai:analysis:claim:{incident_id}"
+        try:
+            if not await redis_client.set(claim_key, "1", nx=True, ex=CLAIM_TTL):
+                return
+        except Exception as e:
+            # Redis down: a duplicate analysis is better than none
+            print(f"ERROR:   AI Analysis Claim Failed: {e}")
+
+        # 2. Generate + store, then tell dashboards to refetch status
+        try:
+            if await ai_service.analyze_incident(incident_id):
+                print(f"INFO:    AI Analysis Stored for Incident {incident_id}")
+                await event_broadcaster.publish("analysis", {"incident_id": incident_id})
+        finally:
+            try:
+                await redis_client.delete(claim_key)
+            except Exception:
+                pass  # Expires on its own
+
+    async def _sweep(self):
+        """Re-queue active incidents without analysis (dropped jobs, failures, restarts)."""
+        try:
+            # Replica is fine: a missed or already-analysed id is caught next sweep / skipped by the worker
+            async with read_session() as db:
+                stmt = select(Incident.id).where(Incident.status == "active", Incident.ai_summary.is_(None))
+                for incident_id in (await db.execute(stmt, execution_options={"query_name": "ai.pending_analysis"})).scalars().all():
+                    self.enqueue(incident_id)
+        except Exception as e:
+            print(f"ERROR:   AI Analysis Sweep Failed: {e}")
+
+# Global Instance
+analysis_queue = AnalysisQueue()
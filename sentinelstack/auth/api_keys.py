@@ -0,0 +1,138 @@
+import hashlib
+import hmac
+import secrets
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from sqlalchemy import select
+from sentinelstack.config import settings
+from sentinelstack.database import AsyncSessionLocal
+from sentinelstack.cache import TwoTierCache
+from sentinelstack.auth.models import ApiKey
+
+# Configuration
+KEY_SCHEME = "sk"
+PREFIX_BYTES = 6               # 12 hex chars: public, indexed, unique
+SECRET_BYTES = 32
+API_KEY_TTL = 300.0            # Seconds. Revocations are pushed; the TTL only bounds missed messages
+API_KEY_LOCAL_SIZE = 10_000
+NEGATIVE_TTL = 30.0            # Seconds an unknown/revoked prefix is remembered, in this process only
+FAILED_AUTH_LIMIT = 20         # Invalid keys per client IP per window before we stop looking them up
+FAILED_AUTH_WINDOW = 60.0      # Seconds
+
+def hash_api_key(api_key: str) -> str:
+    """HMAC-SHA256 of the full key. Keys are high-entropy, so a fast keyed hash is enough (no bcrypt)."""
+    secret = (settings.API_KEY_SECRET or settings.SECRET_KEY).encode()
+    return hmac.new(secret, api_key.encode(), hashlib.sha256).hexdigest()
+
+def generate_api_key() -> Tuple[str, str, str]:
+    """Returns (full_key, prefix, key_hash). Only prefix and hash are stored."""
+    prefix = secrets.token_hex(PREFIX_BYTES)
+    api_key = f"{KEY_SCHEME}_{prefix}_{secrets.token_urlsafe(SECRET_BYTES)}"
+    return api_key, prefix, hash_api_key(api_key)
+
+def parse_prefix(api_key: str) -> Optional[str]:
+    scheme, _, rest = api_key.partition("_")
+    prefix, _, secret = rest.partition("_")
+    if scheme != KEY_SCHEME or len(prefix) != PREFIX_BYTES * 2 or not secret:
+        return None
+    return prefix
+
+class _UnknownKey(Exception):
+    """Raised through the shared cache so a missing prefix is never stored there."""
+
+class ApiKeyCache:
+    """
+    Prefix -> {"hash", "user_id", "rate_limit"} for live keys.
+    Authenticating a cached key is an LRU lookup plus one HMAC: microseconds,
+    no database. Revocation invalidates the prefix on every replica.
+    Unknown prefixes are client-chosen, so they are remembered only briefly in
+    a bounded local LRU (never in Redis), and a client IP sending too many
+    invalid keys is refused before any lookup.
+    """
+    def __init__(self):
+        self.cache = TwoTierCache(
+            "api_key",
+            ttl=API_KEY_TTL,
+            stale_ttl=0.0,  # Never honour a revoked key from a stale entry
+            local_size=API_KEY_LOCAL_SIZE
+        )
+        self.unknown: "OrderedDict[str, float]" = OrderedDict()             # prefix -> expires_at
+        self.failures: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()  # client_ip -> (count, window start)
+
+    async def authenticate(self, api_key: str, client_ip: Optional[str] = None) -> Optional[dict]:
+        """The key's record if valid, else None (counted against `client_ip`)."""
+        record = await self._lookup(api_key)
+        if record is None and client_ip:
+            self._record_failure(client_ip)
+        return record
+
+    async def _lookup(self, api_key: str) -> Optional[dict]:
+        prefix = parse_prefix(api_key)
+        if prefix is None:
+            return None
+        expires_at = self.unknown.get(prefix)
+        if expires_at is not None:
+            if time.monotonic() < expires_at:
+                return None
+            del self.unknown[prefix]
+        try:
+            record = await self.cache.get_or_load(prefix, lambda: self._load_known(prefix))
+        except _UnknownKey:
+            self._remember_unknown(prefix)
+            return None
+        if not hmac.compare_digest(record["hash"], hash_api_key(api_key)):
+            return None
+        return {**record, "prefix": prefix}
+
+    async def _load_known(self, prefix: str) -> dict:
+        record = await self._load(prefix)
+        if record is None:
+            raise _UnknownKey(prefix)
+        return record
+
+    async def _load(self, prefix: str) -> Optional[dict]:
+        async with AsyncSessionLocal() as db:
+            stmt = (
+                select(ApiKey.key_hash, ApiKey.user_id, ApiKey.rate_limit)
+                .where(ApiKey.prefix == prefix, ApiKey.revoked_at.is_(None))
+            )
+            row = (await db.execute(stmt, execution_options={"query_name": "auth.api_key"})).one_or_none()
+        if row is None:
+            return None
+        return {"hash": row.key_hash, "user_id": str(row.user_id), "rate_limit": row.rate_limit}
+
+    def _remember_unknown(self, prefix: str):
+        self.unknown[prefix] = time.monotonic() + NEGATIVE_TTL
+        self.unknown.move_to_end(prefix)
+        while len(self.unknown) > API_KEY_LOCAL_SIZE:
+            self.unknown.popitem(last=False)
+
+    # --- Failed attempts ---------------------------------------------
+
+    def is_throttled(self, client_ip: str) -> bool:
+        """True while `client_ip` has sent FAILED_AUTH_LIMIT invalid keys within the window."""
+        entry = self.failures.get(client_ip)
+        if entry is None:
+            return False
+        count, started = entry
+        return count >= FAILED_AUTH_LIMIT and time.monotonic() - started < FAILED_AUTH_WINDOW
+
+    def _record_failure(self, client_ip: str):
+        now = time.monotonic()
+        count, started = self.failures.pop(client_ip, (0, now))
+        if now - started >= FAILED_AUTH_WINDOW:
+            count, started = 0, now
+        self.failures[client_ip] = (count + 1, started)
+        while len(self.failures) > API_KEY_LOCAL_SIZE:
+            self.failures.popitem(last=False)
+
+    async def invalidate(self, prefix: str):
+        self.unknown.pop(prefix, None)
+        await self.cache.invalidate(prefix)
+
+    async def worker(self):
+        await self.cache.worker()
+
+# Global Instance
+api_key_cache = ApiKeyCache()
@@ -1,6 +1,6 @@
 import uuid
 import datetime
-from sqlalchemy import Column, String, Boolean, DateTime
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, ForeignKey
 from sqlalchemy.dialects.postgresql import UUID
 from sentinelstack.database import Base
 
@@ -16,8 +16,30 @@ class User(Base):
     
     # Authorization & Status
     role = Column(String, default="user", nullable=False)  # 'admin' or 'user'
+    tier = Column(String, default="free", server_default="free", nullable=False)  # Rate limit plan: 'free', 'pro', 'enterprise'
     is_active = Column(Boolean, default=True, nullable=False)
     
     # Audit Trail
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class ApiKey(Base):
+    """
+    Machine credentials: `sk_<prefix>_<secret>`.
+    Only the public prefix (unique index, used for lookup) and an HMAC-SHA256
+    of the full key are stored; the key itself is shown once at creation.
+    """
+    __tablename__ = "api_keys"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+
+    name = Column(String(100), nullable=False)
+    prefix = Column(String(16), unique=True, index=True, nullable=False)
+    key_hash = Column(String(64), nullable=False)  # hex HMAC-SHA256
+
+    # Quota: requests per minute for this key (None = API_KEY_LIMIT default)
+    rate_limit = Column(Integer, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    revoked_at = Column(DateTime, nullable=True)
@@ -0,0 +1,51 @@
+import uuid
+from typing import Optional
+from sqlalchemy import select
+from sentinelstack.database import AsyncSessionLocal
+from sentinelstack.cache import TwoTierCache
+from sentinelstack.auth.models import User
+
+# Configuration
+PRINCIPAL_TTL = 300.0         # Seconds. Invalidation is pushed; the TTL only bounds missed messages
+PRINCIPAL_LOCAL_SIZE = 10_000 # Users held per process
+
+class PrincipalCache:
+    """
+    Account state the gateway needs on every authenticated request:
+    {"active": bool, "role": str, "tier": str}, keyed by user id.
+    Hits are served from an in-process LRU (then Redis); Postgres is read
+    only on a cold miss. AuthService invalidates a user whenever it changes
+    them, and the change reaches every replica through Redis pub/sub.
+    """
+    def __init__(self):
+        self.cache = TwoTierCache(
+            "principal",
+            ttl=PRINCIPAL_TTL,
+            stale_ttl=0.0,  # Never serve stale account state
+            local_size=PRINCIPAL_LOCAL_SIZE
+        )
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        """None if the user no longer exists."""
+        return await self.cache.get_or_load(user_id, lambda: self._load(user_id))
+
+    async def _load(self, user_id: str) -> Optional[dict]:
+        try:
+            key = uuid.UUID(user_id)
+        except ValueError:
+            return None
+        async with AsyncSessionLocal() as db:
+            stmt = select(User.is_active, User.role, User.tier).where(User.id == key)
+            row = (await db.execute(stmt, execution_options={"query_name": "auth.principal"})).one_or_none()
+        if row is None:
+            return None
+        return {"active": row.is_active, "role": row.role, "tier": row.tier}
+
+    async def invalidate(self, user_id: str):
+        await self.cache.invalidate(str(user_id))
+
+    async def worker(self):
+        await self.cache.worker()
+
+# Global Instance
+principal_cache = PrincipalCache()
@@ -1,14 +1,38 @@
+import uuid
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from sentinelstack.database import get_db
-from sentinelstack.auth.schemas import UserCreate, UserResponse, Token
+from typing import List
+from sentinelstack.auth.schemas import (
+    UserCreate, UserUpdate, UserResponse, Token, ApiKeyCreate, ApiKeyResponse, ApiKeyCreated
+)
 from sentinelstack.auth.service import AuthService
 from sentinelstack.auth.security import create_access_token
+from sentinelstack.gateway.context import get_context
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+def require_user() -> uuid.UUID:
+    ctx = get_context()
+    if not ctx or not ctx.user_id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return uuid.UUID(ctx.user_id)
+
+def require_session() -> uuid.UUID:
+    # Key management needs a login: a leaked API key must not be able to mint or revoke keys
+    user_id = require_user()
+    if get_context().api_key:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="API keys cannot manage API keys")
+    return user_id
+
+def require_admin():
+    # Role was resolved by the gateway from the principal cache (not trusted from the token)
+    ctx = get_context()
+    if not ctx or ctx.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def signup(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     auth_service = AuthService(db)
@@ -27,4 +51,25 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSessi
         )
     
     access_token = create_access_token(subject=user.id, role=user.role)
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.patch("/users/{user_id}", response_model=UserResponse, dependencies=[Depends(require_admin)])
+async def update_user(user_id: uuid.UUID, changes: UserUpdate, db: AsyncSession = Depends(get_db)):
+    auth_service = AuthService(db)
+    return await auth_service.update_user(user_id, changes)
+
+@router.post("/api-keys", response_model=ApiKeyCreated, status_code=status.HTTP_201_CREATED)
+async def create_api_key(key_in: ApiKeyCreate, user_id: uuid.UUID = Depends(require_session), db: AsyncSession = Depends(get_db)):
+    auth_service = AuthService(db)
+    record, api_key = await auth_service.create_api_key(user_id, key_in)
+    return ApiKeyCreated(**ApiKeyResponse.model_validate(record).model_dump(), api_key=api_key)
+
+@router.get("/api-keys", response_model=List[ApiKeyResponse])
+async def list_api_keys(user_id: uuid.UUID = Depends(require_session), db: AsyncSession = Depends(get_db)):
+    auth_service = AuthService(db)
+    return await auth_service.list_api_keys(user_id)
+
+@router.delete("/api-keys/{prefix}", response_model=ApiKeyResponse)
+async def revoke_api_key(prefix: str, user_id: uuid.UUID = Depends(require_session), db: AsyncSession = Depends(get_db)):
+    auth_service = AuthService(db)
+    return await auth_service.revoke_api_key(user_id, prefix, is_admin=get_context().role == "admin")
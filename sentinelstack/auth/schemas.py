@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr, UUID4
+from pydantic import BaseModel, EmailStr, UUID4, Field
 from datetime import datetime
 from typing import Optional
+from sentinelstack.rate_limit.service import API_KEY_MAX_LIMIT
 
 # Shared properties
 class UserBase(BaseModel):
@@ -15,11 +16,36 @@ class UserResponse(UserBase):
     id: UUID4
     is_active: bool
     role: str
+    tier: str
     created_at: datetime
 
     class Config:
         from_attributes = True
 
+# Properties an admin may change (None = leave as is)
+class UserUpdate(BaseModel):
+    is_active: Optional[bool] = None
+    role: Optional[str] = None
+    tier: Optional[str] = None
+
+# API keys
+class ApiKeyCreate(BaseModel):
+    name: str = Field(min_length=1, max_length=100)
+    rate_limit: Optional[int] = Field(default=None, ge=1, le=API_KEY_MAX_LIMIT)  # req/min; None = default quota
+
+class ApiKeyResponse(BaseModel):
+    prefix: str
+    name: str
+    rate_limit: Optional[int]
+    created_at: datetime
+    revoked_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ApiKeyCreated(ApiKeyResponse):
+    api_key: str  # Shown once; only its HMAC is stored
+
 # Token schema
 class Token(BaseModel):
     access_token: str
@@ -1,9 +1,25 @@
+import uuid
+import datetime
+from typing import List, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from fastapi import HTTPException, status
-from sentinelstack.auth.models import User
-from sentinelstack.auth.schemas import UserCreate
-from sentinelstack.auth.security import get_password_hash, verify_password, create_access_token
+from sentinelstack.auth.models import User, ApiKey
+from sentinelstack.auth.schemas import UserCreate, UserUpdate, ApiKeyCreate
+from sentinelstack.auth.api_keys import generate_api_key, api_key_cache
+from sentinelstack.auth.security import password_hasher, HasherSaturated, create_access_token
+from sentinelstack.auth.principals import principal_cache
+from sentinelstack.rate_limit.service import TIER_LIMITS
+
+ROLES = ("admin", "user")
+
+def _busy() -> HTTPException:
+    # Hashing executor saturated: shed now rather than queue into a timeout
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication is busy, please retry",
+        headers={"Retry-After": "1"}
+    )
 
 class AuthService:
     def __init__(self, db: AsyncSession):
@@ -19,10 +35,15 @@ class AuthService:
                 detail="Email already registered"
             )
         
-        # Create new user
+        # Create new user (hashing runs off the event loop)
+        try:
+            hashed_password = await password_hasher.hash(user_in.password)
+        except HasherSaturated:
+            raise _busy()
+
         new_user = User(
             email=user_in.email,
-            hashed_password=get_password_hash(user_in.password),
+            hashed_password=hashed_password,
             role="user", # Default role
             is_active=True
         )
@@ -37,8 +58,76 @@ class AuthService:
         result = await self.db.execute(query)
         user = result.scalar_one_or_none()
         
-        # Verify credentials
-        if not user or not verify_password(password, user.hashed_password):
+        if not user:
             return None
-            
-        return user
\ No newline at end of file
+
+        # Verify credentials (off the event loop)
+        try:
+            if not await password_hasher.verify(password, user.hashed_password):
+                return None
+        except HasherSaturated:
+            raise _busy()
+
+        # Cost factor changed since this hash was made: upgrade it transparently
+        if password_hasher.needs_rehash(user.hashed_password):
+            try:
+                user.hashed_password = await password_hasher.hash(password)
+                await self.db.commit()
+            except HasherSaturated:
+                pass  # Best effort; retried on the next login
+
+        return user
+
+    async def update_user(self, user_id: uuid.UUID, changes: UserUpdate) -> User:
+        """
+        Admin change to account state. Every replica's gateway sees it on the
+        next request: the principal cache entry is invalidated cluster-wide.
+        """
+        if changes.role is not None and changes.role not in ROLES:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown role: {changes.role}")
+        if changes.tier is not None and changes.tier not in TIER_LIMITS:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown tier: {changes.tier}")
+
+        user = await self.db.get(User, user_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+        for field, value in changes.model_dump(exclude_none=True).items():
+            setattr(user, field, value)
+        await self.db.commit()
+        await self.db.refresh(user)
+
+        await principal_cache.invalidate(user.id)
+        return user
+
+    async def create_api_key(self, user_id: uuid.UUID, key_in: ApiKeyCreate) -> Tuple[ApiKey, str]:
+        """Returns the stored key and the full secret (the only time it is available)."""
+        api_key, prefix, key_hash = generate_api_key()
+        record = ApiKey(
+            user_id=user_id,
+            name=key_in.name,
+            prefix=prefix,
+            key_hash=key_hash,
+            rate_limit=key_in.rate_limit
+        )
+        self.db.add(record)
+        await self.db.commit()
+        await self.db.refresh(record)
+        return record, api_key
+
+    async def list_api_keys(self, user_id: uuid.UUID) -> List[ApiKey]:
+        query = select(ApiKey).where(ApiKey.user_id == user_id).order_by(ApiKey.created_at)
+        return list((await self.db.execute(query)).scalars().all())
+
+    async def revoke_api_key(self, user_id: uuid.UUID, prefix: str, is_admin: bool = False) -> ApiKey:
+        query = select(ApiKey).where(ApiKey.prefix == prefix)
+        record = (await self.db.execute(query)).scalar_one_or_none()
+        if not record or (record.user_id != user_id and not is_admin):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="API key not found")
+
+        if record.revoked_at is None:
+            record.revoked_at = datetime.datetime.utcnow()
+            await self.db.commit()
+        # Broadcast: every replica drops the cached key before its next request
+        await api_key_cache.invalidate(prefix)
+        return record
@@ -1,5 +1,18 @@
+import asyncio
+import math
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
 import redis.asyncio as redis
 from sentinelstack.config import settings
+from sentinelstack import serialization
+from sentinelstack.singleflight import SingleFlight
+from sentinelstack.monitoring.metrics import (
+    REDIS_CLIENT_CACHE_REQUESTS,
+    REDIS_CLIENT_CACHE_INVALIDATIONS,
+    REDIS_CLIENT_CACHE_ENTRIES
+)
 
 
 redis_client = redis.from_url(
@@ -8,6 +21,422 @@ redis_client = redis.from_url(
     decode_responses=True,
 )
 
+# Same server, raw bytes in and out: log records, cached HTTP bodies
+redis_binary_client = redis.from_url(settings.REDIS_URL)
+
 async def get_client():
     return redis_client
 
+RECONNECT_DELAY = 2.0  # Seconds before a dropped background subscription reconnects
+
+# Client-Side Cache Configuration
+TRACKED_PREFIXES = ("cache:", "incident:rules")  # Keys mirrored in process memory
+CLIENT_CACHE_SIZE = 10_000      # Entries per process
+TRACKING_CHECK_INTERVAL = 5.0   # Seconds of silence before pinging the tracking connection
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+_NOT_CACHED = object()
+
+class ClientSideCache:
+    """
+    Process-memory copies of hot Redis reads, kept coherent by server-assisted
+    client tracking: Redis broadcasts the name of every key that changes under
+    TRACKED_PREFIXES (writes, deletes, expiry, eviction) and the copy is dropped.
+    1. Values, including "missing", are kept only while the invalidation stream
+       is connected; otherwise every read goes to Redis.
+    2. A read whose key is invalidated while it is in flight is not stored.
+    3. Losing the stream flushes everything, since changes may have been missed.
+    Invalidations are redirected to a subscribed RESP2 connection: the shared
+    asyncio client has no RESP3 push-message handler.
+    """
+    def __init__(self, prefixes: Iterable[str] = TRACKED_PREFIXES, size: int = CLIENT_CACHE_SIZE):
+        self.prefixes = tuple(prefixes)
+        self.size = size
+        self.local: "OrderedDict[Tuple[str, Optional[str]], Any]" = OrderedDict()  # (key, hash field) -> value
+        self.tracking = False
+        self.is_running = False
+        self._fields: Dict[str, Set[Optional[str]]] = {}  # key -> cached slots, for invalidation
+        self._reading: Dict[str, int] = {}  # key -> reads in flight
+        self._dirty: Set[str] = set()       # Invalidated while a read was in flight
+
+    # --- Reads -------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._read(key, None)
+
+    async def hget(self, key: str, field: str) -> Optional[str]:
+        return await self._read(key, field)
+
+    async def _read(self, key: str, field: Optional[str]) -> Optional[str]:
+        if not (self.tracking and key.startswith(self.prefixes)):
+            return await self._fetch(key, field)
+
+        slot = (key, field)
+        value = self.local.get(slot, _NOT_CACHED)
+        if value is not _NOT_CACHED:
+            self.local.move_to_end(slot)
+            REDIS_CLIENT_CACHE_REQUESTS.labels(result="hit").inc()
+            return value
+        REDIS_CLIENT_CACHE_REQUESTS.labels(result="miss").inc()
+
+        self._reading[key] = self._reading.get(key, 0) + 1
+        try:
+            value = await self._fetch(key, field)
+            if self.tracking and key not in self._dirty:
+                self._store(slot, value)
+            return value
+        finally:
+            remaining = self._reading.pop(key) - 1
+            if remaining:
+                self._reading[key] = remaining
+            else:
+                self._dirty.discard(key)
+
+    async def _fetch(self, key: str, field: Optional[str]) -> Optional[str]:
+        if field is None:
+            return await redis_client.get(key)
+        return await redis_client.hget(key, field)
+
+    def _store(self, slot: Tuple[str, Optional[str]], value: Optional[str]):
+        self.local[slot] = value
+        self.local.move_to_end(slot)
+        self._fields.setdefault(slot[0], set()).add(slot[1])
+        while len(self.local) > self.size:
+            (key, field), _ = self.local.popitem(last=False)
+            fields = self._fields.get(key)
+            if fields is not None:
+                fields.discard(field)
+                if not fields:
+                    del self._fields[key]
+        REDIS_CLIENT_CACHE_ENTRIES.set(len(self.local))
+
+    # --- Invalidation ------------------------------------------------
+
+    def forget(self, key: str):
+        """
+        Drop a key this process just wrote. Redis will report the change too,
+        but only after a round trip; this closes the read-your-writes gap.
+        """
+        if key in self._reading:
+            self._dirty.add(key)
+        for field in self._fields.pop(key, ()):
+            self.local.pop((key, field), None)
+        REDIS_CLIENT_CACHE_ENTRIES.set(len(self.local))
+
+    def flush(self):
+        self._dirty.update(self._reading)
+        self.local.clear()
+        self._fields.clear()
+        REDIS_CLIENT_CACHE_ENTRIES.set(0)
+
+    def _on_invalidate(self, message):
+        # ["message", "__redis__:invalidate", [key, ...]]; no keys means FLUSHALL/FLUSHDB
+        if not isinstance(message, list) or len(message) != 3 or message[0] != "message":
+            return
+        keys = message[2]
+        if keys is None:
+            REDIS_CLIENT_CACHE_INVALIDATIONS.labels(reason="flush").inc()
+            self.flush()
+            return
+        for key in keys:
+            REDIS_CLIENT_CACHE_INVALIDATIONS.labels(reason="key").inc()
+            self.forget(key)
+
+    async def worker(self):
+        """Background task: holds the tracking + invalidation connections."""
+        self.is_running = True
+        print(f"INFO:    Redis Client Tracking Started ({', '.join(self.prefixes)})")
+
+        while self.is_running:
+            pool = redis_client.connection_pool
+            listener = pool.make_connection()
+            tracker = pool.make_connection()
+            try:
+                # 1. Invalidation stream: a connection subscribed to the tracking channel
+                await listener.connect()
+                await listener.send_command("CLIENT", "ID")
+                listener_id = await listener.read_response()
+                await listener.send_command("SUBSCRIBE", INVALIDATE_CHANNEL)
+                await listener.read_response()
+
+                # 2. Broadcast mode: every change under our prefixes, whoever reads or writes it
+                prefix_args = [arg for prefix in self.prefixes for arg in ("PREFIX", prefix)]
+                await tracker.connect()
+                await tracker.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", listener_id, "BCAST", *prefix_args)
+                await tracker.read_response()
+                self.tracking = True
+
+                # 3. Apply invalidations. Tracking dies with its connection, so check
+                # that one whenever the stream is quiet
+                while self.is_running:
+                    message = await listener.read_response(timeout=TRACKING_CHECK_INTERVAL, disconnect_on_error=False)
+                    if message is None:
+                        await tracker.send_command("PING")
+                        await tracker.read_response()
+                        continue
+                    self._on_invalidate(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"ERROR:   Redis Client Tracking Failed: {e}")
+                self.tracking = False
+                REDIS_CLIENT_CACHE_INVALIDATIONS.labels(reason="flush").inc()
+                self.flush()
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                self.tracking = False
+                self.flush()
+                await listener.disconnect()
+                await tracker.disconnect()
+
+# Global Instance
+client_cache = ClientSideCache()
+
+# Two-Tier Cache Configuration
+LOCAL_CACHE_SIZE = 256   # Entries per process
+XFETCH_BETA = 1.0        # >1 refreshes earlier, <1 later
+LOCK_TTL = 30            # Seconds. Upper bound on one rebuild
+LOCK_WAIT = 2.0          # Seconds a miss waits for another replica's rebuild before building itself
+LOCK_POLL = 0.05
+VERSION_TTL = LOCK_TTL * 2  # Seconds. Outlives any rebuild that could have read an older version
+
+# Stores a rebuilt entry only if the key was not invalidated since the rebuild began
+CONDITIONAL_SET = """
+if (redis.call('GET', KEYS[2]) or '0') ~= ARGV[1] then return 0 end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+Entry = Tuple[Any, float, float]  # (value, expires_at, rebuild_seconds)
+
+class TwoTierCache:
+    """
+    In-process LRU in front of Redis for hot values that are expensive to build.
+    1. Local hits cost a dict lookup: no round trip, no parsing.
+    2. Before expiry, a caller refreshes early with probability rising as expiry
+       nears (XFetch), so busy keys are rebuilt by one caller instead of expiring.
+    3. After expiry, the stale value is served for `stale_ttl` while one
+       background refresh runs (stale-while-revalidate).
+    4. On a true miss, a Redis lock lets one replica rebuild; the rest wait
+       briefly for its result. Within a process, concurrent misses share one load.
+    invalidate() removes a key from Redis and from every replica's local tier.
+    It also bumps the key's version in Redis, and a rebuild stores its result
+    only if the version it read before loading is still current, so a load
+    that read the old state on another replica can't write it back.
+    """
+    def __init__(self, namespace: str, ttl: float, stale_ttl: float,
+                 local_size: int = LOCAL_CACHE_SIZE, beta: float = XFETCH_BETA):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.local_size = local_size
+        self.beta = beta
+        self.channel = f"cache:invalidate:{namespace}"
+        self.local: "OrderedDict[str, Entry]" = OrderedDict()
+        self.is_running = False
+        self._loading = SingleFlight(f"cache:{namespace}")
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self._epochs: Dict[str, int] = {}  # Bumped on invalidation; stale loads are discarded
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    def _version_key(self, key: str) -> str:
+        return self._redis_key(key) + ":version"
+
+    # --- Reads -------------------------------------------------------
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self.local.get(key)
+        if entry is not None:
+            self.local.move_to_end(key)
+        else:
+            entry = await self._remote_get(key)
+            if entry is not None:
+                self._local_set(key, entry)
+
+        if entry is not None:
+            value, expires_at, delta = entry
+            now = time.time()
+            if now < expires_at:
+                if self._refresh_early(now, expires_at, delta):
+                    self._refresh_in_background(key, loader)
+                return value
+            if now < expires_at + self.stale_ttl:
+                self._refresh_in_background(key, loader)
+                return value
+
+        return await self._load(key, loader, wait_for_peer=True)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Plain read of a fresh value, for callers that produce values incrementally."""
+        entry = self.local.get(key)
+        if entry is None:
+            entry = await self._remote_get(key)
+            if entry is not None:
+                self._local_set(key, entry)
+        if entry is None or time.time() >= entry[1]:
+            return None
+        return entry[0]
+
+    async def set(self, key: str, value: Any):
+        entry = (value, time.time() + self.ttl, 0.0)
+        self._local_set(key, entry)
+        await self._remote_set(key, entry)
+
+    def _refresh_early(self, now: float, expires_at: float, delta: float) -> bool:
+        # XFetch: now - delta * beta * ln(U) >= expiry, with U in (0, 1]
+        return now - delta * self.beta * math.log(1.0 - random.random()) >= expires_at
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Awaitable[Any]]):
+        if key in self._refreshing or key in self._loading:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._load(key, loader, wait_for_peer=False)
+            except Exception as e:
+                print(f"ERROR:   Cache refresh failed for {self._redis_key(key)}: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # --- Loads -------------------------------------------------------
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[Any]], wait_for_peer: bool) -> Any:
+        # Concurrent callers in this process share one load
+        return await self._loading.do(key, lambda: self._load_once(key, loader, wait_for_peer))
+
+    async def _load_once(self, key: str, loader: Callable[[], Awaitable[Any]], wait_for_peer: bool) -> Any:
+        # 1. One replica rebuilds at a time
+        lock_key = self._redis_key(key) + ":lock"
+        try:
+            locked = bool(await redis_client.set(lock_key, "1", nx=True, ex=LOCK_TTL))
+        except Exception as e:
+            print(f"ERROR:   Cache lock failed: {e}")
+            locked = None  # Redis down: build locally, nothing to release
+
+        if locked is False:
+            if not wait_for_peer:
+                # Background refresh already running elsewhere; keep serving what we have
+                return self.local.get(key, (None,))[0]
+            # 2. Wait for the lock holder's result
+            deadline = time.monotonic() + LOCK_WAIT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL)
+                entry = await self._remote_get(key)
+                if entry is not None and time.time() < entry[1]:
+                    self._local_set(key, entry)
+                    return entry[0]
+
+        # 3. Build it ourselves. The epoch catches invalidations seen by this
+        # process, the Redis version those made on other replicas
+        epoch = self._epochs.get(key, 0)
+        version = await self._remote_version(key)
+        try:
+            started = time.monotonic()
+            value = await loader()
+            entry = (value, time.time() + self.ttl, time.monotonic() - started)
+            if self._epochs.get(key, 0) == epoch:
+                self._local_set(key, entry)
+                await self._remote_set(key, entry, version)
+            return value
+        finally:
+            if locked:
+                try:
+                    await redis_client.delete(lock_key)
+                except Exception:
+                    pass  # Expires on its own
+
+    # --- Tiers -------------------------------------------------------
+
+    def _local_set(self, key: str, entry: Entry):
+        self.local[key] = entry
+        self.local.move_to_end(key)
+        while len(self.local) > self.local_size:
+            self.local.popitem(last=False)
+
+    async def _remote_get(self, key: str) -> Optional[Entry]:
+        try:
+            # Served from process memory while client tracking is connected
+            data = await client_cache.get(self._redis_key(key))
+        except Exception as e:
+            print(f"ERROR:   Cache read failed: {e}")
+            return None
+        if not data:
+            return None
+        value, expires_at, delta = serialization.loads(data)
+        return value, expires_at, delta
+
+    async def _remote_version(self, key: str) -> Optional[str]:
+        try:
+            return await redis_client.get(self._version_key(key)) or "0"
+        except Exception as e:
+            print(f"ERROR:   Cache version read failed: {e}")
+            return None
+
+    async def _remote_set(self, key: str, entry: Entry, version: Optional[str] = None):
+        """Unconditional write, or only while the key's version is still `version`."""
+        data = serialization.dumps_str(list(entry))
+        ex = math.ceil(self.ttl + self.stale_ttl)
+        try:
+            if version is None:
+                await redis_client.set(self._redis_key(key), data, ex=ex)
+            else:
+                await redis_client.eval(CONDITIONAL_SET, 2, self._redis_key(key), self._version_key(key), version, data, ex)
+            client_cache.forget(self._redis_key(key))
+        except Exception as e:
+            print(f"ERROR:   Cache write failed: {e}")
+
+    # --- Invalidation ------------------------------------------------
+
+    def _drop_local(self, key: str):
+        self._epochs[key] = self._epochs.get(key, 0) + 1
+        self.local.pop(key, None)
+
+    async def invalidate(self, key: str):
+        self._drop_local(key)
+        try:
+            # Version first: from here on, rebuilds that read the old state can't store it
+            await redis_client.incr(self._version_key(key))
+            await redis_client.expire(self._version_key(key), VERSION_TTL)
+            await redis_client.delete(self._redis_key(key))
+            client_cache.forget(self._redis_key(key))
+            await redis_client.publish(self.channel, key)
+        except Exception as e:
+            print(f"ERROR:   Cache invalidation failed: {e}")
+
+    async def worker(self):
+        """Background task: drops local entries invalidated by other replicas."""
+        self.is_running = True
+        print(f"INFO:    Cache Invalidation Listener Started ({self.namespace})")
+
+        while self.is_running:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # Invalidations may have been missed while disconnected
+                for key in list(self.local):
+                    self._drop_local(key)
+                while self.is_running:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message["type"] == "message":
+                        self._drop_local(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"ERROR:   Cache Invalidation Listener Failed: {e}")
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                await pubsub.aclose()
+
+# Global Instance
+# /stats/status payload: read by every dashboard viewer, changes only with incident state
+status_cache = TwoTierCache("status", ttl=30.0, stale_ttl=30.0)
+# /ai/insight results, keyed per window and minute (the data only changes once per bucket)
+insight_cache = TwoTierCache("insight", ttl=60.0, stale_ttl=0.0)
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import socket
+import uuid
+from sentinelstack.cache import redis_client
+from sentinelstack.monitoring.metrics import LEADER_LEASE_HELD
+
+# Configuration
+LEASE_TTL = 30           # Seconds. A crashed leader is replaced within this
+LEASE_RENEW_INTERVAL = 10.0
+
+# Extend / drop the lease only if we still own it
+RENEW_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("EXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+class LeaderLease:
+    """
+    Elects one process, across workers and replicas, to run a singleton job.
+    The holder renews a Redis key every LEASE_RENEW_INTERVAL; if it dies the
+    key expires and the next process to try takes over.
+    While Redis is unreachable every process keeps the role it had, so a
+    blip neither stops the leader nor elects a second one.
+    """
+    def __init__(self, name: str, ttl: int = LEASE_TTL, renew_interval: float = LEASE_RENEW_INTERVAL):
+        self.name = name
+        self.key = f"leader:{name}"
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.identity = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.is_running = False
+
+    async def try_acquire(self) -> bool:
+        """Renew if we hold the lease, otherwise try to take it. Returns the current role."""
+        was_leader = self.is_leader
+        try:
+            if self.is_leader:
+                self.is_leader = bool(await redis_client.eval(RENEW_SCRIPT, 1, self.key, self.identity, self.ttl))
+            if not self.is_leader:
+                self.is_leader = bool(await redis_client.set(self.key, self.identity, nx=True, ex=self.ttl))
+        except Exception as e:
+            print(f"ERROR:   Leader lease check failed ({self.name}): {e}")
+
+        if self.is_leader != was_leader:
+            action = "Acquired" if self.is_leader else "Lost"
+            print(f"INFO:    {action} leader lease '{self.name}' ({self.identity})")
+        LEADER_LEASE_HELD.labels(lease=self.name).set(1 if self.is_leader else 0)
+        return self.is_leader
+
+    async def release(self):
+        """Hand the role over immediately (graceful shutdown) instead of waiting for expiry."""
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        LEADER_LEASE_HELD.labels(lease=self.name).set(0)
+        try:
+            await redis_client.eval(RELEASE_SCRIPT, 1, self.key, self.identity)
+        except Exception as e:
+            print(f"ERROR:   Leader lease release failed ({self.name}): {e}")
+
+    async def worker(self):
+        """Background task: keeps trying for / renewing the lease until shutdown."""
+        self.is_running = True
+        while self.is_running:
+            await self.try_acquire()
+            await asyncio.sleep(self.renew_interval)
@@ -1,15 +1,116 @@
+import asyncio
+import time
+from typing import Optional
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sentinelstack.config import settings
+from sentinelstack.monitoring.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_OVERFLOW,
+    DB_POOL_WAIT_SECONDS,
+    DB_QUERY_DURATION_SECONDS,
+    DB_REPLICA_LAG_SECONDS,
+    DB_READ_FALLBACKS
+)
+
+class PoolWaitTimer:
+    """Pool mixin: records how long each checkout waited for a connection."""
+    metrics_name = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT_SECONDS.labels(pool=self.metrics_name).observe(time.perf_counter() - started)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep its label
+        pool = super().recreate()
+        pool.metrics_name = self.metrics_name
+        return pool
+
+class InstrumentedQueuePool(PoolWaitTimer, AsyncAdaptedQueuePool):
+    pass
+
+def instrument_engine(sync_engine: Engine, name: str = "primary"):
+    """
+    Pool gauges and per-query latency for one engine.
+    Tag statements with .execution_options(query_name="...") (or the
+    execution_options= argument of execute) to get their own histogram series.
+    """
+    if isinstance(sync_engine.pool, PoolWaitTimer):
+        sync_engine.pool.metrics_name = name
+
+    checked_out = DB_POOL_CHECKED_OUT.labels(pool=name)
+    overflow = DB_POOL_OVERFLOW.labels(pool=name)
+
+    # checkin fires before the pool has taken the connection back, so count
+    # in the events themselves; overflow is sampled whenever the pool is used
+    @event.listens_for(sync_engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_out.inc()
+        overflow.set(max(sync_engine.pool.overflow(), 0))
+
+    @event.listens_for(sync_engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+        overflow.set(max(sync_engine.pool.overflow(), 0))
+
+    # The start time lives on the statement's execution context, not the
+    # connection: a failed statement never reaches after_cursor_execute, and
+    # nothing it left behind may be picked up by the connection's next query
+    def observe(context, started: float):
+        query_name = context.execution_options.get("query_name", "other")
+        DB_QUERY_DURATION_SECONDS.labels(query_name=query_name).observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.query_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "query_started", None)
+        if started is not None:
+            observe(context, started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def on_error(exception_context):
+        # Failed statements count too: timeouts are the slowest queries of all
+        context = exception_context.execution_context
+        started = getattr(context, "query_started", None)
+        if started is not None:
+            observe(context, started)
+
+def _database_url(raw_url: str):
+    url = make_url(raw_url)
+    if url.drivername.endswith("+asyncpg"):
+        # SQLAlchemy's asyncpg adapter keeps its own per-connection LRU of prepared
+        # statements; size it for the fixed hot queries (log insert, aggregation,
+        # stats, incident lookups) so they are parsed and planned once per connection
+        url = url.update_query_dict({"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)})
+    return url
 
 # 1. Create the Async Engine
 # echo=True means all SQL queries will be logged to the console (good for debugging)
 engine = create_async_engine(
-    settings.DATABASE_URL,
+    _database_url(settings.DATABASE_URL),
     echo=False,  # Set to True if you want to see SQL queries
-    future=True
+    future=True,
+    poolclass=InstrumentedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE
 )
 
+# 1b. Pool + Query Instrumentation (sync events fire on the underlying engine)
+instrument_engine(engine.sync_engine, "primary")
+
 # 2. Create the Session Factory
 # This is what we use to talk to the DB in every request
 AsyncSessionLocal = sessionmaker(
@@ -19,6 +120,99 @@ AsyncSessionLocal = sessionmaker(
     autoflush=False
 )
 
+# 2b. Optional Read Replica
+# Separate pool so dashboard/AI range scans never queue behind log ingest.
+# Without DATABASE_READ_URL both names point at the primary.
+read_engine = engine
+ReadSessionLocal = AsyncSessionLocal
+if settings.DATABASE_READ_URL:
+    read_engine = create_async_engine(
+        _database_url(settings.DATABASE_READ_URL),
+        echo=False,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_READ_POOL_SIZE,
+        max_overflow=settings.DB_READ_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE
+    )
+    instrument_engine(read_engine.sync_engine, "read")
+    ReadSessionLocal = sessionmaker(
+        bind=read_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+        autoflush=False
+    )
+
+# Zero when the replica has replayed everything it received (an idle primary
+# writes nothing, so the last replay timestamp alone would look like lag).
+# Not in recovery means the URL points at a primary: never lagging.
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+class ReplicaLagMonitor:
+    """
+    Probes the read replica's replication delay in the background so
+    choosing a session costs nothing on the request path.
+    Until the first successful probe (and while probes fail) the replica
+    counts as unavailable and read-only sessions use the primary.
+    """
+    def __init__(self):
+        self.lag: Optional[float] = None  # Seconds behind, None = unknown/unreachable
+        self.is_running = False
+
+    @property
+    def enabled(self) -> bool:
+        return ReadSessionLocal is not AsyncSessionLocal
+
+    async def check(self):
+        try:
+            async with read_engine.connect() as conn:
+                lag = (await conn.execute(REPLICA_LAG_SQL, execution_options={"query_name": "db.replica_lag"})).scalar()
+            self.lag = max(float(lag or 0.0), 0.0)
+            DB_REPLICA_LAG_SECONDS.set(self.lag)
+        except Exception as e:
+            if self.lag is not None:
+                print(f"ERROR:   Read Replica Probe Failed, Reading From Primary: {e}")
+            self.lag = None
+            DB_REPLICA_LAG_SECONDS.set(-1)
+
+    async def worker(self):
+        if not self.enabled:
+            return
+        self.is_running = True
+        print("INFO:    Read Replica Lag Monitor Started")
+        while self.is_running:
+            await self.check()
+            await asyncio.sleep(settings.DB_REPLICA_CHECK_INTERVAL)
+
+# Global Instance
+replica_monitor = ReplicaLagMonitor()
+
+def read_session(max_lag: Optional[float] = None) -> AsyncSession:
+    """
+    Session for read-only queries. Uses the replica when its last measured
+    lag is within max_lag seconds (default DB_REPLICA_MAX_LAG), otherwise the
+    primary. Reads that must observe a write just committed belong on
+    AsyncSessionLocal: the lag is sampled, not a per-transaction guarantee.
+    """
+    if not replica_monitor.enabled:
+        return AsyncSessionLocal()
+    lag = replica_monitor.lag
+    bound = settings.DB_REPLICA_MAX_LAG if max_lag is None else max_lag
+    if lag is None:
+        DB_READ_FALLBACKS.labels(reason="unavailable").inc()
+        return AsyncSessionLocal()
+    if lag > bound:
+        DB_READ_FALLBACKS.labels(reason="lagging").inc()
+        return AsyncSessionLocal()
+    return ReadSessionLocal()
+
 # 3. Base Class for Models
 # All our models will inherit from this
 Base = declarative_base()
@@ -30,4 +224,12 @@ async def get_db():
         try:
             yield session
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+async def get_read_db():
+    """Like get_db, for read-only routes (replica when fresh enough)."""
+    async with read_session() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
@@ -0,0 +1,152 @@
+import zlib
+from typing import Dict, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from sentinelstack.gateway.responses import encoded_etag
+
+# brotli is optional: without it we simply negotiate gzip
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on environment
+    brotli = None
+
+# Configuration
+MINIMUM_SIZE = 1024   # Bytes. Smaller bodies cost more to compress than to send
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4    # Brotli 4 beats gzip 6 on both size and speed for JSON
+EXCLUDED_MEDIA_TYPES = ("text/event-stream", "image/", "video/", "audio/", "application/zip")
+
+def _qualities(accept_encoding: str) -> Dict[str, float]:
+    """Accept-Encoding as {coding: q}; a malformed q counts as 0 (not acceptable)."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    return accepted
+
+def accepts_encoding(accept_encoding: str, encoding: str) -> bool:
+    """True if the client accepts `encoding` with q > 0, by name or through "*"."""
+    accepted = _qualities(accept_encoding)
+    return accepted.get(encoding, accepted.get("*", 0.0)) > 0
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Picks the best encoding the client accepts (q > 0).
+    Prefers br over gzip when both are acceptable and brotli is installed.
+    """
+    accepted = _qualities(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_q = None, 0.0
+    for name in candidates:
+        quality = accepted.get(name, wildcard)
+        if quality > best_q:
+            best, best_q = name, quality
+    return best
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._gz = None
+        else:
+            self._br = None
+            self._gz = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31 => gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress and flush so streamed bodies still arrive incrementally."""
+        if self._br is not None:
+            return self._br.process(data) + self._br.flush()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._br is not None:
+            return self._br.process(data) + self._br.finish()
+        return self._gz.compress(data) + self._gz.flush(zlib.Z_FINISH)
+
+class CompressionMiddleware:
+    """
+    Negotiated br/gzip compression for every response above a size threshold.
+    Buffered bodies are compressed in one shot (with a correct Content-Length);
+    streamed bodies are compressed chunk by chunk. SSE and already-encoded
+    responses pass through untouched. Strong ETags get the coding appended,
+    since the compressed bytes are a different representation.
+    """
+    def __init__(self, app: ASGIApp, minimum_size: int = MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message: Message):
+            nonlocal start_message, compressor, passthrough
+
+            if message["type"] == "http.response.start":
+                # Hold the headers until we have seen the first body chunk
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if start_message is not None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                media_type = headers.get("content-type", "")
+                if "content-encoding" in headers or media_type.startswith(EXCLUDED_MEDIA_TYPES):
+                    passthrough = True
+                else:
+                    headers.add_vary_header("Accept-Encoding")
+                    passthrough = not more_body and len(body) < self.minimum_size
+
+                if passthrough:
+                    await send(start_message)
+                    start_message = None
+                    await send(message)
+                    return
+
+                compressor = _Compressor(encoding)
+                headers["Content-Encoding"] = encoding
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                if more_body:
+                    del headers["Content-Length"]
+                    body = compressor.chunk(body)
+                else:
+                    body = compressor.finish(body)
+                    headers["Content-Length"] = str(len(body))
+                await send(start_message)
+                start_message = None
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            if passthrough:
+                await send(message)
+                return
+
+            body = compressor.chunk(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
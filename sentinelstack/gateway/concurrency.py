@@ -0,0 +1,189 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Deque, Optional
+from sentinelstack.config import settings
+from sentinelstack.gateway.context import RequestCtx
+from sentinelstack.monitoring.metrics import (
+    CONCURRENCY_LIMIT,
+    CONCURRENCY_INFLIGHT,
+    CONCURRENCY_QUEUE_WAIT_SECONDS,
+    CONCURRENCY_SHED
+)
+
+# Configuration
+WINDOW_SECONDS = 0.5       # Latency samples are folded into the limit at most this often...
+WINDOW_MIN_SAMPLES = 10    # ...and only once the window holds this many
+BASELINE_WARMUP = 10       # Windows averaged plainly before the baseline starts to move slowly
+BASELINE_WINDOWS = 600     # Span of the baseline's moving average, in windows (~5min)
+RTT_TOLERANCE = 1.5        # Latency may rise this far above the baseline before the limit shrinks
+SMOOTHING = 0.2            # Weight of each new estimate
+BACKOFF = 0.9              # Multiplicative decrease when the backend reports overload
+OVERLOAD_STATUS = {503, 504}
+RETRY_AFTER = "1"
+
+# Priority classes
+CRITICAL = "critical"            # Never limited
+AUTHENTICATED = "authenticated"  # Full limit, may briefly queue for a slot
+ANONYMOUS = "anonymous"          # Part of the limit, never queues
+CRITICAL_PATHS = ("/health", "/metrics")
+
+def priority_of(ctx: RequestCtx) -> str:
+    if ctx.path in CRITICAL_PATHS:
+        return CRITICAL
+    return AUTHENTICATED if ctx.user_id else ANONYMOUS
+
+class ConcurrencyLimiter:
+    """
+    Adaptive cap on requests in flight (gradient algorithm).
+    Every WINDOW_SECONDS the average latency of the window is compared with a
+    slow moving baseline. While they match, the limit grows by about sqrt(limit)
+    so it can find spare capacity. Once latency rises past RTT_TOLERANCE times
+    the baseline, the limit shrinks in proportion: the backend is queueing, and
+    more concurrency would only add latency. 503/504 responses back off at once.
+
+    Authenticated requests may use the whole limit and wait up to
+    `queue_timeout` for a freed slot. Anonymous requests only get
+    `anonymous_share` of it and are shed immediately, so they are the first to go.
+    """
+    def __init__(
+        self,
+        initial_limit: int = settings.CONCURRENCY_INITIAL_LIMIT,
+        min_limit: int = settings.CONCURRENCY_MIN_LIMIT,
+        max_limit: int = settings.CONCURRENCY_MAX_LIMIT,
+        queue_timeout: float = settings.CONCURRENCY_QUEUE_TIMEOUT,
+        anonymous_share: float = settings.CONCURRENCY_ANONYMOUS_SHARE,
+        window: float = WINDOW_SECONDS
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.queue_timeout = queue_timeout
+        self.anonymous_share = anonymous_share
+        self.window = window
+        self.max_queue = max_limit
+        self.inflight = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+
+        # Latency state
+        self.baseline = 0.0
+        self.windows = 0
+        self._window_start = time.monotonic()
+        self._window_total = 0.0
+        self._window_samples = 0
+        self._window_peak = 0
+        self._window_overloaded = False
+        CONCURRENCY_LIMIT.set(self.limit)
+
+    async def acquire(self, priority: str) -> Optional[float]:
+        """Admission timestamp (pass it to release), or None if the request must be shed."""
+        if priority == ANONYMOUS:
+            if self.inflight < self.limit * self.anonymous_share and not self.waiters:
+                return self._admit()
+            CONCURRENCY_SHED.labels(priority=priority).inc()
+            return None
+
+        if self.inflight < self.limit and not self.waiters:
+            return self._admit()
+        if self.queue_timeout <= 0 or len(self.waiters) >= self.max_queue:
+            CONCURRENCY_SHED.labels(priority=priority).inc()
+            return None
+
+        # 1. Queue: release() hands its slot straight to the oldest waiter
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self.waiters.append(waiter)
+        expiry = loop.call_later(self.queue_timeout, _expire, waiter)
+        queued = time.monotonic()
+        try:
+            admitted = await waiter
+        except asyncio.CancelledError:
+            # Client went away; give back a slot that was already handed over
+            if waiter.done() and not waiter.cancelled() and waiter.result():
+                self.release(time.monotonic(), 0, sample=False)
+            raise
+        finally:
+            expiry.cancel()
+            CONCURRENCY_QUEUE_WAIT_SECONDS.observe(time.monotonic() - queued)
+            if not (waiter.done() and not waiter.cancelled() and waiter.result()):
+                try:
+                    self.waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+        if not admitted:
+            CONCURRENCY_SHED.labels(priority=priority).inc()
+            return None
+        return time.monotonic()
+
+    def _admit(self) -> float:
+        self.inflight += 1
+        if self.inflight > self._window_peak:
+            self._window_peak = self.inflight
+        CONCURRENCY_INFLIGHT.set(self.inflight)
+        return time.monotonic()
+
+    def release(self, admitted: float, status_code: int, sample: bool = True):
+        """Free the slot taken at `admitted` and record how long the request held it."""
+        now = time.monotonic()
+        if sample:
+            self._sample(now - admitted, status_code in OVERLOAD_STATUS, now)
+
+        # 2. Hand the slot to a queued request instead of freeing it
+        while self.waiters and self.inflight - 1 < self.limit:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.inflight -= 1
+        CONCURRENCY_INFLIGHT.set(self.inflight)
+
+    def _sample(self, latency: float, overloaded: bool, now: float):
+        if overloaded:
+            self._window_overloaded = True
+        else:
+            self._window_total += latency
+            self._window_samples += 1
+        if now - self._window_start < self.window:
+            return
+        if self._window_samples < WINDOW_MIN_SAMPLES and not self._window_overloaded:
+            return
+        self._update()
+        self._window_start = now
+        self._window_total = 0.0
+        self._window_samples = 0
+        self._window_peak = self.inflight
+        self._window_overloaded = False
+
+    def _update(self):
+        limit = self.limit
+        if self._window_overloaded:
+            limit *= BACKOFF
+        else:
+            latency = self._window_total / self._window_samples
+            self.windows += 1
+            if self.windows <= BASELINE_WARMUP:
+                self.baseline += (latency - self.baseline) / self.windows
+            else:
+                self.baseline += (latency - self.baseline) * 2 / (BASELINE_WINDOWS + 1)
+            if self.baseline > 2 * latency:
+                # Latency dropped for good (e.g. a cold cache warmed up): catch up quickly
+                self.baseline *= 0.95
+
+            if self._window_peak < limit / 2:
+                # Mostly idle: this window says nothing about a higher limit
+                return
+            gradient = max(0.5, min(1.0, RTT_TOLERANCE * self.baseline / latency)) if latency > 0 else 1.0
+            estimate = limit * gradient + math.sqrt(limit)
+            limit = limit * (1 - SMOOTHING) + estimate * SMOOTHING
+
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+        CONCURRENCY_LIMIT.set(self.limit)
+
+def _expire(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(False)
+
+# Global Instance
+concurrency_limiter = ConcurrencyLimiter()
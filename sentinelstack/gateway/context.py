@@ -6,6 +6,10 @@ class RequestCtx(BaseModel):
     request_id: str
     client_ip: str
     user_id: Optional[str] = None
+    role: Optional[str] = None  # From the principal cache, not the token
+    tier: Optional[str] = None
+    api_key: Optional[str] = None        # Public prefix when authenticated by API key
+    api_key_limit: Optional[int] = None  # That key's own quota (requests per minute)
     path: str
     method: str
 
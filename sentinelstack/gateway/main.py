@@ -1,15 +1,15 @@
 import asyncio
-from fastapi import FastAPI, Response
+from fastapi import FastAPI, Request, Response
 from contextlib import asynccontextmanager
 from sentinelstack.config import settings
 from sentinelstack.auth.router import router as auth_router
 from sentinelstack.gateway.middleware import RequestContextMiddleware
+from sentinelstack.gateway.compression import CompressionMiddleware, accepts_encoding
+from sentinelstack.gateway.responses import FastJSONResponse
 from sentinelstack.gateway.context import get_context
 from sentinelstack.logging.service import log_service
-from sentinelstack.stats.router import router as stats_router
-from fastapi.staticfiles import StaticFiles
-from sentinelstack.ai.router import router as ai_router
-from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import CONTENT_TYPE_LATEST
+from sentinelstack.monitoring.exposition import metrics_exposition, mark_process_dead
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -22,6 +22,46 @@ async def lifespan(app: FastAPI):
     # Start Aggregation Worker Task
     from sentinelstack.aggregation.service import aggregation_service
     task_agg = asyncio.create_task(aggregation_service.worker())
+
+    # Optional subsystems: workers only run when their routes are mounted
+    optional_tasks = []
+
+    # Start Dashboard Event Fan-out (one Redis subscription per process)
+    if settings.ENABLE_DASHBOARD:
+        from sentinelstack.stats.stream import event_broadcaster
+        optional_tasks.append(asyncio.create_task(event_broadcaster.worker()))
+
+    # Start AI Analysis Worker Pool (keeps LLM calls off the request path)
+    if settings.ENABLE_AI:
+        from sentinelstack.ai.worker import analysis_queue
+        from sentinelstack.ai.service import ai_service
+        ai_service.start()
+        optional_tasks.append(asyncio.create_task(analysis_queue.worker()))
+
+    # Start Upstream Health Checks (only when PROXY_ROUTES configures a proxy)
+    if settings.PROXY_ROUTES:
+        from sentinelstack.proxy.service import proxy_service
+        optional_tasks.append(asyncio.create_task(proxy_service.worker()))
+
+    # Start Redis Client Tracking (serves hot cache reads from process memory)
+    from sentinelstack.cache import client_cache
+    task_tracking = asyncio.create_task(client_cache.worker())
+
+    # Start Status Cache Invalidation Listener (drops local copies changed elsewhere)
+    from sentinelstack.cache import status_cache
+    task_cache = asyncio.create_task(status_cache.worker())
+
+    # Start Principal Cache Invalidation Listener (account changes from any replica)
+    from sentinelstack.auth.principals import principal_cache
+    task_principals = asyncio.create_task(principal_cache.worker())
+
+    # Start API Key Revocation Listener
+    from sentinelstack.auth.api_keys import api_key_cache
+    task_api_keys = asyncio.create_task(api_key_cache.worker())
+
+    # Start Read Replica Lag Monitor (returns at once when no replica is configured)
+    from sentinelstack.database import replica_monitor
+    task_replica = asyncio.create_task(replica_monitor.worker())
     
     yield
     
@@ -32,20 +72,56 @@ async def lifespan(app: FastAPI):
     await task_log
     # We don't await aggregation task because it sleeps for long periods
     task_agg.cancel() 
+    # Let a standby process take over aggregation now rather than at lease expiry
+    await aggregation_service.lease.release()
+    if settings.ENABLE_DASHBOARD:
+        event_broadcaster.is_running = False
+    if settings.ENABLE_AI:
+        analysis_queue.is_running = False
+    for task in optional_tasks:
+        task.cancel()
+    client_cache.is_running = False
+    task_tracking.cancel()
+    status_cache.is_running = False
+    task_cache.cancel()
+    principal_cache.cache.is_running = False
+    task_principals.cancel()
+    api_key_cache.cache.is_running = False
+    task_api_keys.cancel()
+    replica_monitor.is_running = False
+    task_replica.cancel()
+    if settings.ENABLE_AI:
+        await ai_service.close()
+    if settings.PROXY_ROUTES:
+        proxy_service.is_running = False
+        await proxy_service.close()
+    from sentinelstack.auth.security import password_hasher
+    password_hasher.shutdown()
+    mark_process_dead()
 
 app = FastAPI(
     title=settings.APP_NAME,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 app.add_middleware(RequestContextMiddleware)
+# Outermost: compress whatever the stack produced
+app.add_middleware(CompressionMiddleware)
 
 app.include_router(auth_router)
-app.include_router(stats_router)
-app.include_router(ai_router)
 
-# Mount static files for dashboard (ensure directory exists)
-app.mount("/dashboard", StaticFiles(directory="sentinelstack/static", html=True), name="static")
+# Optional subsystems are imported only when enabled
+if settings.ENABLE_DASHBOARD:
+    from fastapi.staticfiles import StaticFiles
+    from sentinelstack.stats.router import router as stats_router
+    app.include_router(stats_router)
+    # Mount static files for dashboard (ensure directory exists)
+    app.mount("/dashboard", StaticFiles(directory="sentinelstack/static", html=True), name="static")
+
+if settings.ENABLE_AI:
+    from sentinelstack.ai.router import router as ai_router
+    app.include_router(ai_router)
 
 @app.get("/health")
 async def health_check():
@@ -61,9 +137,22 @@ async def health_check():
     }
 
 @app.get("/metrics")
-async def metrics():
+async def metrics(request: Request):
     """
-    Exposes Prometheus metrics.
-    Scraped by Prometheus server every 15s.
+    Exposes Prometheus metrics (merged across workers in multi-worker mode).
+    Scraped by Prometheus server every 15s; rendered off-loop and cached briefly.
     """
-    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
+    gzipped = accepts_encoding(request.headers.get("accept-encoding", ""), "gzip")
+    headers = {"Vary": "Accept-Encoding"}
+    if gzipped:
+        headers["Content-Encoding"] = "gzip"
+    return Response(
+        content=await metrics_exposition.get(gzipped=gzipped),
+        media_type=CONTENT_TYPE_LATEST,
+        headers=headers
+    )
+
+# Upstream proxy routes go last: the gateway's own endpoints take precedence
+if settings.PROXY_ROUTES:
+    from sentinelstack.proxy.service import proxy_service
+    app.router.routes.extend(proxy_service.routes())
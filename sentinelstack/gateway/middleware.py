@@ -9,13 +9,18 @@ from jose import jwt, JWTError
 from sentinelstack.config import settings
 from sentinelstack.gateway.context import RequestCtx, set_context, reset_context
 from sentinelstack.rate_limit.service import rate_limiter
+from sentinelstack.auth.principals import principal_cache
+from sentinelstack.auth.api_keys import api_key_cache, KEY_SCHEME
 from sentinelstack.logging.service import log_service
+from sentinelstack.gateway.response_cache import response_cache
+from sentinelstack.gateway.concurrency import concurrency_limiter, priority_of, CRITICAL, RETRY_AFTER
 from sentinelstack.monitoring.metrics import (
     HTTP_REQUESTS_TOTAL,
     HTTP_REQUEST_DURATION_SECONDS,
     RATE_LIMIT_HITS,
     SYSTEM_ERRORS,
-    LOG_QUEUE_SIZE
+    LOG_QUEUE_SIZE,
+    cardinality_guard
 )
 
 class RequestContextMiddleware(BaseHTTPMiddleware):
@@ -31,7 +36,28 @@ class RequestContextMiddleware(BaseHTTPMiddleware):
         # 2. Attempt Identity Extraction (Optimistic)
         user_id = None
         auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
+        api_key = request.headers.get("X-API-Key")
+        if not api_key and auth_header and auth_header.startswith(f"Bearer {KEY_SCHEME}_"):
+            api_key = auth_header.split(" ")[1]
+
+        # 2a. API Key (machine clients): LRU lookup by prefix + one HMAC, no bcrypt, no DB when warm
+        key_record = None
+        key_error = None
+        if api_key and api_key_cache.is_throttled(client_ip):
+            # Guessing keys: refuse before the lookup so it costs no DB or Redis work
+            key_error = (429, "Too many invalid API keys")
+        elif api_key:
+            try:
+                key_record = await api_key_cache.authenticate(api_key, client_ip)
+                if key_record:
+                    user_id = key_record["user_id"]
+                else:
+                    key_error = (401, "Invalid API key")
+            except Exception as e:
+                # Unlike a signed JWT, an unverifiable key can't be trusted: fail closed
+                print(f"ERROR:   API key lookup failed: {e}")
+                key_error = (503, "Authentication temporarily unavailable")
+        elif auth_header and auth_header.startswith("Bearer "):
             token = auth_header.split(" ")[1]
             try:
                 # Verify signature only (CPU bound, fast)
@@ -45,11 +71,25 @@ class RequestContextMiddleware(BaseHTTPMiddleware):
                 # Invalid/Expired token -> Treat as Anonymous
                 pass
 
+        # 2b. Resolve Account State (O(1): principal cache, DB only on a cold miss)
+        principal = None
+        if user_id:
+            try:
+                principal = await principal_cache.get(user_id)
+            except Exception as e:
+                # Fail open with least privilege: an outage must not lock every user out
+                print(f"ERROR:   Principal lookup failed: {e}")
+                principal = {"active": True, "role": None, "tier": None}
+
         # 3. Create Context
         ctx = RequestCtx(
             request_id=request_id,
             client_ip=client_ip,
             user_id=user_id, 
+            role=principal["role"] if principal else None,
+            tier=principal["tier"] if principal else None,
+            api_key=key_record["prefix"] if key_record else None,
+            api_key_limit=key_record["rate_limit"] if key_record else None,
             path=request.url.path,
             method=request.method
         )
@@ -58,9 +98,27 @@ class RequestContextMiddleware(BaseHTTPMiddleware):
         status_code = 500
         
         try:
-            # 4. Rate Limit Check (Identity Aware)
-            # Skip health checks/static/metrics
-            if ctx.path not in ["/health", "/docs", "/openapi.json", "/metrics"] and \
+            # 4. Account State: a valid signature is not enough once a user is disabled or deleted
+            if key_error:
+                status_code = key_error[0]
+                return JSONResponse(status_code=status_code, content={"detail": key_error[1]})
+            if user_id and (principal is None or not principal["active"]):
+                status_code = 401 if principal is None else 403
+                return JSONResponse(
+                    status_code=status_code,
+                    content={"detail": "Unknown user" if principal is None else "Account disabled"}
+                )
+
+            # 5. Response Cache (RESPONSE_CACHE_ROUTES only; after account checks, so
+            # disabled users are never served)
+            cache_key, cached, fresh = None, None, False
+            if response_cache.routes:
+                cache_key, cached, fresh = await response_cache.check(request, ctx)
+            skip_rate_limit = cached is not None and settings.RESPONSE_CACHE_SKIP_RATE_LIMIT
+
+            # 6. Rate Limit Check (Identity + Plan Aware)
+            # Skip health checks/static/metrics (and cache hits when policy allows)
+            if not skip_rate_limit and ctx.path not in ["/health", "/docs", "/openapi.json", "/metrics"] and \
                not ctx.path.startswith(("/stats", "/ai", "/dashboard", "/static")):
                
                 allowed, headers = await rate_limiter.check_request(ctx)
@@ -68,7 +126,7 @@ class RequestContextMiddleware(BaseHTTPMiddleware):
                     status_code = 429
                     
                     # Record Rate Limit Metric
-                    RATE_LIMIT_HITS.labels(path=ctx.path, client_ip=ctx.client_ip).inc()
+                    cardinality_guard.labels(RATE_LIMIT_HITS, path=ctx.path, client_ip=ctx.client_ip).inc()
                     
                     return JSONResponse(
                         status_code=429, 
@@ -76,18 +134,47 @@ class RequestContextMiddleware(BaseHTTPMiddleware):
                         headers=headers
                     )
 
-            # 5. Process Request
-            response = await call_next(request)
-            status_code = response.status_code
+            # 7. Serve from Cache (stale copies trigger one background refresh)
+            if cached is not None:
+                if not fresh:
+                    response_cache.revalidate(cache_key, self.app, request)
+                response = response_cache.respond(cached, request, "hit" if fresh else "stale")
+                status_code = response.status_code
+                response.headers["X-Request-ID"] = request_id
+                return response
+
+            # 8. Admission Control (adaptive concurrency limit; anonymous traffic is shed first)
+            admitted = None
+            priority = priority_of(ctx)
+            if settings.CONCURRENCY_LIMIT_ENABLED and priority != CRITICAL:
+                admitted = await concurrency_limiter.acquire(priority)
+                if admitted is None:
+                    status_code = 503
+                    return JSONResponse(
+                        status_code=503,
+                        content={"detail": "Server overloaded, please retry"},
+                        headers={"Retry-After": RETRY_AFTER}
+                    )
+
+            # 9. Process Request
+            try:
+                response = await call_next(request)
+                status_code = response.status_code
+            finally:
+                if admitted is not None:
+                    concurrency_limiter.release(admitted, status_code)
+            if cache_key:
+                response = await response_cache.complete(cache_key, request, response)
             response.headers["X-Request-ID"] = request_id
             return response
             
         except Exception as exc:
-            # 6. Capture internal errors
+            # 10. Capture internal errors
             status_code = 500
             
             # Record System Error Metric
-            SYSTEM_ERRORS.labels(
+            cardinality_guard.labels(
+                SYSTEM_ERRORS,
                 path=ctx.path, 
                 error_type=type(exc).__name__
             ).inc()
@@ -95,17 +182,19 @@ class RequestContextMiddleware(BaseHTTPMiddleware):
             raise exc
             
         finally:
-            # 7. Metrics & Logging (Always runs)
+            # 11. Metrics & Logging (Always runs)
             duration = time.time() - start_time
             
-            # Update Metrics
-            HTTP_REQUESTS_TOTAL.labels(
+            # Update Metrics (raw paths are client-controlled: series are capped)
+            cardinality_guard.labels(
+                HTTP_REQUESTS_TOTAL,
                 method=ctx.method,
                 path=ctx.path, 
                 status_code=status_code
             ).inc()
             
-            HTTP_REQUEST_DURATION_SECONDS.labels(
+            cardinality_guard.labels(
+                HTTP_REQUEST_DURATION_SECONDS,
                 method=ctx.method,
                 path=ctx.path
             ).observe(duration)
@@ -0,0 +1,459 @@
+import asyncio
+import math
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Scope
+from sentinelstack.config import settings
+from sentinelstack import serialization
+from sentinelstack.cache import redis_binary_client
+from sentinelstack.gateway.context import RequestCtx
+from sentinelstack.monitoring.metrics import (
+    RESPONSE_CACHE_REQUESTS,
+    RESPONSE_CACHE_SERVED_BYTES,
+    RESPONSE_CACHE_BYTES
+)
+
+# Configuration
+MAX_BYTES = 64 * 1024 * 1024     # In-process tier, bodies + headers
+MAX_ENTRY_BYTES = 1024 * 1024    # Larger responses are passed through, never stored
+ENTRY_OVERHEAD = 200             # Rough per-entry bookkeeping cost, so tiny entries still count
+REDIS_PREFIX = "rcache:"
+CACHEABLE_STATUS = {200, 203, 204, 300, 301, 404, 410}
+UNSAFE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+# Per-response headers that must not be replayed to other requests
+UNSTORED_HEADERS = {b"x-request-id", b"content-length", b"date", b"age", b"x-cache"}
+
+# Returns the Vary index Redis holds, storing ours only if there is none (SET NX GET)
+GET_OR_SET_INDEX = """
+local current = redis.call('GET', KEYS[1])
+if current then return current end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+return ARGV[1]
+"""
+# Replaces the index only if it is still exactly the one we read
+COMPARE_AND_SET_INDEX = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then return 0 end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+return 1
+"""
+
+Headers = List[Tuple[bytes, bytes]]
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+def _expiry(stale_until: float) -> int:
+    """Redis EX for an entry that stops being servable at `stale_until`."""
+    return max(1, math.ceil(stale_until - time.time()))
+
+def _seconds(directives: Dict[str, Optional[str]], name: str) -> Optional[float]:
+    try:
+        return float(directives[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+class CachedResponse:
+    __slots__ = ("status", "headers", "body", "stored_at", "fresh_until", "stale_until", "size")
+
+    def __init__(self, status: int, headers: Headers, body: bytes,
+                 stored_at: float, fresh_until: float, stale_until: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.stored_at = stored_at
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+        self.size = len(body) + sum(len(k) + len(v) for k, v in headers) + ENTRY_OVERHEAD
+
+    def pack(self) -> bytes:
+        meta = [self.status, [[k.decode("latin-1"), v.decode("latin-1")] for k, v in self.headers],
+                self.stored_at, self.fresh_until, self.stale_until]
+        return serialization.dumps(meta) + b"\n" + self.body
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "CachedResponse":
+        meta, _, body = data.partition(b"\n")
+        status, headers, stored_at, fresh_until, stale_until = serialization.loads(meta)
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+        return cls(status, headers, body, stored_at, fresh_until, stale_until)
+
+class VaryIndex:
+    """
+    Stored under the route key: which request headers select the variant.
+    Variant keys include the index's generation, so dropping the index on
+    invalidation leaves every older variant unreachable, in Redis too. With
+    the shared tier the generation is always the one Redis holds: a replica
+    never writes back a generation it only remembers locally.
+    """
+    __slots__ = ("names", "stale_until", "generation", "size")
+
+    def __init__(self, names: Tuple[str, ...], stale_until: float, generation: Optional[str] = None):
+        self.names = names
+        self.stale_until = stale_until
+        self.generation = generation or uuid.uuid4().hex[:12]
+        self.size = sum(len(name) for name in names) + ENTRY_OVERHEAD
+
+    def pack(self) -> bytes:
+        return b"V" + serialization.dumps([list(self.names), self.stale_until, self.generation])
+
+    @classmethod
+    def unpack(cls, data: bytes) -> "VaryIndex":
+        names, stale_until, generation = serialization.loads(data[1:])
+        return cls(tuple(names), stale_until, generation)
+
+class ResponseCache:
+    """
+    Gateway cache for GET/HEAD on routes listed in RESPONSE_CACHE_ROUTES.
+    1. In-process LRU bounded by bytes, optionally backed by Redis so
+       replicas share entries.
+    2. Cache-Control is honoured both ways: no-store / no-cache / private /
+       max-age / s-maxage / stale-while-revalidate on responses,
+       no-store / no-cache on requests. Set-Cookie responses are never stored.
+    3. Vary: a small index entry under the route key names the request
+       headers that pick the variant; each variant is its own entry.
+    4. Within the stale-while-revalidate window a stale copy is served and
+       one background request through the app refreshes it.
+    A successful unsafe request (POST/PUT/PATCH/DELETE) to a URL drops the
+    cached copies of that URL for its scope.
+    """
+    def __init__(self, routes: Optional[Dict[str, str]] = None, max_bytes: int = MAX_BYTES,
+                 shared: Optional[bool] = None):
+        routes = settings.RESPONSE_CACHE_ROUTES if routes is None else routes
+        # Longest prefix first
+        self.routes = sorted(((prefix.rstrip("/"), scope) for prefix, scope in routes.items()),
+                             key=lambda item: -len(item[0]))
+        self.max_bytes = max_bytes
+        self.shared = settings.RESPONSE_CACHE_SHARED if shared is None else shared
+        self.local: "OrderedDict[str, object]" = OrderedDict()
+        self.bytes = 0
+        self._revalidating: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    # --- Keys --------------------------------------------------------
+
+    def key_scope(self, path: str) -> Optional[str]:
+        for prefix, scope in self.routes:
+            if path == prefix or path.startswith(prefix + "/"):
+                return scope
+        return None
+
+    def base_key(self, request: Request, ctx: RequestCtx) -> Optional[str]:
+        """Cache key for this URL and caller, or None when the route isn't cached."""
+        scope = self.key_scope(request.url.path)
+        if scope is None:
+            return None
+        if scope == "user":
+            if ctx.api_key:
+                owner = f"key:{ctx.api_key}"
+            elif ctx.user_id:
+                owner = f"user:{ctx.user_id}"
+            else:
+                owner = f"ip:{ctx.client_ip}"
+        else:
+            owner = "route"
+        query = request.url.query
+        return f"{owner}|{request.url.path}?{query}" if query else f"{owner}|{request.url.path}"
+
+    @staticmethod
+    def _variant_key(base: str, index: VaryIndex, request: Request) -> str:
+        values = "|".join(f"{name}={request.headers.get(name, '')}" for name in index.names)
+        return f"{base}#{index.generation}#{values}"
+
+    # --- Lookup ------------------------------------------------------
+
+    async def check(self, request: Request, ctx: RequestCtx) -> Tuple[Optional[str], Optional[CachedResponse], bool]:
+        """
+        (key, entry, fresh) for a request before it reaches the app. key is None
+        when the cache stays out of this request entirely.
+        """
+        base = self.base_key(request, ctx)
+        if base is None or request.method not in ("GET", "HEAD"):
+            return base, None, False  # Unsafe methods still need the key to invalidate
+        directives = parse_cache_control(request.headers.get("cache-control"))
+        if "no-store" in directives:
+            RESPONSE_CACHE_REQUESTS.labels(result="bypass").inc()
+            return None, None, False
+        if "no-cache" in directives or _seconds(directives, "max-age") == 0 or \
+                request.headers.get("pragma") == "no-cache":
+            return base, None, False  # Go to the app, but keep the fresh copy
+        entry, fresh = await self.lookup(base, request)
+        return base, entry, fresh
+
+    async def lookup(self, base: str, request: Request) -> Tuple[Optional[CachedResponse], bool]:
+        """(entry, fresh). Stale entries are returned only inside their revalidate window."""
+        now = time.time()
+        entry = await self._get(base, now)
+        if isinstance(entry, VaryIndex):
+            entry = await self._get(self._variant_key(base, entry, request), now)
+        if not isinstance(entry, CachedResponse):
+            return None, False
+        return entry, now < entry.fresh_until
+
+    async def _get(self, key: str, now: float):
+        entry = self.local.get(key)
+        if entry is not None:
+            if now < entry.stale_until:
+                self.local.move_to_end(key)
+                return entry
+            self._drop_local(key)
+        if not self.shared:
+            return None
+        try:
+            data = await redis_binary_client.get(REDIS_PREFIX + key)
+        except Exception as e:
+            print(f"ERROR:   Response cache read failed: {e}")
+            return None
+        if not data:
+            return None
+        entry = VaryIndex.unpack(data) if data[:1] == b"V" else CachedResponse.unpack(data)
+        if now >= entry.stale_until:
+            return None
+        self._set_local(key, entry)
+        return entry
+
+    def respond(self, entry: CachedResponse, request: Request, result: str) -> Response:
+        RESPONSE_CACHE_REQUESTS.labels(result=result).inc()
+        head = request.method == "HEAD"
+        response = Response(b"" if head else entry.body, status_code=entry.status)
+        response.raw_headers = entry.headers + [
+            (b"content-length", str(len(entry.body)).encode()),
+            (b"age", str(int(time.time() - entry.stored_at)).encode()),
+            (b"x-cache", result.upper().encode())
+        ]
+        if not head:
+            RESPONSE_CACHE_SERVED_BYTES.inc(len(entry.body))
+        return response
+
+    # --- Store -------------------------------------------------------
+
+    def _storable(self, request: Request, status: int, headers: Headers) -> Optional[Tuple[float, float, Tuple[str, ...]]]:
+        """(ttl, stale window, vary names) if the response may be stored, else None."""
+        if status not in CACHEABLE_STATUS:
+            return None
+        cache_control = vary = None
+        for name, value in headers:
+            if name == b"set-cookie":
+                return None
+            if name == b"cache-control":
+                cache_control = value.decode("latin-1")
+            elif name == b"vary":
+                vary = value.decode("latin-1") if vary is None else f"{vary}, {value.decode('latin-1')}"
+
+        directives = parse_cache_control(cache_control)
+        user_scoped = self.key_scope(request.url.path) == "user"
+        if "no-store" in directives or "no-cache" in directives:
+            return None
+        if "private" in directives and not user_scoped:
+            return None
+        # A shared copy of an authenticated response needs the origin's explicit consent
+        authenticated = "authorization" in request.headers or "x-api-key" in request.headers
+        if authenticated and not user_scoped and not ("public" in directives or "s-maxage" in directives):
+            return None
+
+        names = tuple(sorted({name.strip().lower() for name in (vary or "").split(",") if name.strip()}))
+        if "*" in names:
+            return None
+
+        ttl = _seconds(directives, "s-maxage") if not user_scoped else None
+        if ttl is None:
+            ttl = _seconds(directives, "max-age")
+        if ttl is None:
+            ttl = settings.RESPONSE_CACHE_TTL
+        stale = _seconds(directives, "stale-while-revalidate")
+        if stale is None:
+            stale = 0.0 if "must-revalidate" in directives else settings.RESPONSE_CACHE_STALE_TTL
+        if ttl <= 0 and stale <= 0:
+            return None
+        return ttl, stale, names
+
+    async def complete(self, base: str, request: Request, response: Response) -> Response:
+        """After the app answered a request that check() gave a key."""
+        if request.method in UNSAFE_METHODS:
+            if response.status_code < 400:
+                await self.invalidate(base)
+            return response
+        if request.method not in ("GET", "HEAD"):
+            return response
+        RESPONSE_CACHE_REQUESTS.labels(result="miss").inc()
+        return self.capture(base, request, response)
+
+    def capture(self, base: str, request: Request, response: Response) -> Response:
+        """Tags a miss and, if it may be stored, stores the body as it streams to the client."""
+        response.headers["X-Cache"] = "MISS"
+        policy = self._storable(request, response.status_code, response.raw_headers)
+        if policy is None or request.method != "GET":
+            return response
+        ttl, stale, names = policy
+        headers = [(k, v) for k, v in response.raw_headers if k not in UNSTORED_HEADERS]
+        body_iterator = response.body_iterator
+
+        async def tee():
+            chunks, size = [], 0
+            async for chunk in body_iterator:
+                if chunks is not None:
+                    size += len(chunk)
+                    chunks = chunks if size <= MAX_ENTRY_BYTES else None
+                    if chunks is not None:
+                        chunks.append(chunk)
+                yield chunk
+            if chunks is not None:
+                now = time.time()
+                entry = CachedResponse(response.status_code, headers, b"".join(chunks), now, now + ttl, now + ttl + stale)
+                self.store(base, request, names, entry)
+
+        response.body_iterator = tee()
+        return response
+
+    def store(self, base: str, request: Request, names: Tuple[str, ...], entry: CachedResponse):
+        if not names:
+            self._set_local(base, entry)
+            self._remote_set(base, entry.pack(), entry.stale_until)
+        elif self.shared:
+            # The generation has to come from Redis, so the whole store waits for it
+            self._spawn(self._store_shared_variant(base, request, names, entry))
+        else:
+            # Keep the current generation so sibling variants stay reachable
+            current = self.local.get(base)
+            generation = current.generation if isinstance(current, VaryIndex) and current.names == names else None
+            index = VaryIndex(names, max(entry.stale_until, getattr(current, "stale_until", 0.0)), generation)
+            self._set_local(base, index)
+            key = self._variant_key(base, index, request)
+            self._set_local(key, entry)
+
+    async def _store_shared_variant(self, base: str, request: Request, names: Tuple[str, ...], entry: CachedResponse):
+        try:
+            index = await self._claim_index(base, names, entry.stale_until)
+        except Exception as e:
+            print(f"ERROR:   Response cache write failed: {e}")
+            return
+        if index is None:
+            return  # The index changed underneath us (e.g. invalidated): skip this copy
+        self._set_local(base, index)
+        key = self._variant_key(base, index, request)
+        self._set_local(key, entry)
+        await self._write(key, entry.pack(), entry.stale_until)
+
+    async def _claim_index(self, base: str, names: Tuple[str, ...], stale_until: float) -> Optional[VaryIndex]:
+        """
+        The index Redis holds for `base`, created with a fresh generation when
+        there is none and extended to `stale_until` when shorter. None if it
+        changed while we were updating it.
+        """
+        key = REDIS_PREFIX + base
+        candidate = VaryIndex(names, stale_until)
+        data = await redis_binary_client.eval(GET_OR_SET_INDEX, 1, key, candidate.pack(), _expiry(stale_until))
+        current = VaryIndex.unpack(data) if data[:1] == b"V" else None
+        if current is not None and current.names == names:
+            if current.stale_until >= stale_until:
+                return current
+            wanted = VaryIndex(names, stale_until, current.generation)
+        else:
+            wanted = candidate  # Plain entry or different Vary: start a new generation
+        replaced = await redis_binary_client.eval(COMPARE_AND_SET_INDEX, 1, key, data, wanted.pack(), _expiry(stale_until))
+        return wanted if replaced else None
+
+    def _remote_set(self, key: str, data: bytes, stale_until: float):
+        if self.shared:
+            # The response is already on its way; Redis is written after it
+            self._spawn(self._write(key, data, stale_until))
+
+    async def _write(self, key: str, data: bytes, stale_until: float):
+        try:
+            await redis_binary_client.set(REDIS_PREFIX + key, data, ex=_expiry(stale_until))
+        except Exception as e:
+            print(f"ERROR:   Response cache write failed: {e}")
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    # --- Local tier --------------------------------------------------
+
+    def _set_local(self, key: str, entry):
+        if entry.size > self.max_bytes:
+            return
+        self._drop_local(key)
+        self.local[key] = entry
+        self.bytes += entry.size
+        while self.bytes > self.max_bytes:
+            _, evicted = self.local.popitem(last=False)
+            self.bytes -= evicted.size
+        RESPONSE_CACHE_BYTES.set(self.bytes)
+
+    def _drop_local(self, key: str):
+        entry = self.local.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+            RESPONSE_CACHE_BYTES.set(self.bytes)
+
+    # --- Revalidation / invalidation ---------------------------------
+
+    def revalidate(self, base: str, app: ASGIApp, request: Request):
+        """Refreshes a stale entry in the background by replaying the GET through `app`."""
+        if base in self._revalidating:
+            return
+        self._revalidating.add(base)
+        scope = dict(request.scope, method="GET")
+        # Conditional / no-cache request headers would change what the app returns
+        scope["headers"] = [(k, v) for k, v in request.scope["headers"]
+                            if k not in (b"if-none-match", b"if-modified-since", b"cache-control")]
+
+        async def refresh():
+            try:
+                status, headers, body = await self._replay(app, scope)
+                policy = self._storable(request, status, headers)
+                if policy is not None and len(body) <= MAX_ENTRY_BYTES:
+                    ttl, stale, names = policy
+                    now = time.time()
+                    kept = [(k, v) for k, v in headers if k not in UNSTORED_HEADERS]
+                    self.store(base, request, names, CachedResponse(status, kept, body, now, now + ttl, now + ttl + stale))
+            except Exception as e:
+                print(f"ERROR:   Response cache revalidation failed for {base}: {e}")
+            finally:
+                self._revalidating.discard(base)
+
+        self._spawn(refresh())
+
+    @staticmethod
+    async def _replay(app: ASGIApp, scope: Scope) -> Tuple[int, Headers, bytes]:
+        start: Dict = {}
+        chunks: List[bytes] = []
+
+        async def receive() -> Message:
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message: Message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await app(scope, receive, send)
+        return start["status"], list(start.get("headers", [])), b"".join(chunks)
+
+    async def invalidate(self, base: str):
+        """Drops a URL (every variant) after a successful unsafe request to it."""
+        self._drop_local(base)
+        variants = base + "#"
+        for key in [key for key in self.local if key.startswith(variants)]:
+            self._drop_local(key)
+        # Remote variants are keyed by the dropped index's generation: unreachable from here on
+        if not self.shared:
+            return
+        try:
+            await redis_binary_client.delete(REDIS_PREFIX + base)
+        except Exception as e:
+            print(f"ERROR:   Response cache invalidation failed: {e}")
+
+# Global Instance
+response_cache = ResponseCache()
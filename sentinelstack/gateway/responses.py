@@ -0,0 +1,68 @@
+import hashlib
+from typing import Any, Optional
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from sentinelstack import serialization
+
+# Historical windows never change once their buckets are aggregated
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Content codings CompressionMiddleware may append to a strong ETag
+ETAG_CODINGS = ("br", "gzip")
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: compact JSON through orjson when available."""
+    def render(self, content: Any) -> bytes:
+        return serialization.dumps(content)
+
+def make_etag(body: bytes) -> str:
+    """Strong validator: identical bytes <=> identical tag."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def encoded_etag(etag: str, coding: str) -> str:
+    """
+    Tag for the representation after content-coding: compressed bytes differ
+    from the identity bytes, so a strong tag must differ too ("<hash>-br").
+    Weak tags already promise only semantic equivalence and are kept.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return etag[:-1] + "-" + coding + '"'
+
+def _matching_etag(if_none_match: str, etag: str) -> Optional[str]:
+    """
+    The tag in If-None-Match naming this body in any coding we serve, or None.
+    Weak comparison, as If-None-Match requires: a W/ prefix is ignored.
+    """
+    if if_none_match.strip() == "*":
+        return etag
+    variants = {etag, *(encoded_etag(etag, coding) for coding in ETAG_CODINGS)}
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.removeprefix("W/") in variants:
+            return tag
+    return None
+
+def conditional_json(request: Request, content: Any, immutable: bool = False) -> Response:
+    """
+    Renders `content` once, tags it with a strong ETag and answers
+    `304 Not Modified` when the client already holds the same bytes.
+    Immutable (fully historical) windows are also marked long-lived so
+    browsers and CDNs stop asking at all.
+    """
+    body = serialization.dumps(content)
+    etag = make_etag(body)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    matched = _matching_etag(if_none_match, etag) if if_none_match else None
+    if matched:
+        # Echo the tag the client holds: its copy may be a compressed representation
+        headers["ETag"] = matched
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
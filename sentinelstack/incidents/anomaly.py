@@ -0,0 +1,182 @@
+import math
+from typing import Dict, List, Optional
+from sentinelstack.aggregation.buckets import EndpointAggregates
+from sentinelstack.cache import redis_client
+from sentinelstack import serialization
+
+# Configuration
+ALPHA = 0.1                 # EWMA weight of the newest bucket (~10 minute memory)
+ANOMALOUS_ALPHA = 0.01      # Outliers still nudge the baseline so level shifts are absorbed slowly
+Z_THRESHOLD = 4.0           # Standard deviations before a bucket counts as anomalous
+WARMUP_BUCKETS = 30         # Don't judge a route until its baseline has seen 30 minutes
+MIN_REQUESTS_FOR_RATES = 10 # Error-rate / latency baselines need some volume per bucket
+MIN_TRAFFIC_FOR_DROP = 5.0  # Only flag drops on routes that normally see >= 5 req/min
+EXPIRE_TRAFFIC = 0.5        # Forget routes whose traffic baseline decays below this
+SNAPSHOT_KEY = "anomaly:baselines"
+
+class EwmBaseline:
+    """Exponentially weighted mean + variance. O(1) memory and update."""
+    __slots__ = ("mean", "var")
+
+    def __init__(self, mean: float = 0.0, var: float = 0.0):
+        self.mean = mean
+        self.var = var
+
+    def zscore(self, value: float, std_floor: float) -> float:
+        std = max(math.sqrt(self.var), std_floor)
+        return (value - self.mean) / std
+
+    def update(self, value: float, alpha: float = ALPHA):
+        delta = value - self.mean
+        self.mean += alpha * delta
+        self.var = (1 - alpha) * (self.var + alpha * delta * delta)
+
+class RouteBaseline:
+    __slots__ = ("latency", "error_rate", "traffic", "samples")
+
+    def __init__(self):
+        self.latency = EwmBaseline()
+        self.error_rate = EwmBaseline()
+        self.traffic = EwmBaseline()
+        self.samples = 0
+
+class Anomaly:
+    __slots__ = ("endpoint", "signal", "value", "expected", "zscore", "severity")
+
+    def __init__(self, endpoint: str, signal: str, value: float, expected: float, zscore: float, severity: str):
+        self.endpoint = endpoint
+        self.signal = signal      # latency_spike, error_spike, traffic_drop, traffic_surge
+        self.value = value
+        self.expected = expected
+        self.zscore = zscore
+        self.severity = severity
+
+    def describe(self) -> str:
+        if self.signal == "latency_spike":
+            return f"p95 latency {self.value:.0f}ms (baseline {self.expected:.0f}ms)"
+        if self.signal == "error_spike":
+            return f"error rate {self.value:.1%} (baseline {self.expected:.1%})"
+        if self.signal == "traffic_drop":
+            return f"traffic dropped to {self.value:.0f} req/min (baseline {self.expected:.0f})"
+        return f"traffic surged to {self.value:.0f} req/min (baseline {self.expected:.0f})"
+
+class AnomalyDetector:
+    """
+    Online per-route baselines for latency (p95), error rate and traffic.
+    Each aggregated bucket is scored against the baseline and then folded in,
+    so detection never re-reads history. Routes missing from a bucket are
+    observed as zero traffic, which is how drops-to-zero are caught.
+    """
+    def __init__(self):
+        self.baselines: Dict[str, RouteBaseline] = {}
+
+    def observe(self, aggregates: EndpointAggregates) -> List[Anomaly]:
+        anomalies: List[Anomaly] = []
+        seen = set()
+
+        for i, endpoint in enumerate(aggregates.endpoints):
+            seen.add(endpoint)
+            baseline = self.baselines.get(endpoint)
+            if baseline is None:
+                baseline = self.baselines[endpoint] = RouteBaseline()
+
+            requests = aggregates.requests[i]
+            warm = baseline.samples >= WARMUP_BUCKETS
+
+            # Traffic (both directions)
+            anomalies += self._check(endpoint, "traffic", baseline.traffic, float(requests), warm,
+                                     std_floor=max(1.0, math.sqrt(max(baseline.traffic.mean, 0.0))))
+
+            if requests >= MIN_REQUESTS_FOR_RATES:
+                error_rate = aggregates.errors[i] / requests
+                anomalies += self._check(endpoint, "error_rate", baseline.error_rate, error_rate, warm,
+                                         std_floor=0.02)
+                p95 = aggregates.p95_latency[i]
+                anomalies += self._check(endpoint, "latency", baseline.latency, p95, warm,
+                                         std_floor=max(10.0, 0.1 * baseline.latency.mean))
+
+            baseline.samples += 1
+
+        # Routes that sent nothing this bucket
+        for endpoint in list(self.baselines.keys() - seen):
+            baseline = self.baselines[endpoint]
+            warm = baseline.samples >= WARMUP_BUCKETS
+            if warm and baseline.traffic.mean >= MIN_TRAFFIC_FOR_DROP:
+                anomalies += self._check(endpoint, "traffic", baseline.traffic, 0.0, warm,
+                                         std_floor=max(1.0, math.sqrt(baseline.traffic.mean)))
+            else:
+                baseline.traffic.update(0.0)
+            if baseline.traffic.mean < EXPIRE_TRAFFIC:
+                # Keeps memory bounded by the set of live routes
+                del self.baselines[endpoint]
+
+        return anomalies
+
+    def _check(self, endpoint: str, signal: str, baseline: EwmBaseline, value: float,
+               warm: bool, std_floor: float) -> List[Anomaly]:
+        if not warm:
+            # Seed directly from the first sample, then smooth
+            baseline.update(value, alpha=1.0 if baseline.mean == 0 and baseline.var == 0 else ALPHA)
+            return []
+
+        z = baseline.zscore(value, std_floor)
+        expected = baseline.mean
+        anomaly: Optional[Anomaly] = None
+        if signal == "latency" and z > Z_THRESHOLD:
+            anomaly = Anomaly(endpoint, "latency_spike", value, expected, z, "high")
+        elif signal == "error_rate" and z > Z_THRESHOLD:
+            anomaly = Anomaly(endpoint, "error_spike", value, expected, z, "high")
+        elif signal == "traffic" and z < -Z_THRESHOLD and expected >= MIN_TRAFFIC_FOR_DROP:
+            anomaly = Anomaly(endpoint, "traffic_drop", value, expected, z, "critical" if value == 0 else "high")
+        elif signal == "traffic" and z > Z_THRESHOLD:
+            anomaly = Anomaly(endpoint, "traffic_surge", value, expected, z, "medium")
+
+        baseline.update(value, alpha=ANOMALOUS_ALPHA if anomaly else ALPHA)
+        return [anomaly] if anomaly else []
+
+    # --- Persistence -------------------------------------------------
+
+    def snapshot(self) -> bytes:
+        """Compact state: one flat list of 7 numbers per route."""
+        return serialization.dumps({
+            endpoint: [
+                b.latency.mean, b.latency.var,
+                b.error_rate.mean, b.error_rate.var,
+                b.traffic.mean, b.traffic.var,
+                b.samples
+            ]
+            for endpoint, b in self.baselines.items()
+        })
+
+    def restore(self, data: bytes):
+        baselines = {}
+        for endpoint, values in serialization.loads(data).items():
+            baseline = RouteBaseline()
+            baseline.latency = EwmBaseline(values[0], values[1])
+            baseline.error_rate = EwmBaseline(values[2], values[3])
+            baseline.traffic = EwmBaseline(values[4], values[5])
+            baseline.samples = int(values[6])
+            baselines[endpoint] = baseline
+        self.baselines = baselines
+
+    async def load(self):
+        """
+        Pull the shared snapshot before scoring a bucket. Whichever replica
+        aggregates next continues from the same state, and restarts resume
+        instead of re-learning from history.
+        """
+        try:
+            data = await redis_client.get(SNAPSHOT_KEY)
+            if data:
+                self.restore(data)
+        except Exception as e:
+            print(f"ERROR:   Baseline restore failed: {e}")
+
+    async def save(self):
+        try:
+            await redis_client.set(SNAPSHOT_KEY, self.snapshot())
+        except Exception as e:
+            print(f"ERROR:   Baseline snapshot failed: {e}")
+
+# Global Instance
+anomaly_detector = AnomalyDetector()
@@ -16,6 +16,7 @@ class Incident(Base):
     end_time = Column(DateTime, nullable=True)
     
     # Context
+    endpoint = Column(String(300), nullable=True) # "METHOD /path" this incident tracks
     description = Column(String, nullable=False) # e.g. "High Error Rate (>5%)"
     affected_endpoints = Column(String, nullable=True) # JSON string or comma-separated
     
@@ -24,5 +25,6 @@ class Incident(Base):
     ai_action_items = Column(String, nullable=True)
 
     __table_args__ = (
-        Index('idx_incidents_status', 'status'),
+        # One active incident per endpoint: lookups are always (status, endpoint)
+        Index('idx_incidents_status_endpoint', 'status', 'endpoint'),
     )
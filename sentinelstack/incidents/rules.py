@@ -0,0 +1,351 @@
+"""
+Incident rule language.
+
+One rule per line, '#' starts a comment:
+
+    [name:] metric(filters) op threshold [for duration] [severity level]
+
+    payments_slow: p95(path="/payments") > 800ms for 3m severity critical
+    api_errors:    error_rate(path=~"^/api/", method="POST") > 2%
+    high_latency:  p95() > 2s
+
+metrics    p95, avg_latency (ms) | error_rate (fraction, accepts %) | errors, requests (per bucket) | rps
+filters    path / method with = (exact), != or =~ (regex). No filter = every endpoint
+duration   consecutive 1-minute buckets the condition must hold (s, m, h; default 1m)
+severity   low, medium, high (default), critical
+
+Rules are parsed once and compiled into closures. Exact-path rules jump straight
+to their rows through the bucket's path index; the rest are evaluated column-wise
+(see RuleEngine), so cost tracks the number of rules and breaches rather than
+rules x endpoints.
+"""
+import bisect
+import hashlib
+import math
+import operator
+import os
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+from sentinelstack.aggregation.buckets import EndpointAggregates
+from sentinelstack.cache import redis_client, client_cache
+from sentinelstack.config import settings
+
+# Shared copy of the active rule set (version + text) for every replica
+RULES_KEY = "incident:rules"
+
+# Equivalent of the old module constants
+DEFAULT_RULES = """
+high_error_rate:     error_rate() > 5% severity high
+critical_error_rate: error_rate() > 20% severity critical
+high_latency:        p95() > 2000ms severity high
+"""
+
+METRICS = ("p95", "avg_latency", "error_rate", "errors", "requests", "rps")
+VOLUME_METRICS = ("errors", "requests", "rps")  # Meaningful even on quiet endpoints
+SEVERITIES = ("low", "medium", "high", "critical")
+OPERATORS = {
+    ">": operator.gt, ">=": operator.ge,
+    "<": operator.lt, "<=": operator.le,
+    "==": operator.eq, "!=": operator.ne,
+}
+
+RULE_RE = re.compile(
+    r"""^(?:(?P<name>[\w.\-]+)\s*:\s*)?
+        (?P<metric>\w+)\s*\((?P<filters>.*)\)\s*
+        (?P<op>>=|<=|==|!=|>|<)\s*
+        (?P<value>\d+(?:\.\d+)?)\s*(?P<unit>ms|s|%)?
+        (?:\s+for\s+(?P<duration>\d+)\s*(?P<duration_unit>[smh]))?
+        (?:\s+severity\s+(?P<severity>\w+))?\s*$""",
+    re.VERBOSE | re.IGNORECASE
+)
+FILTER_RE = re.compile(r'\s*(?P<field>path|method)\s*(?P<op>=~|!=|=)\s*"(?P<value>[^"]*)"\s*(?:,|$)')
+COMMENT_RE = re.compile(r"(?:^|\s)#.*$")
+
+class RuleSyntaxError(ValueError):
+    pass
+
+class CompiledRule:
+    __slots__ = (
+        "name", "source", "metric", "severity", "for_buckets",
+        "op", "threshold", "exact_path", "selector_key", "matches", "test"
+    )
+
+    def __init__(self, name: str, source: str, metric: str, severity: str, for_buckets: int,
+                 op: str, threshold: float, exact_path: Optional[str], selector_key: Tuple,
+                 matches: Callable[[str, str], bool], test: Callable[[float], bool]):
+        self.name = name
+        self.source = source
+        self.metric = metric
+        self.severity = severity
+        self.for_buckets = for_buckets
+        self.op = op
+        self.threshold = threshold
+        self.exact_path = exact_path      # Fast path: look rows up by path
+        self.selector_key = selector_key  # Remaining filters; rules sharing it share match results
+        self.matches = matches            # (method, path) -> bool, for the remaining filters
+        self.test = test                  # value -> breaching?
+
+class RuleMatch:
+    __slots__ = ("rule", "endpoint", "value")
+
+    def __init__(self, rule: CompiledRule, endpoint: str, value: float):
+        self.rule = rule
+        self.endpoint = endpoint
+        self.value = value
+
+    @property
+    def severity(self) -> str:
+        return self.rule.severity
+
+    @property
+    def reason(self) -> str:
+        return f"{self.rule.name}: {self.rule.metric} {format_value(self.rule.metric, self.value)}"
+
+def format_value(metric: str, value: float) -> str:
+    if metric in ("p95", "avg_latency"):
+        return f"{value:.0f}ms"
+    if metric == "error_rate":
+        return f"{value:.1%}"
+    if metric == "rps":
+        return f"{value:.2f}"
+    return f"{value:.0f}"
+
+def _parse_filters(text: str, line_no: int) -> List[Tuple[str, str, str]]:
+    filters = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = FILTER_RE.match(text, pos)
+        if not match:
+            raise RuleSyntaxError(f"line {line_no}: bad filter near '{text[pos:]}'")
+        filters.append((match["field"], match["op"], match["value"]))
+        pos = match.end()
+    return filters
+
+def _compile_selector(filters: List[Tuple[str, str, str]], line_no: int):
+    exact_path = None
+    predicates = []
+    for field, op, value in filters:
+        if field == "method":
+            value = value.upper()
+        if field == "path" and op == "=" and exact_path is None:
+            exact_path = value
+            continue
+        column = 0 if field == "method" else 1
+        if op == "=":
+            predicates.append(lambda ep, c=column, v=value: ep[c] == v)
+        elif op == "!=":
+            predicates.append(lambda ep, c=column, v=value: ep[c] != v)
+        else:
+            try:
+                pattern = re.compile(value)
+            except re.error as e:
+                raise RuleSyntaxError(f"line {line_no}: bad regex '{value}': {e}")
+            predicates.append(lambda ep, c=column, p=pattern: p.search(ep[c]) is not None)
+
+    if not predicates:
+        return exact_path, lambda method, path: True
+    return exact_path, lambda method, path: all(pred((method, path)) for pred in predicates)
+
+def compile_rule(source: str, line_no: int = 1) -> CompiledRule:
+    match = RULE_RE.match(source.strip())
+    if not match:
+        raise RuleSyntaxError(f"line {line_no}: cannot parse '{source.strip()}'")
+
+    metric = match["metric"].lower()
+    if metric not in METRICS:
+        raise RuleSyntaxError(f"line {line_no}: unknown metric '{metric}' (expected one of {', '.join(METRICS)})")
+
+    # Normalise the threshold to the metric's native unit
+    threshold = float(match["value"])
+    unit = (match["unit"] or "").lower()
+    if unit == "%":
+        if metric != "error_rate":
+            raise RuleSyntaxError(f"line {line_no}: '%' only applies to error_rate")
+        threshold /= 100
+    elif unit in ("ms", "s"):
+        if metric not in ("p95", "avg_latency"):
+            raise RuleSyntaxError(f"line {line_no}: time units only apply to latency metrics")
+        if unit == "s":
+            threshold *= 1000
+
+    for_buckets = 1
+    if match["duration"]:
+        seconds = int(match["duration"]) * {"s": 1, "m": 60, "h": 3600}[match["duration_unit"].lower()]
+        for_buckets = max(1, math.ceil(seconds / 60))
+
+    severity = (match["severity"] or "high").lower()
+    if severity not in SEVERITIES:
+        raise RuleSyntaxError(f"line {line_no}: unknown severity '{severity}'")
+
+    filters = _parse_filters(match["filters"], line_no)
+    exact_path, matches = _compile_selector(filters, line_no)
+    selector_key = tuple(f for f in filters if not (f[0] == "path" and f[1] == "=" and f[2] == exact_path))
+    compare = OPERATORS[match["op"]]
+
+    return CompiledRule(
+        name=match["name"] or source.strip(),
+        source=source.strip(),
+        metric=metric,
+        severity=severity,
+        for_buckets=for_buckets,
+        op=match["op"],
+        threshold=threshold,
+        exact_path=exact_path,
+        selector_key=selector_key,
+        matches=matches,
+        test=lambda value: compare(value, threshold)
+    )
+
+def compile_rules(text: str) -> List[CompiledRule]:
+    rules = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        line = COMMENT_RE.sub("", line).strip()
+        if line:
+            rules.append(compile_rule(line, line_no))
+    return rules
+
+class RuleEngine:
+    """
+    Evaluates the compiled rule set against each bucket and tracks
+    `for` streaks per (rule, endpoint).
+
+    Rules without an exact path are evaluated column-wise: each metric column
+    is sorted once per bucket, and a threshold becomes a bisect over it. Only
+    the rows past the threshold then go through the rule's filters. Filter
+    results are memoised per endpoint, since routes rarely change between buckets.
+    """
+    MAX_SELECTOR_MEMO = 100_000  # Entries per filter set before the memo is rebuilt
+
+    def __init__(self):
+        self.rules: List[CompiledRule] = compile_rules(DEFAULT_RULES)
+        self.version = "default"
+        self._streaks: Dict[Tuple[str, str], int] = {}
+        self._selector_memo: Dict[Tuple, Dict[str, bool]] = {}
+        self._file_mtime: Optional[float] = None
+
+    def load_text(self, text: str, version: str):
+        self.rules = compile_rules(text)
+        self.version = version
+        self._selector_memo = {}
+        # Keep streaks only for rules that survived the reload
+        sources = {rule.source for rule in self.rules}
+        self._streaks = {key: n for key, n in self._streaks.items() if key[0] in sources}
+        print(f"INFO:    Loaded {len(self.rules)} incident rules (version {version})")
+
+    @staticmethod
+    def _past_threshold(rule: CompiledRule, values: List[float], sorted_column) -> List[int]:
+        """Row indices whose value satisfies `op threshold`."""
+        if rule.op in ("==", "!="):
+            return [i for i, value in enumerate(values) if rule.test(value)]
+        ordered_values, order = sorted_column()
+        if rule.op == ">":
+            return order[bisect.bisect_right(ordered_values, rule.threshold):]
+        if rule.op == ">=":
+            return order[bisect.bisect_left(ordered_values, rule.threshold):]
+        if rule.op == "<":
+            return order[:bisect.bisect_left(ordered_values, rule.threshold)]
+        return order[:bisect.bisect_right(ordered_values, rule.threshold)]
+
+    def evaluate(self, aggregates: EndpointAggregates, min_requests: int = 0) -> List[RuleMatch]:
+        # Metric columns are computed once per bucket and shared by every rule
+        columns = {
+            "p95": aggregates.p95_latency,
+            "avg_latency": aggregates.avg_latency,
+            "error_rate": aggregates.error_rates(),
+            "errors": aggregates.errors,
+            "requests": aggregates.requests,
+            "rps": [r / 60 for r in aggregates.requests],
+        }
+        sorted_columns: Dict[str, Tuple[List[float], List[int]]] = {}
+
+        def sorted_column_for(metric: str):
+            def build():
+                if metric not in sorted_columns:
+                    values = columns[metric]
+                    order = sorted(range(len(values)), key=values.__getitem__)
+                    sorted_columns[metric] = ([values[i] for i in order], order)
+                return sorted_columns[metric]
+            return build
+
+        requests = aggregates.requests
+        methods = aggregates.methods
+        paths = aggregates.paths
+        endpoints = aggregates.endpoints
+
+        matches: List[RuleMatch] = []
+        streaks: Dict[Tuple[str, str], int] = {}
+        previous = self._streaks
+        for rule in self.rules:
+            values = columns[rule.metric]
+
+            if rule.exact_path is not None:
+                rows = [
+                    i for i in aggregates.indices_for_path(rule.exact_path)
+                    if rule.test(values[i]) and rule.matches(methods[i], paths[i])
+                ]
+            else:
+                rows = self._past_threshold(rule, values, sorted_column_for(rule.metric))
+                if rule.selector_key:
+                    memo = self._selector_memo.setdefault(rule.selector_key, {})
+                    if len(memo) > self.MAX_SELECTOR_MEMO:
+                        memo.clear()
+                    selected = []
+                    for i in rows:
+                        hit = memo.get(endpoints[i])
+                        if hit is None:
+                            hit = memo[endpoints[i]] = rule.matches(methods[i], paths[i])
+                        if hit:
+                            selected.append(i)
+                    rows = selected
+
+            needs_volume = rule.metric not in VOLUME_METRICS
+            for i in rows:
+                if needs_volume and requests[i] < min_requests:
+                    continue
+                key = (rule.source, endpoints[i])
+                streak = previous.get(key, 0) + 1
+                streaks[key] = streak
+                if streak >= rule.for_buckets:
+                    matches.append(RuleMatch(rule, endpoints[i], values[i]))
+
+        # Anything that didn't breach this bucket starts over
+        self._streaks = streaks
+        return matches
+
+    async def refresh(self):
+        """
+        Hot reload, called once per bucket.
+        1. If the local rule file changed, validate it and publish it to Redis.
+        2. If the shared version differs from ours, recompile from Redis.
+        """
+        try:
+            path = settings.INCIDENT_RULES_FILE
+            if path and os.path.exists(path):
+                mtime = os.stat(path).st_mtime
+                if mtime != self._file_mtime:
+                    with open(path, encoding="utf-8") as f:
+                        text = f.read()
+                    try:
+                        compile_rules(text)  # Never share a rule set that doesn't compile
+                    except RuleSyntaxError as e:
+                        print(f"ERROR:   Rejected {path}: {e}")
+                    else:
+                        version = hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+                        await redis_client.hset(RULES_KEY, mapping={"version": version, "text": text})
+                        client_cache.forget(RULES_KEY)
+                    # Only once published (or rejected): a failed publish retries next bucket
+                    self._file_mtime = mtime
+
+            # Answered from process memory until the shared rules change
+            version = await client_cache.hget(RULES_KEY, "version")
+            if version and version != self.version:
+                shared = await redis_client.hgetall(RULES_KEY)
+                self.load_text(shared["text"], shared["version"])
+        except RuleSyntaxError as e:
+            print(f"ERROR:   Shared incident rules invalid, keeping version {self.version}: {e}")
+        except Exception as e:
+            print(f"ERROR:   Incident rule refresh failed: {e}")
+
+# Global Instance
+rule_engine = RuleEngine()
@@ -1,77 +1,139 @@
 from datetime import datetime
-from sqlalchemy import select, update, and_
+from typing import Dict, List, Tuple
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sentinelstack.aggregation.models import RequestMetric
+from sentinelstack.aggregation.buckets import EndpointAggregates
 from sentinelstack.incidents.models import Incident
-from sentinelstack.ai.service import ai_service # Circular import risk handled later
+from sentinelstack.incidents.anomaly import anomaly_detector
+from sentinelstack.incidents.rules import rule_engine
+from sentinelstack.ai.worker import analysis_queue
+from sentinelstack.cache import status_cache
+from sentinelstack.stats.stream import event_broadcaster
 
-# Threshold Configuration
-ERROR_RATE_THRESHOLD = 0.05  # 5%
-LATENCY_P95_THRESHOLD = 2000 # 2s (If we had p95 data, using avg for now > 500ms)
-MIN_REQUESTS_FOR_ALERT = 50  # Don't alert on 1 error out of 2 requests
+# Thresholds live in the rule engine (incidents/rules.py) and hot reload.
+MIN_REQUESTS_FOR_ALERT = 10  # Per endpoint per minute. Don't alert on 1 error out of 2 requests
+QUIET_BUCKETS_TO_RESOLVE = 15  # Consecutive buckets below that floor (and not breaching) that close an incident
+
+SEVERITY_RANK = {"low": 0, "medium": 1, "high": 2, "critical": 3}
 
 class IncidentService:
-    async def check_thresholds(self, session: AsyncSession, bucket_time: datetime):
+    def __init__(self):
+        # Active incident endpoint -> consecutive buckets too quiet to judge.
+        # Kept in memory: a new aggregation leader only starts counting again.
+        self.quiet_buckets: Dict[str, int] = {}
+
+    async def check_thresholds(self, session: AsyncSession, aggregates: EndpointAggregates):
         """
         Run immediately after aggregation to detect anomalies.
+        Rules are evaluated per endpoint on the aggregator's in-memory buckets,
+        so a failing low-traffic route is not hidden by healthy high-traffic ones.
+        An empty bucket is still evaluated: that is how drops to zero are seen.
         """
-        # 1. Fetch Aggregated Metrics for this bucket
-        stmt = select(RequestMetric).where(RequestMetric.bucket_time == bucket_time)
-        result = await session.execute(stmt)
-        metrics = result.scalars().all()
-        
-        if not metrics:
-            return
+        # 1. Evaluate every endpoint against the compiled rules, then
+        # against each route's statistical baseline
+        error_rates = aggregates.error_rates()
+        measured = set()   # Endpoints with enough volume to judge this bucket
+        breaching: Dict[str, Tuple[str, List[str]]] = {}  # endpoint -> (severity, reasons)
 
-        # 2. Calculate Gloabl Stats
-        total_reqs = sum(m.total_requests for m in metrics)
-        total_errors = sum(m.total_errors for m in metrics)
-        
-        # Avoid division by zero
-        if total_reqs < MIN_REQUESTS_FOR_ALERT:
-            # If volume is low, auto-resolve any active incidents? 
-            # For v1, we just ignore checks.
-            return
+        def flag(endpoint: str, severity: str, reason: str):
+            current, reasons = breaching.get(endpoint, ("low", []))
+            if SEVERITY_RANK[severity] > SEVERITY_RANK[current]:
+                current = severity
+            breaching[endpoint] = (current, reasons + [reason])
+
+        for endpoint, requests in zip(aggregates.endpoints, aggregates.requests):
+            if requests >= MIN_REQUESTS_FOR_ALERT:
+                measured.add(endpoint)
+
+        await rule_engine.refresh()
+        for match in rule_engine.evaluate(aggregates, min_requests=MIN_REQUESTS_FOR_ALERT):
+            flag(match.endpoint, match.severity, match.reason)
+
+        await anomaly_detector.load()
+        for anomaly in anomaly_detector.observe(aggregates):
+            flag(anomaly.endpoint, anomaly.severity, f"Anomaly: {anomaly.describe()}")
+        await anomaly_detector.save()
 
-        error_rate = total_errors / total_reqs
-        is_breaching = error_rate > ERROR_RATE_THRESHOLD
-        
-        # 3. Check for Active Incidents
-        active_stmt = select(Incident).where(Incident.status == "active").limit(1)
-        active_incident = (await session.execute(active_stmt)).scalar_one_or_none()
+        # 2. Load all active incidents at once (served by idx_incidents_status_endpoint)
+        active_stmt = select(Incident).where(Incident.status == "active")
+        active: Dict[str, Incident] = {
+            incident.endpoint: incident
+            for incident in (await session.execute(active_stmt, execution_options={"query_name": "incidents.active"})).scalars().all()
+        }
 
-        # 4. State Machine Logic
-        if is_breaching:
-            if not active_incident:
+        # 3. State Machine Logic (independent per endpoint)
+        opened: List[Incident] = []
+        escalated: List[Incident] = []
+        for endpoint, (severity, reasons) in breaching.items():
+            incident = active.get(endpoint)
+            if incident is None:
                 # NEW INCIDENT
-                print(f"WARN:    Creating Incident! Error Rate: {error_rate:.2%}")
-                new_incident = Incident(
+                print(f"WARN:    Creating Incident on {endpoint}! {'; '.join(reasons)}")
+                incident = Incident(
                     status="active",
-                    severity="critical" if error_rate > 0.2 else "high",
-                    description=f"High Error Rate Detected: {error_rate:.1%}",
-                    start_time=bucket_time,
-                    affected_endpoints=",".join(set([m.path for m in metrics if m.total_errors > 0]))
+                    severity=severity,
+                    description=f"{'; '.join(reasons)} on {endpoint}",
+                    start_time=aggregates.bucket_time,
+                    endpoint=endpoint,
+                    affected_endpoints=endpoint
                 )
-                session.add(new_incident)
-                await session.commit()
-                
-                # Trigger AI Analysis (Async)
-                # In production, this would be a separate queue message.
-                # Here, we just let the background worker pick it up or fire & forget
-                # For v1 simple, we do nothing. The Dashboard will see it.
-                
-            else:
-                # ONGOING INCIDENT (Update stats if needed)
-                pass
-                
+                opened.append(incident)
+            elif SEVERITY_RANK[severity] > SEVERITY_RANK.get(incident.severity, 0):
+                # ONGOING INCIDENT (Escalate)
+                incident.severity = severity
+                escalated.append(incident)
+
+        # An endpoint that went quiet can't be judged recovered from its traffic,
+        # so it resolves after QUIET_BUCKETS_TO_RESOLVE buckets without a breach
+        resolved: List[Tuple[Incident, str]] = []
+        quiet: Dict[str, int] = {}
+        for endpoint, incident in active.items():
+            if endpoint in breaching:
+                continue
+            if endpoint in measured:
+                final_rate = error_rates[aggregates.index_of(endpoint)]
+                resolved.append((incident, f"Final Error Rate: {final_rate:.1%}"))
+                continue
+            quiet[endpoint] = self.quiet_buckets.get(endpoint, 0) + 1
+            if quiet[endpoint] >= QUIET_BUCKETS_TO_RESOLVE:
+                resolved.append((incident, f"Under {MIN_REQUESTS_FOR_ALERT} requests/min for {quiet.pop(endpoint)} buckets"))
+        self.quiet_buckets = quiet
+
+        for incident, reason in resolved:
+            # RESOLVE INCIDENT
+            print(f"INFO:    Resolving Incident {incident.id} ({incident.endpoint})")
+            incident.status = "resolved"
+            incident.end_time = datetime.utcnow()
+            incident.description += f" [Resolved. {reason}]"
+
+        if not (opened or resolved or escalated):
+            return
+
+        session.add_all(opened)
+        await session.commit()
+        await status_cache.invalidate("current")
+
+        # AI analysis runs in the background worker pool, never on this path
+        for incident in opened + escalated:
+            analysis_queue.enqueue(incident.id)
+
+        # 4. Push the overall state change to live dashboards
+        still_active = [i for i in active.values() if i.status == "active"] + opened
+        if still_active:
+            latest = max(still_active, key=lambda i: i.start_time)
+            await event_broadcaster.publish("incident", {
+                "health": "critical" if any(i.severity == "critical" for i in still_active) else "degraded",
+                "summary": latest.description,
+                "incident_id": latest.id,
+                "active_incidents": len(still_active)
+            })
         else:
-            if active_incident:
-                # RESOLVE INCIDENT
-                print(f"INFO:    Resolving Incident {active_incident.id}")
-                active_incident.status = "resolved"
-                active_incident.end_time = datetime.utcnow()
-                active_incident.description += f" [Resolved. Final Error Rate: {error_rate:.1%}]"
-                await session.commit()
+            await event_broadcaster.publish("incident", {
+                "health": "operational",
+                "summary": "All systems healthy. No active incidents.",
+                "incident_id": None,
+                "active_incidents": 0
+            })
 
 # Global Instance
 incident_service = IncidentService()
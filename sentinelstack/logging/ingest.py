@@ -0,0 +1,130 @@
+"""
+Log ingest: moves request logs from the Redis stream into Postgres.
+
+Runs as its own process so gateway replicas never hold DB connections for
+logging (LOG_TRANSPORT=stream). Several ingest processes can share the
+work; the consumer group hands each entry to exactly one of them.
+
+Usage:
+    python -m sentinelstack.logging.ingest [--consumer NAME] [--batch N]
+"""
+import argparse
+import asyncio
+import socket
+import time
+from typing import List, Tuple
+from asyncpg.exceptions import UniqueViolationError
+from redis.exceptions import ResponseError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sentinelstack.database import engine
+from sentinelstack.logging.models import RequestLog
+from sentinelstack.logging.stream import (
+    stream_client,
+    decode_record,
+    LOG_STREAM,
+    LOG_GROUP,
+    COPY_COLUMNS
+)
+
+# Configuration
+READ_COUNT = 5000         # Stream entries per read, i.e. rows per COPY
+BLOCK_MS = 2000           # Wait for new entries before looping
+CLAIM_IDLE_MS = 60_000    # Unacknowledged this long: the consumer that read it died
+CLAIM_INTERVAL = 30.0     # Seconds between sweeps for such entries
+RETRY_DELAY = 2.0
+
+class LogIngestor:
+    def __init__(self, consumer: str, count: int = READ_COUNT):
+        self.consumer = consumer
+        self.count = count
+        self.is_running = False
+        self._last_claim = 0.0
+
+    async def ensure_group(self):
+        try:
+            # From the start of the stream: nothing published before the first ingest is lost
+            await stream_client.xgroup_create(LOG_STREAM, LOG_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def run(self):
+        self.is_running = True
+        await self.ensure_group()
+        print(f"INFO:    Log Ingest Started (consumer: {self.consumer}, batch: {self.count})")
+
+        while self.is_running:
+            try:
+                entries = await self._claim_abandoned() or await self._read()
+                if entries:
+                    await self.ingest(entries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Nothing was acknowledged: the same entries are retried
+                print(f"ERROR:   Log Ingest Failed: {e}")
+                await asyncio.sleep(RETRY_DELAY)
+
+    async def _read(self) -> List[Tuple]:
+        response = await stream_client.xreadgroup(
+            LOG_GROUP, self.consumer, {LOG_STREAM: ">"}, count=self.count, block=BLOCK_MS
+        )
+        return response[0][1] if response else []
+
+    async def _claim_abandoned(self) -> List[Tuple]:
+        """Pending entries of crashed consumers (this one included, after a restart)."""
+        if time.monotonic() - self._last_claim < CLAIM_INTERVAL:
+            return []
+        self._last_claim = time.monotonic()
+        result = await stream_client.xautoclaim(
+            LOG_STREAM, LOG_GROUP, self.consumer, min_idle_time=CLAIM_IDLE_MS, count=self.count
+        )
+        return result[1]
+
+    async def ingest(self, entries: List[Tuple]):
+        """COPY one batch, then acknowledge it. A crash in between redelivers the batch."""
+        ids, rows = [], []
+        for entry_id, fields in entries:
+            ids.append(entry_id)
+            if not fields:
+                continue  # Trimmed before it was claimed
+            try:
+                rows.append(decode_record(entry_id, fields))
+            except Exception as e:
+                # Acknowledged anyway: a record that can't be decoded never will be
+                print(f"ERROR:   Dropping undecodable log entry {entry_id}: {e}")
+
+        if rows:
+            await self._copy(rows)
+        await stream_client.xack(LOG_STREAM, LOG_GROUP, *ids)
+        print(f"INFO:    Ingested {len(rows)} request logs")
+
+    async def _copy(self, rows: List[Tuple]):
+        async with engine.connect() as conn:
+            raw = (await conn.get_raw_connection()).driver_connection
+            try:
+                # COPY: one round trip and no per-row statement overhead
+                await raw.copy_records_to_table(RequestLog.__tablename__, records=rows, columns=COPY_COLUMNS)
+            except UniqueViolationError:
+                # Redelivered batch that was already (partly) stored: keep the stored rows
+                stmt = pg_insert(RequestLog).on_conflict_do_nothing(index_elements=["id"])
+                await conn.execute(
+                    stmt, [dict(zip(COPY_COLUMNS, row)) for row in rows],
+                    execution_options={"query_name": "logs.ingest_redelivered"}
+                )
+                await conn.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Consume request logs from the Redis stream into Postgres.")
+    parser.add_argument("--consumer", default=socket.gethostname(),
+                        help="Consumer name; stable across restarts so pending entries are resumed")
+    parser.add_argument("--batch", type=int, default=READ_COUNT, help="Entries per read / rows per COPY")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(LogIngestor(args.consumer, args.batch).run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 import asyncio
 from typing import List, Dict
 from sqlalchemy import insert
+from sentinelstack.config import settings
 from sentinelstack.database import AsyncSessionLocal
 from sentinelstack.logging.models import RequestLog
+from sentinelstack.logging.stream import publish_batch
 
 # Configuration
 BATCH_SIZE = 100
@@ -42,7 +44,7 @@ class LogService:
                     batch.append(self.queue.get_nowait())
                     self.queue.task_done()
                 
-                # 3. Write Batch to DB
+                # 3. Write Batch (Redis stream or DB, see LOG_TRANSPORT)
                 if batch:
                     await self._flush_batch(batch)
                     
@@ -51,10 +53,19 @@ class LogService:
                 # Don't crash the loop, just log error
 
     async def _flush_batch(self, batch: List[Dict]):
+        if settings.LOG_TRANSPORT == "stream":
+            try:
+                await publish_batch(batch)
+                return
+            except Exception as e:
+                # Redis unavailable: write this batch directly rather than lose it
+                print(f"ERROR:   Log Stream Publish Failed, writing to DB: {e}")
+
         async with AsyncSessionLocal() as db:
             try:
-                # Efficient Bulk Insert
-                await db.execute(insert(RequestLog).values(batch))
+                # Efficient Bulk Insert: executemany keeps one statement text for any
+                # batch size, so the prepared statement is reused instead of re-planned
+                await db.execute(insert(RequestLog), batch, execution_options={"query_name": "logs.insert_batch"})
                 await db.commit()
             except Exception as e:
                 print(f"ERROR:   DB Insert Failed: {e}")
@@ -0,0 +1,66 @@
+import datetime
+import uuid
+from typing import Dict, List, Tuple
+from sentinelstack.cache import redis_binary_client
+from sentinelstack import serialization
+
+# msgpack is optional: without it records are packed as compact JSON arrays
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - depends on environment
+    msgpack = None
+
+# Configuration
+LOG_STREAM = "logs:requests"
+LOG_GROUP = "ingest"
+LOG_STREAM_MAXLEN = 1_000_000  # Approximate cap; if ingest falls this far behind the oldest records are dropped
+
+# Positional record layout (no field names on the wire)
+RECORD_FIELDS = (
+    "request_id", "timestamp", "client_ip", "user_id",
+    "method", "path", "status_code", "latency_ms", "error_flag"
+)
+# COPY column order: the row id is derived from the stream entry id
+COPY_COLUMNS = ("id",) + RECORD_FIELDS
+
+# Records are binary, so this client must not decode responses
+stream_client = redis_binary_client
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+def encode_record(log: Dict) -> Dict[bytes, bytes]:
+    """One stream entry: a single field holding the packed record (m = msgpack, j = JSON)."""
+    record = [log[name] for name in RECORD_FIELDS]
+    record[1] = (log["timestamp"] - _EPOCH).total_seconds()  # Naive UTC -> epoch seconds
+    if msgpack is not None:
+        return {b"m": msgpack.packb(record)}
+    return {b"j": serialization.dumps(record)}
+
+def row_id(entry_id) -> uuid.UUID:
+    """
+    Stable primary key for a stream entry ("<ms>-<seq>"), so a batch that is
+    redelivered after a crash collides with the rows already stored instead
+    of duplicating them.
+    """
+    if isinstance(entry_id, bytes):
+        entry_id = entry_id.decode()
+    ms, _, seq = entry_id.partition("-")
+    return uuid.UUID(int=(int(ms) << 64) | int(seq or 0))
+
+def decode_record(entry_id, fields: Dict[bytes, bytes]) -> Tuple:
+    """Row tuple in COPY_COLUMNS order."""
+    if b"m" in fields:
+        if msgpack is None:
+            raise RuntimeError("msgpack-encoded log record but msgpack is not installed")
+        record = msgpack.unpackb(fields[b"m"])
+    else:
+        record = serialization.loads(fields[b"j"])
+    record[1] = _EPOCH + datetime.timedelta(seconds=record[1])
+    return (row_id(entry_id), *record)
+
+async def publish_batch(batch: List[Dict]):
+    """Append a batch of request logs to the stream in one pipelined round trip."""
+    async with stream_client.pipeline(transaction=False) as pipe:
+        for log in batch:
+            pipe.xadd(LOG_STREAM, encode_record(log), maxlen=LOG_STREAM_MAXLEN, approximate=True)
+        await pipe.execute()
@@ -0,0 +1,63 @@
+import asyncio
+import gzip
+import os
+import time
+from typing import Optional, Tuple
+from prometheus_client import CollectorRegistry, REGISTRY, generate_latest, multiprocess
+from sentinelstack.monitoring.metrics import MULTIPROC_DIR
+from sentinelstack.singleflight import SingleFlight
+
+# Configuration
+METRICS_CACHE_TTL = 5.0   # Seconds a rendered scrape is reused (Prometheus scrapes every 15s)
+METRICS_GZIP_LEVEL = 6
+
+def render_metrics() -> bytes:
+    """
+    Prometheus text format for /metrics.
+    In multi-worker mode any worker may answer the scrape, so it merges
+    every process's mmap files instead of reporting only its own registry.
+    """
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+def mark_process_dead(pid: Optional[int] = None):
+    """Drop a finished worker's live gauges (its counters keep counting toward totals)."""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid or os.getpid(), MULTIPROC_DIR)
+
+class MetricsExposition:
+    """
+    Serves /metrics from a short-lived cache.
+    Rendering walks every series, so it runs in a worker thread (never on the
+    event loop), at most once per TTL, and concurrent scrapes share one render.
+    The gzip variant is produced alongside it for scrapers that accept it.
+    """
+    def __init__(self, ttl: float = METRICS_CACHE_TTL):
+        self.ttl = ttl
+        self._rendered: Optional[Tuple[bytes, bytes]] = None  # (plain, gzipped)
+        self._rendered_at = 0.0
+        self._renders = SingleFlight("metrics")
+
+    async def get(self, gzipped: bool = False) -> bytes:
+        if self._rendered is None or time.monotonic() - self._rendered_at >= self.ttl:
+            await self._refresh()
+        plain, compressed = self._rendered
+        return compressed if gzipped else plain
+
+    async def _refresh(self):
+        await self._renders.do("render", self._render_and_store)
+
+    async def _render_and_store(self):
+        self._rendered = await asyncio.to_thread(self._render)
+        self._rendered_at = time.monotonic()
+
+    @staticmethod
+    def _render() -> Tuple[bytes, bytes]:
+        plain = render_metrics()
+        return plain, gzip.compress(plain, compresslevel=METRICS_GZIP_LEVEL)
+
+# Global Instance
+metrics_exposition = MetricsExposition()
@@ -1,5 +1,14 @@
+import os
+from typing import Dict, Set, Tuple
 from prometheus_client import Counter, Histogram, Gauge
 
+# Multi-worker mode (gunicorn.conf.py, or uvicorn --workers with the variable set):
+# every process writes its values to mmap files here and /metrics merges them.
+# The directory must exist before the first metric below is created.
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
 # ---------------------------------------------------------
 # HTTP RED METRICS (Rate, Errors, Duration)
 # ---------------------------------------------------------
@@ -39,7 +48,8 @@ RATE_LIMIT_HITS = Counter(
 # Monitors if the logging system is backing up
 LOG_QUEUE_SIZE = Gauge(
     "log_queue_size",
-    "Current number of logs waiting to be written to DB"
+    "Current number of logs waiting to be written to DB",
+    multiprocess_mode="livesum"  # Summed over running workers
 )
 
 # Counter: System Errors (Internal 500s captured by middleware)
@@ -47,4 +57,285 @@ SYSTEM_ERRORS = Counter(
     "system_unhandled_errors_total",
     "Total unhandled exceptions caught by middleware",
     ["path", "error_type"]
-)
\ No newline at end of file
+)
+
+# Gauge: bcrypt operations queued or running on the hashing executor
+PASSWORD_HASH_PENDING = Gauge(
+    "password_hash_pending",
+    "Password hash/verify operations waiting for or running on the bcrypt executor",
+    multiprocess_mode="livesum"
+)
+
+# Counter: Logins/signups rejected with 503 because the executor was saturated
+PASSWORD_HASH_SHED = Counter(
+    "password_hash_shed_total",
+    "Password operations rejected because the bcrypt executor was saturated"
+)
+
+# ---------------------------------------------------------
+# DATABASE METRICS
+# ---------------------------------------------------------
+
+# Gauge: Connections currently checked out of the pool
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Database connections currently in use",
+    ["pool"],
+    multiprocess_mode="livesum"
+)
+
+# Gauge: Connections open beyond pool_size (0 when the pool is not bursting)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Database connections open beyond the configured pool size",
+    ["pool"],
+    multiprocess_mode="livesum"
+)
+
+# Histogram: Time spent waiting for a pooled connection
+# Labels:
+# - pool: "primary" (and any additional engines)
+# Anything beyond the first bucket means the pool is the bottleneck, not Postgres
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting to check out a database connection",
+    ["pool"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+)
+
+# Histogram: Statement latency by query name
+# Labels:
+# - query_name: set per statement via .execution_options(query_name=...), else "other"
+DB_QUERY_DURATION_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Database statement latency in seconds",
+    ["query_name"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+# Gauge: Replication delay of the read replica (-1 while unreachable)
+DB_REPLICA_LAG_SECONDS = Gauge(
+    "db_replica_lag_seconds",
+    "Seconds the read replica is behind the primary",
+    multiprocess_mode="livemax"  # Every worker probes the same replica
+)
+
+# Counter: Read-only sessions sent to the primary instead of the replica
+# Labels:
+# - reason: "lagging" (behind the caller's bound) or "unavailable" (probe failing)
+DB_READ_FALLBACKS = Counter(
+    "db_read_fallbacks_total",
+    "Read-only sessions served by the primary because the replica was not fresh enough",
+    ["reason"]
+)
+
+# ---------------------------------------------------------
+# REDIS CLIENT-SIDE CACHE METRICS
+# ---------------------------------------------------------
+
+# Counter: Tracked reads, by where they were served from
+# Labels:
+# - result: "hit" (process memory) or "miss" (Redis round trip)
+# Hit ratio: rate(..{result="hit"}) / rate(..)
+REDIS_CLIENT_CACHE_REQUESTS = Counter(
+    "redis_client_cache_requests_total",
+    "Reads of tracked Redis keys",
+    ["result"]
+)
+
+# Counter: Local entries dropped because Redis reported a change
+# Labels:
+# - reason: "key" (tracking invalidation) or "flush" (reconnect / FLUSHALL)
+REDIS_CLIENT_CACHE_INVALIDATIONS = Counter(
+    "redis_client_cache_invalidations_total",
+    "Client-side cache invalidations received from Redis",
+    ["reason"]
+)
+
+# Gauge: Keys currently held in process memory
+REDIS_CLIENT_CACHE_ENTRIES = Gauge(
+    "redis_client_cache_entries",
+    "Redis keys cached in process memory",
+    multiprocess_mode="livesum"
+)
+
+# ---------------------------------------------------------
+# PROCESS COORDINATION METRICS
+# ---------------------------------------------------------
+
+# Gauge: 1 while this process holds a leader lease (see coordination.py)
+# Labels:
+# - lease: "aggregation"
+# Summed across workers and replicas this should be exactly 1
+LEADER_LEASE_HELD = Gauge(
+    "leader_lease_held",
+    "Whether this process currently holds the named leader lease",
+    ["lease"],
+    multiprocess_mode="livesum"
+)
+
+# ---------------------------------------------------------
+# UPSTREAM PROXY METRICS
+# ---------------------------------------------------------
+
+# Counter: Proxied requests per upstream
+# Labels:
+# - upstream: base URL from PROXY_ROUTES (bounded by configuration)
+# - outcome: "2xx".."5xx" for upstream responses, or "connect_error" / "timeout" / "no_upstream"
+PROXY_UPSTREAM_REQUESTS = Counter(
+    "proxy_upstream_requests_total",
+    "Requests forwarded to upstream services",
+    ["upstream", "outcome"]
+)
+
+# Histogram: Time until the upstream's response headers arrived
+PROXY_UPSTREAM_DURATION_SECONDS = Histogram(
+    "proxy_upstream_duration_seconds",
+    "Upstream time to response headers in seconds",
+    ["upstream"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+# Gauge: Requests currently in flight to an upstream (the load balancing signal)
+PROXY_UPSTREAM_OUTSTANDING = Gauge(
+    "proxy_upstream_outstanding",
+    "Requests in flight to the upstream",
+    ["upstream"],
+    multiprocess_mode="livesum"
+)
+
+# Gauge: 1 while the upstream passes health checks
+PROXY_UPSTREAM_HEALTHY = Gauge(
+    "proxy_upstream_healthy",
+    "Whether the upstream is currently considered healthy",
+    ["upstream"],
+    multiprocess_mode="livemin"  # Down if any worker sees it down
+)
+
+# ---------------------------------------------------------
+# RESPONSE CACHE METRICS
+# ---------------------------------------------------------
+
+# Counter: Requests on cached routes, by how they were answered
+# Labels:
+# - result: "hit", "stale" (served while revalidating), "miss", "bypass" (client asked for no-store)
+RESPONSE_CACHE_REQUESTS = Counter(
+    "response_cache_requests_total",
+    "Requests on response-cached routes",
+    ["result"]
+)
+
+# Counter: Body bytes served from the cache instead of the app
+RESPONSE_CACHE_SERVED_BYTES = Counter(
+    "response_cache_served_bytes_total",
+    "Response body bytes served from the response cache"
+)
+
+# Gauge: Bytes held by the in-process tier
+RESPONSE_CACHE_BYTES = Gauge(
+    "response_cache_bytes",
+    "Bytes held by the in-process response cache",
+    multiprocess_mode="livesum"
+)
+
+# ---------------------------------------------------------
+# REQUEST COALESCING METRICS
+# ---------------------------------------------------------
+
+# Counter: Calls to coalesced operations (see singleflight.py)
+# Labels:
+# - flight: the operation group, e.g. "stats", "llm", "cache:status" (fixed in code)
+# - role: "leader" (ran the work) or "coalesced" (shared a call already in flight)
+# Work saved: rate(..{role="coalesced"}) / rate(..)
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total",
+    "Calls to coalesced operations, by whether they ran the work or joined a call in flight",
+    ["flight", "role"]
+)
+
+# ---------------------------------------------------------
+# ADMISSION CONTROL METRICS
+# ---------------------------------------------------------
+
+# Gauge: Current adaptive concurrency limit (summed: total admission capacity)
+CONCURRENCY_LIMIT = Gauge(
+    "concurrency_limit",
+    "Adaptive cap on requests in flight",
+    multiprocess_mode="livesum"
+)
+
+# Gauge: Requests currently admitted and being processed
+CONCURRENCY_INFLIGHT = Gauge(
+    "concurrency_inflight",
+    "Requests admitted by the concurrency limiter and still in flight",
+    multiprocess_mode="livesum"
+)
+
+# Histogram: Time authenticated requests waited for a slot (admitted or not)
+CONCURRENCY_QUEUE_WAIT_SECONDS = Histogram(
+    "concurrency_queue_wait_seconds",
+    "Time spent waiting for a concurrency slot",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+
+# Counter: Requests rejected with 503 by the limiter
+# Labels:
+# - priority: "authenticated" or "anonymous"
+CONCURRENCY_SHED = Counter(
+    "concurrency_shed_total",
+    "Requests shed by the adaptive concurrency limiter",
+    ["priority"]
+)
+
+# ---------------------------------------------------------
+# CARDINALITY GUARD
+# ---------------------------------------------------------
+
+MAX_SERIES_PER_METRIC = 1000               # Distinct label sets per family before folding
+# Each worker guards its own series and /metrics merges every worker's, so in
+# multi-worker mode the budget is split: the merged family stays within the cap
+WORKER_COUNT = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)) if MULTIPROC_DIR else 1
+SERIES_PER_PROCESS = max(MAX_SERIES_PER_METRIC // max(WORKER_COUNT, 1), 1)
+UNBOUNDED_LABELS = ("path", "client_ip")   # Labels whose values come from the client
+OTHER_LABEL = "__other__"
+
+# Counter: Observations folded into __other__ because their family hit the cap
+# Labels:
+# - metric: the family that overflowed
+METRICS_SERIES_DROPPED = Counter(
+    "metrics_series_dropped_total",
+    "Observations recorded under __other__ because the metric reached its series cap",
+    ["metric"]
+)
+
+class CardinalityGuard:
+    """
+    Caps the series a metric family can grow to. Once a family has
+    SERIES_PER_PROCESS label sets, observations with a new label set are
+    recorded with their UNBOUNDED_LABELS replaced by "__other__": totals stay
+    right, scrapes stay small, and random URLs or scanner IPs can't blow up
+    memory in this process or in Prometheus. The cap is per process; with
+    WEB_CONCURRENCY workers each gets 1/WEB_CONCURRENCY of MAX_SERIES_PER_METRIC.
+    """
+    def __init__(self, limit: int = SERIES_PER_PROCESS, unbounded: Tuple[str, ...] = UNBOUNDED_LABELS):
+        self.limit = limit
+        self.unbounded = unbounded
+        self.series: Dict[str, Set[tuple]] = {}
+
+    def labels(self, metric, **labels):
+        """Drop-in for metric.labels(**labels)."""
+        name = metric._name
+        seen = self.series.get(name)
+        if seen is None:
+            seen = self.series[name] = set()
+        key = tuple(labels.values())
+        if key not in seen:
+            if len(seen) < self.limit:
+                seen.add(key)
+            else:
+                METRICS_SERIES_DROPPED.labels(metric=name).inc()
+                labels = {k: OTHER_LABEL if k in self.unbounded else v for k, v in labels.items()}
+        return metric.labels(**labels)
+
+# Global Instance
+cardinality_guard = CardinalityGuard()
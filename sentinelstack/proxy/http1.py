@@ -0,0 +1,280 @@
+"""
+Minimal pooled HTTP/1.1 client for plain-http upstreams.
+
+The proxy hot path only needs to write a request head, stream a body and
+read a response head plus framed body; a general-purpose client spends
+~1ms of CPU per request on URL models, header objects and anyio layers,
+this one ~0.05ms. TLS upstreams (and HTTP/2) go through httpx instead,
+see upstream.py.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Configuration
+READ_CHUNK = 64 * 1024     # Largest body piece handed on at once
+
+class UpstreamError(Exception):
+    """The upstream exchange failed (protocol error unless a subclass says otherwise)."""
+
+class UpstreamConnectError(UpstreamError):
+    """No connection could be made; the request was never sent."""
+
+class UpstreamDisconnected(UpstreamError):
+    """A pooled connection closed before any response byte; the upstream may not have seen the request."""
+
+class UpstreamTimeout(UpstreamError):
+    """The upstream accepted the request but did not answer in time."""
+
+class UpstreamPoolTimeout(UpstreamError):
+    """Every connection to the upstream stayed busy for the whole pool timeout."""
+
+Headers = List[Tuple[bytes, bytes]]
+
+class Http1Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.idle_since = 0.0
+        self.timed_out = False
+
+    def expire(self):
+        """Read deadline passed: aborting makes the pending read fail at once."""
+        self.timed_out = True
+        self.writer.transport.abort()
+
+    def close(self):
+        self.writer.transport.abort()
+
+class Http1Response:
+    """
+    Response head plus a body that is read from the connection only as the
+    caller iterates it. aclose() hands the connection back to the pool if
+    the body was read to the end and both sides allow keep-alive.
+    """
+    def __init__(self, pool: "Http1Pool", conn: Http1Connection, status_code: int, raw_headers: Headers,
+                 length: Optional[int], chunked: bool, keep_alive: bool):
+        self.status_code = status_code
+        self.raw_headers = raw_headers
+        self.content_length = None if chunked else length
+        self._pool = pool
+        self._conn = conn
+        self._length = length
+        self._chunked = chunked
+        self._keep_alive = keep_alive
+        self._complete = length == 0
+        self._closed = False
+
+    async def _read(self, coro):
+        # One timer per read instead of wait_for's task per read
+        deadline = asyncio.get_running_loop().call_later(self._pool.read_timeout, self._conn.expire)
+        try:
+            data = await coro
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            if self._conn.timed_out:
+                raise UpstreamTimeout("Upstream stalled mid-body") from e
+            raise UpstreamError("Upstream closed mid-body") from e
+        finally:
+            deadline.cancel()
+        if not data and self._conn.timed_out:
+            raise UpstreamTimeout("Upstream stalled mid-body")
+        return data
+
+    async def aiter_raw(self) -> AsyncIterator[bytes]:
+        reader = self._conn.reader
+        if self._chunked:
+            while True:
+                size_line = await self._read(reader.readuntil(b"\r\n"))
+                size = int(size_line.split(b";", 1)[0], 16)
+                if size == 0:
+                    # Trailers (hop-by-hop for us) end with an empty line
+                    while await self._read(reader.readuntil(b"\r\n")) != b"\r\n":
+                        pass
+                    break
+                chunk = await self._read(reader.readexactly(size + 2))
+                yield chunk[:-2]
+        elif self._length is not None:
+            remaining = self._length
+            while remaining:
+                chunk = await self._read(reader.read(min(remaining, READ_CHUNK)))
+                if not chunk:
+                    raise UpstreamError("Upstream closed mid-body")
+                remaining -= len(chunk)
+                yield chunk
+        else:
+            # No framing: the body runs until the upstream closes
+            while chunk := await self._read(reader.read(READ_CHUNK)):
+                yield chunk
+        self._complete = True
+
+    async def aclose(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pool._release(self._conn, reuse=self._complete and self._keep_alive)
+
+class Http1Pool:
+    """
+    Keep-alive connections to one upstream. Idle connections are reused
+    most-recently-used first (the least likely to have been closed by the
+    upstream's idle timeout) and dropped after keepalive_expiry.
+    """
+    def __init__(self, url: str, max_connections: int, keepalive_expiry: float,
+                 connect_timeout: float, pool_timeout: float, read_timeout: float):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.host_header = parts.netloc.encode("latin-1")
+        self.base_path = parts.path.rstrip("/").encode("latin-1")
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.pool_timeout = pool_timeout
+        self.read_timeout = read_timeout
+        self._slots = asyncio.Semaphore(max_connections)
+        self._idle: deque = deque()
+
+    async def _connect(self) -> Http1Connection:
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.connect_timeout
+            )
+        except asyncio.TimeoutError as e:
+            raise UpstreamConnectError("Connect timed out") from e
+        except OSError as e:
+            raise UpstreamConnectError(str(e)) from e
+        return Http1Connection(reader, writer)
+
+    def _checkout_idle(self) -> Optional[Http1Connection]:
+        now = time.monotonic()
+        while self._idle:
+            conn = self._idle.pop()
+            if now - conn.idle_since < self.keepalive_expiry and not conn.reader.at_eof():
+                return conn
+            conn.close()
+        return None
+
+    def _release(self, conn: Http1Connection, reuse: bool):
+        if reuse:
+            conn.idle_since = time.monotonic()
+            self._idle.append(conn)
+        else:
+            conn.close()
+        self._slots.release()
+
+    async def send(self, method: str, target: bytes, headers: Headers,
+                   body: Optional[AsyncIterator[bytes]] = None) -> Http1Response:
+        """
+        Sends the request and returns once the response head has arrived.
+        `target` is the raw path + query; `headers` must not contain Host or
+        hop-by-hop headers. Without Content-Length a body is sent chunked.
+        """
+        if self._slots.locked():
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.pool_timeout)
+            except asyncio.TimeoutError as e:
+                raise UpstreamPoolTimeout("No free upstream connection") from e
+        else:
+            await self._slots.acquire()
+
+        try:
+            conn = self._checkout_idle()
+            if conn is not None:
+                try:
+                    return await self._exchange(conn, method, target, headers, body)
+                except UpstreamDisconnected:
+                    # Stale keep-alive connection; a bodyless request can go again on a fresh one
+                    if body is not None:
+                        raise
+            conn = await self._connect()
+            return await self._exchange(conn, method, target, headers, body)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def _exchange(self, conn: Http1Connection, method: str, target: bytes, headers: Headers,
+                        body: Optional[AsyncIterator[bytes]]) -> Http1Response:
+        try:
+            await self._write_request(conn, method, target, headers, body)
+            deadline = asyncio.get_running_loop().call_later(self.read_timeout, conn.expire)
+            try:
+                return await self._read_head(conn, method)
+            finally:
+                deadline.cancel()
+        except (ConnectionError, asyncio.IncompleteReadError) as e:
+            conn.close()
+            if conn.timed_out:
+                raise UpstreamTimeout("Upstream did not respond in time") from e
+            if isinstance(e, asyncio.IncompleteReadError) and e.partial:
+                raise UpstreamError("Upstream closed mid-response") from e
+            raise UpstreamDisconnected("Upstream closed the connection") from e
+        except (ValueError, asyncio.LimitOverrunError) as e:
+            conn.close()
+            raise UpstreamError(f"Malformed upstream response: {e}") from e
+        except BaseException:
+            conn.close()
+            raise
+
+    async def _write_request(self, conn: Http1Connection, method: str, target: bytes, headers: Headers,
+                             body: Optional[AsyncIterator[bytes]]):
+        head = [method.encode("latin-1"), b" ", self.base_path, target, b" HTTP/1.1\r\nhost: ", self.host_header, b"\r\n"]
+        chunked = body is not None
+        for name, value in headers:
+            if chunked and name.lower() == b"content-length":
+                chunked = False
+            head += [name, b": ", value, b"\r\n"]
+        if chunked:
+            head.append(b"transfer-encoding: chunked\r\n")
+        head.append(b"\r\n")
+
+        writer = conn.writer
+        writer.write(b"".join(head))
+        if body is not None:
+            async for chunk in body:
+                if not chunk:
+                    continue
+                writer.write(b"%x\r\n%b\r\n" % (len(chunk), chunk) if chunked else chunk)
+                await writer.drain()  # Backpressure: never buffer more than the socket takes
+            if chunked:
+                writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _read_head(self, conn: Http1Connection, method: str) -> Http1Response:
+        while True:
+            head = await conn.reader.readuntil(b"\r\n\r\n")
+            lines = head[:-4].split(b"\r\n")
+            version, status = lines[0].split(b" ", 2)[:2]
+            status_code = int(status)
+            if not 100 <= status_code < 200:
+                break  # 1xx interim responses (100 Continue) are ours, not the client's
+
+        raw_headers = []
+        length = None
+        chunked = False
+        keep_alive = version == b"HTTP/1.1"
+        for line in lines[1:]:
+            name, _, value = line.partition(b":")
+            name = name.strip().lower()
+            value = value.strip()
+            if name == b"content-length":
+                length = int(value)
+            elif name == b"transfer-encoding":
+                chunked = b"chunked" in value.lower()
+            elif name == b"connection":
+                tokens = value.lower()
+                keep_alive = b"close" not in tokens and (keep_alive or b"keep-alive" in tokens)
+            raw_headers.append((name, value))
+
+        if method == "HEAD" or status_code in (204, 304):
+            length, chunked = 0, False
+        elif chunked:
+            length = None
+        elif length is None:
+            keep_alive = False  # Body delimited by connection close
+
+        return Http1Response(self, conn, status_code, raw_headers, length, chunked, keep_alive)
+
+    async def aclose(self):
+        while self._idle:
+            self._idle.pop().close()
@@ -0,0 +1,209 @@
+import asyncio
+import functools
+import time
+from typing import Dict, List, Optional
+import anyio
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.types import Receive, Scope, Send
+from sentinelstack.config import settings
+from sentinelstack.gateway.context import get_context
+from sentinelstack.proxy.upstream import Upstream, UpstreamPool
+from sentinelstack.proxy.http1 import (
+    UpstreamError,
+    UpstreamConnectError,
+    UpstreamDisconnected,
+    UpstreamTimeout,
+    UpstreamPoolTimeout
+)
+from sentinelstack.monitoring.metrics import PROXY_UPSTREAM_REQUESTS
+
+# Configuration
+PROXY_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]  # HEAD comes with GET
+HEALTH_CHECK_TIMEOUT = 2.0
+MAX_ATTEMPTS = 2   # Bodyless requests that never reached an upstream may try one more
+BUFFER_LIMIT = 64 * 1024  # Bodies up to this size (with a Content-Length) go out in one piece
+
+# Per-connection headers (RFC 9110 7.6.1); Host is set by the client for the upstream
+HOP_BY_HOP = frozenset({
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+    b"te", b"trailer", b"transfer-encoding", b"upgrade", b"host"
+})
+
+def _strip_hop_by_hop(raw_headers: List) -> List:
+    # Headers named in Connection are hop-by-hop too
+    drop = set(HOP_BY_HOP)
+    for name, value in raw_headers:
+        if name.lower() == b"connection":
+            drop.update(token.strip().lower() for token in value.split(b","))
+    return [(name, value) for name, value in raw_headers if name.lower() not in drop]
+
+class UpstreamResponse(StreamingResponse):
+    """
+    Streams the upstream body through chunk by chunk as it arrives, with the
+    upstream's headers (duplicates like Set-Cookie included). The pooled
+    connection is returned however the stream ends, client disconnects included.
+    """
+    def __init__(self, response, upstream: Upstream):
+        super().__init__(response.aiter_raw(), status_code=response.status_code)
+        self.raw_headers = _strip_hop_by_hop(response.raw_headers)
+        self._response = response
+        self._upstream = upstream
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self._upstream.release()
+            with anyio.CancelScope(shield=True):
+                await self._response.aclose()
+
+class ProxyService:
+    """
+    Forwards requests under configured path prefixes to upstream pools.
+    Routes are mounted on the app, so authentication, rate limiting, metrics
+    and request logging in RequestContextMiddleware apply unchanged.
+    """
+    def __init__(self, routes: Optional[Dict[str, List[str]]] = None,
+                 transport=None):
+        routes = settings.PROXY_ROUTES if routes is None else routes
+        # Longest prefix first: /api/orders/export wins over /api/orders
+        self.pools = [
+            UpstreamPool(prefix.rstrip("/"), urls, transport)
+            for prefix, urls in sorted(routes.items(), key=lambda item: -len(item[0]))
+        ]
+        self.is_running = False
+
+    def routes(self) -> List[Route]:
+        routes = []
+        for pool in self.pools:
+            endpoint = functools.partial(self.forward, pool=pool)
+            if pool.prefix:
+                routes.append(Route(pool.prefix, endpoint, methods=PROXY_METHODS, name=f"proxy:{pool.prefix}"))
+            routes.append(Route(f"{pool.prefix}/{{path:path}}", endpoint, methods=PROXY_METHODS,
+                                name=f"proxy:{pool.prefix}/"))
+        return routes
+
+    def _request_headers(self, scope: Scope) -> List:
+        # Straight from the ASGI scope: Request.headers / .url would build objects per request
+        forwarded_for = host = None
+        headers = []
+        for name, value in _strip_hop_by_hop(scope["headers"]):
+            if name == b"x-forwarded-for":
+                forwarded_for = value if forwarded_for is None else forwarded_for + b", " + value
+            elif name.startswith(b"x-forwarded-"):
+                continue  # Replaced below with values the gateway vouches for
+            else:
+                headers.append((name, value))
+        for name, value in scope["headers"]:
+            if name == b"host":
+                host = value
+
+        peer = scope["client"][0].encode() if scope.get("client") else b"127.0.0.1"
+        headers.append((b"x-forwarded-for", forwarded_for + b", " + peer if forwarded_for else peer))
+        headers.append((b"x-forwarded-proto", scope["scheme"].encode()))
+        if host:
+            headers.append((b"x-forwarded-host", host))
+        ctx = get_context()
+        if ctx:
+            headers.append((b"x-request-id", ctx.request_id.encode()))
+        return headers
+
+    async def forward(self, request: Request, pool: UpstreamPool) -> Response:
+        # 1. Target: the original path and query, untouched (still percent-encoded)
+        target = request.scope["raw_path"]
+        if request.scope["query_string"]:
+            target += b"?" + request.scope["query_string"]
+        headers = self._request_headers(request.scope)
+
+        # 2. Body: streamed straight through, never buffered
+        has_body = "content-length" in request.headers or "transfer-encoding" in request.headers
+        content = request.stream() if has_body else None
+
+        tried = []
+        while True:
+            # 3. Pick the healthy upstream with the fewest requests in flight
+            upstream = pool.choose(exclude=tried)
+            if upstream is None:
+                PROXY_UPSTREAM_REQUESTS.labels(upstream=pool.prefix or "/", outcome="no_upstream").inc()
+                return JSONResponse(status_code=503, content={"detail": "No healthy upstream"})
+
+            upstream.acquire()
+            started = time.perf_counter()
+            try:
+                response = await upstream.client.send(request.method, target, headers, content)
+            except (UpstreamConnectError, UpstreamDisconnected) as e:
+                # The upstream never saw the request (or may not have)
+                upstream.release()
+                PROXY_UPSTREAM_REQUESTS.labels(upstream=upstream.url, outcome="connect_error").inc()
+                if isinstance(e, UpstreamConnectError):
+                    upstream.mark_down(str(e) or type(e).__name__)
+                tried.append(upstream)
+                # 4. Retry elsewhere only if nothing was consumed from the client
+                if content is None and len(tried) < MAX_ATTEMPTS:
+                    continue
+                return JSONResponse(status_code=502, content={"detail": "Upstream unavailable"})
+            except UpstreamPoolTimeout:
+                upstream.release()
+                PROXY_UPSTREAM_REQUESTS.labels(upstream=upstream.url, outcome="timeout").inc()
+                return JSONResponse(status_code=503, content={"detail": "Upstream busy"})
+            except UpstreamTimeout:
+                upstream.release()
+                PROXY_UPSTREAM_REQUESTS.labels(upstream=upstream.url, outcome="timeout").inc()
+                return JSONResponse(status_code=504, content={"detail": "Upstream timed out"})
+            except UpstreamError as e:
+                upstream.release()
+                PROXY_UPSTREAM_REQUESTS.labels(upstream=upstream.url, outcome="connect_error").inc()
+                print(f"ERROR:   Proxy to {upstream.url} failed: {e}")
+                return JSONResponse(status_code=502, content={"detail": "Upstream unavailable"})
+
+            upstream.latency.observe(time.perf_counter() - started)
+            PROXY_UPSTREAM_REQUESTS.labels(upstream=upstream.url, outcome=f"{response.status_code // 100}xx").inc()
+
+            # 5. Small framed bodies go out as one message; everything else streams
+            # through as it arrives and releases the upstream when done
+            if response.content_length is not None and response.content_length <= BUFFER_LIMIT:
+                try:
+                    body = b"".join([chunk async for chunk in response.aiter_raw()])
+                except UpstreamError as e:
+                    print(f"ERROR:   Proxy to {upstream.url} failed mid-body: {e}")
+                    return JSONResponse(status_code=502, content={"detail": "Upstream unavailable"})
+                finally:
+                    upstream.release()
+                    await response.aclose()
+                proxied = Response(body, status_code=response.status_code)
+                proxied.raw_headers = _strip_hop_by_hop(response.raw_headers)
+                return proxied
+            return UpstreamResponse(response, upstream)
+
+    async def check(self, upstream: Upstream):
+        try:
+            response = await asyncio.wait_for(
+                upstream.client.send("GET", settings.PROXY_HEALTH_PATH.encode(), []), HEALTH_CHECK_TIMEOUT
+            )
+            await response.aclose()
+            if response.status_code < 500:
+                upstream.mark_up()
+            else:
+                upstream.record_check_failure(f"health check returned {response.status_code}")
+        except (UpstreamError, asyncio.TimeoutError) as e:
+            upstream.record_check_failure(str(e) or type(e).__name__)
+
+    async def worker(self):
+        """Background task: active health checks (passive ones happen on connect errors)"""
+        self.is_running = True
+        print(f"INFO:    Proxy Health Checks Started ({sum(len(p.upstreams) for p in self.pools)} upstreams)")
+
+        while self.is_running:
+            upstreams = [upstream for pool in self.pools for upstream in pool.upstreams]
+            await asyncio.gather(*[self.check(upstream) for upstream in upstreams])
+            await asyncio.sleep(settings.PROXY_HEALTH_INTERVAL)
+
+    async def close(self):
+        for pool in self.pools:
+            for upstream in pool.upstreams:
+                await upstream.client.aclose()
+
+# Global Instance
+proxy_service = ProxyService()
@@ -0,0 +1,145 @@
+import importlib.util
+import random
+from typing import AsyncIterator, Iterable, List, Optional
+import httpx
+from sentinelstack.config import settings
+from sentinelstack.proxy.http1 import (
+    Http1Pool,
+    Headers,
+    UpstreamError,
+    UpstreamConnectError,
+    UpstreamDisconnected,
+    UpstreamTimeout,
+    UpstreamPoolTimeout
+)
+from sentinelstack.monitoring.metrics import (
+    PROXY_UPSTREAM_OUTSTANDING,
+    PROXY_UPSTREAM_HEALTHY,
+    PROXY_UPSTREAM_DURATION_SECONDS
+)
+
+# HTTP/2 needs the optional `h2` package (and TLS upstreams); otherwise HTTP/1.1 keep-alive
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Configuration
+MAX_CONNECTIONS = 100      # Per upstream, per process
+KEEPALIVE_EXPIRY = 4.0     # Seconds idle; below the 5s keep-alive timeout of uvicorn/Node upstreams
+CONNECT_TIMEOUT = 2.0
+POOL_TIMEOUT = 2.0         # Waiting for a free pooled connection
+UNHEALTHY_THRESHOLD = 2    # Consecutive failed health checks before an upstream is taken out
+
+class HttpxClient:
+    """
+    httpx behind the Http1Pool interface, for TLS upstreams (HTTP/2 when
+    `h2` is installed) and injected test transports.
+    """
+    def __init__(self, url: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.client = httpx.AsyncClient(
+            base_url=url,
+            http2=HTTP2_AVAILABLE,
+            transport=transport,  # Tests inject a stub upstream here
+            timeout=httpx.Timeout(settings.PROXY_TIMEOUT, connect=CONNECT_TIMEOUT, pool=POOL_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY
+            ),
+            follow_redirects=False  # Redirects belong to the client, not the gateway
+        )
+
+    async def send(self, method: str, target: bytes, headers: Headers,
+                   body: Optional[AsyncIterator[bytes]] = None) -> httpx.Response:
+        request = self.client.build_request(method, target.decode("latin-1"), headers=headers, content=body)
+        try:
+            response = await self.client.send(request, stream=True)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            raise UpstreamConnectError(str(e)) from e
+        except httpx.RemoteProtocolError as e:
+            raise UpstreamDisconnected(str(e)) from e
+        except httpx.PoolTimeout as e:
+            raise UpstreamPoolTimeout(str(e)) from e
+        except httpx.TimeoutException as e:
+            raise UpstreamTimeout(str(e)) from e
+        except httpx.HTTPError as e:
+            raise UpstreamError(str(e)) from e
+        response.raw_headers = response.headers.raw
+        length = response.headers.get("content-length")
+        response.content_length = int(length) if length and "transfer-encoding" not in response.headers else None
+        return response
+
+    async def aclose(self):
+        await self.client.aclose()
+
+class Upstream:
+    """
+    One backend instance: a long-lived connection pool plus the state the
+    balancer needs (requests in flight, health).
+    """
+    def __init__(self, url: str, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        if self.url.startswith("http://") and transport is None:
+            self.client = Http1Pool(
+                self.url,
+                max_connections=MAX_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+                connect_timeout=CONNECT_TIMEOUT,
+                pool_timeout=POOL_TIMEOUT,
+                read_timeout=settings.PROXY_TIMEOUT
+            )
+        else:
+            self.client = HttpxClient(self.url, transport)
+        # Label children resolved once; this is the per-request hot path
+        self._outstanding_gauge = PROXY_UPSTREAM_OUTSTANDING.labels(upstream=self.url)
+        self._healthy_gauge = PROXY_UPSTREAM_HEALTHY.labels(upstream=self.url)
+        self.latency = PROXY_UPSTREAM_DURATION_SECONDS.labels(upstream=self.url)
+        self._healthy_gauge.set(1)
+
+    def acquire(self):
+        self.outstanding += 1
+        self._outstanding_gauge.inc()
+
+    def release(self):
+        self.outstanding -= 1
+        self._outstanding_gauge.dec()
+
+    def mark_up(self):
+        self.failures = 0
+        if not self.healthy:
+            print(f"INFO:    Upstream {self.url} is healthy again")
+        self.healthy = True
+        self._healthy_gauge.set(1)
+
+    def mark_down(self, reason: str):
+        if self.healthy:
+            print(f"WARN:    Upstream {self.url} marked down: {reason}")
+        self.healthy = False
+        self._healthy_gauge.set(0)
+
+    def record_check_failure(self, reason: str):
+        """Active checks need UNHEALTHY_THRESHOLD misses in a row; a single slow probe isn't an outage."""
+        self.failures += 1
+        if self.failures >= UNHEALTHY_THRESHOLD:
+            self.mark_down(reason)
+
+class UpstreamPool:
+    """The upstreams behind one route prefix, balanced by least outstanding requests."""
+    def __init__(self, prefix: str, urls: List[str], transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.prefix = prefix
+        self.upstreams = [Upstream(url, transport) for url in urls]
+
+    def choose(self, exclude: Iterable[Upstream] = ()) -> Optional[Upstream]:
+        """
+        Healthy upstream with the fewest requests in flight; ties are broken at
+        random so idle upstreams share the load instead of the first one taking it all.
+        """
+        best, best_key = None, None
+        for upstream in self.upstreams:
+            if not upstream.healthy or upstream in exclude:
+                continue
+            key = (upstream.outstanding, random.random())
+            if best_key is None or key < best_key:
+                best, best_key = upstream, key
+        return best
@@ -8,6 +8,14 @@ ANON_RATE = 10 / 60  # refill rate per second
 USER_LIMIT = 60      # requests per minute
 USER_RATE = 60 / 60  # refill rate per second
 
+# Authenticated limits by plan (requests per minute); unknown tiers get USER_LIMIT
+TIER_LIMITS = {"free": USER_LIMIT, "pro": 300, "enterprise": 1200}
+ADMIN_LIMIT = 1200   # Admins are never throttled below this
+
+# API keys get their own bucket, independent of the owner's interactive traffic
+API_KEY_LIMIT = 600        # requests per minute when the key sets no quota
+API_KEY_MAX_LIMIT = 6000   # Highest quota a key may be given
+
 class RateLimitService:
     async def check_request(self, ctx: RequestCtx) -> Tuple[bool, dict]:
         """
@@ -15,10 +23,17 @@ class RateLimitService:
         Returns (is_allowed, headers)
         """
         # 1. Determine Identity & Policy
-        if ctx.user_id:
+        if ctx.api_key:
+            key = f"rl:key:{ctx.api_key}"
+            capacity = ctx.api_key_limit or API_KEY_LIMIT
+            rate = capacity / 60
+        elif ctx.user_id:
             key = f"rl:user:{ctx.user_id}"
-            capacity = USER_LIMIT
-            rate = USER_RATE
+            # Role and tier come from the principal cache, so plan changes apply immediately
+            capacity = TIER_LIMITS.get(ctx.tier, USER_LIMIT)
+            if ctx.role == "admin":
+                capacity = max(capacity, ADMIN_LIMIT)
+            rate = capacity / 60
         else:
             key = f"rl:ip:{ctx.client_ip}"
             capacity = ANON_LIMIT
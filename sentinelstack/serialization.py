@@ -0,0 +1,36 @@
+import datetime
+import decimal
+import json
+import uuid
+from typing import Any
+
+# orjson is ~5-10x faster than the stdlib encoder and natively handles
+# datetime/UUID. Fall back to json so a bare install still works.
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on environment
+    orjson = None
+
+def _default(obj: Any):
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(obj: Any) -> bytes:
+    """Compact JSON as bytes (no whitespace)."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, separators=(",", ":")).encode("utf-8")
+
+def dumps_str(obj: Any) -> str:
+    """Compact JSON as text, for Redis values and pub/sub messages."""
+    return dumps(obj).decode("utf-8")
+
+def loads(data: Any) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
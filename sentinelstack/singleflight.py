@@ -0,0 +1,77 @@
+import asyncio
+import functools
+import inspect
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+from sentinelstack.monitoring.metrics import SINGLEFLIGHT_CALLS
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: the first caller for a key starts the
+    work, callers arriving while it runs wait for the same result (or the same
+    exception), and the key is forgotten as soon as it settles. Nothing is cached
+    beyond that; pair it with a cache when results may be reused for longer.
+
+    The work runs in its own task, so a caller that disconnects or gives up
+    never cancels it for the others. `timeout` bounds the shared work itself:
+    past it, every waiter gets TimeoutError instead of a hung call pinning the
+    key. Waiters share one result object and must not mutate it.
+    """
+    def __init__(self, name: str, timeout: Optional[float] = None):
+        self.name = name
+        self.timeout = timeout
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._leaders = SINGLEFLIGHT_CALLS.labels(flight=name, role="leader")
+        self._coalesced = SINGLEFLIGHT_CALLS.labels(flight=name, role="coalesced")
+
+    def __len__(self) -> int:
+        """Calls currently in flight."""
+        return len(self._calls)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is not None:
+            self._coalesced.inc()
+        else:
+            self._leaders.inc()
+            task = asyncio.create_task(self._run(fn))
+            self._calls[key] = task
+            task.add_done_callback(functools.partial(self._settled, key))
+        return await asyncio.shield(task)
+
+    async def _run(self, fn: Callable[[], Awaitable[T]]) -> T:
+        if self.timeout is None:
+            return await fn()
+        return await asyncio.wait_for(fn(), self.timeout)
+
+    def _settled(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved when every waiter has gone
+
+    def coalesced(self, key: Optional[Callable[..., Hashable]] = None):
+        """
+        Decorator form of do(). The key defaults to the call's bound arguments
+        (defaults applied), so f(1) and f(x=1) coalesce; pass `key` to build
+        it from the arguments yourself.
+        """
+        def decorator(fn: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+            signature = inspect.signature(fn)
+
+            def default_key(*args, **kwargs) -> Hashable:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                return (fn.__qualname__, *bound.arguments.values())
+
+            make_key = key or default_key
+
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs) -> Any:
+                return await self.do(make_key(*args, **kwargs), lambda: fn(*args, **kwargs))
+            return wrapper
+        return decorator
@@ -1,15 +1,19 @@
-from datetime import datetime, timedelta
-from typing import List
-from fastapi import APIRouter, Depends
-from sqlalchemy import select, desc
-from sqlalchemy.ext.asyncio import AsyncSession
-from sentinelstack.database import get_db
-from sentinelstack.aggregation.models import RequestMetric
+from datetime import datetime, timedelta, timezone
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sentinelstack.incidents.models import Incident
 from sentinelstack.ai.service import ai_service
+from sentinelstack.stats.stream import event_broadcaster
+from sentinelstack.stats.service import stats_service, MAX_ENDPOINT_PAGE
+from sentinelstack.gateway.responses import conditional_json
 
 router = APIRouter(prefix="/stats", tags=["Stats"])
 
+# A bucket is written ~2s after its minute closes; give stragglers headroom
+# before treating a historical window as immutable.
+METRICS_SETTLE_TIME = timedelta(minutes=2)
+
 @router.get("/status")
 async def get_system_status():
     """
@@ -18,34 +22,51 @@ async def get_system_status():
     return await ai_service.get_system_status()
 
 @router.get("/metrics")
-async def get_metrics(minutes: int = 30, db: AsyncSession = Depends(get_db)):
+async def get_metrics(request: Request, minutes: int = 30, end: Optional[datetime] = None):
     """
     Returns time-series data for frontend charts.
+    Pass `end` to fetch a historical window; once its buckets are settled
+    the response is immutable and revalidates via ETag / 304.
     """
-    cutoff = datetime.utcnow() - timedelta(minutes=minutes)
-    
-    stmt = (
-        select(RequestMetric)
-        .where(RequestMetric.bucket_time >= cutoff)
-        .order_by(RequestMetric.bucket_time)
-    )
-    result = await db.execute(stmt)
-    metrics = result.scalars().all()
-    
-    # Transform for Chart.js
-    # We need to aggregate by bucket_time across all paths/methods to get global RPS
-    aggregated = {}
-    
-    for m in metrics:
-        ts = m.bucket_time.isoformat()
-        if ts not in aggregated:
-            aggregated[ts] = {"total": 0, "errors": 0}
-        aggregated[ts]["total"] += m.total_requests
-        aggregated[ts]["errors"] += m.total_errors
+    if end is not None and end.tzinfo is not None:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    content = await stats_service.get_timeseries(minutes, end)
+    immutable = end is not None and end + METRICS_SETTLE_TIME <= datetime.utcnow()
+    return conditional_json(request, content, immutable=immutable)
+
+@router.get("/summary")
+async def get_summary(minutes: int = Query(60, ge=1, le=60 * 24 * 30)):
+    """
+    Window totals: requests, error rate, avg/p95 latency and RPM.
+    Served from the rollup tiers, so long windows stay cheap; p95 is the
+    request-weighted mean of per-bucket p95s, not an exact window percentile.
+    """
+    return await stats_service.get_dashboard_metrics(minutes)
 
-    return {
-        "timeseries": [
-            {"time": k, "requests": v["total"], "errors": v["errors"]}
-            for k, v in aggregated.items()
-        ]
-    }
\ No newline at end of file
+@router.get("/endpoints")
+async def get_endpoints(
+    minutes: int = Query(60, ge=1, le=60 * 24 * 30),
+    sort: Literal["rps", "errors", "error_rate", "p95"] = "rps",
+    limit: int = Query(20, ge=1, le=MAX_ENDPOINT_PAGE),
+    cursor: Optional[str] = None
+):
+    """
+    Per-route breakdown (RPS, error rate, p95), top-N by the chosen key.
+    Pass `next_cursor` back as `cursor` to fetch the next page.
+    """
+    try:
+        return await stats_service.get_endpoint_breakdown(minutes, sort, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+@router.get("/stream")
+async def stream_events():
+    """
+    Server-Sent Events feed for the dashboard.
+    Pushes new metric buckets and incident changes as they happen.
+    """
+    return StreamingResponse(
+        event_broadcaster.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
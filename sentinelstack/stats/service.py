@@ -1,50 +1,276 @@
+import base64
 import datetime
-from sqlalchemy import select, func
-from sentinelstack.database import AsyncSessionLocal
+import json
+from typing import Optional
+from sqlalchemy import select, func, desc, tuple_, cast, case, true, union_all, Float
+from sqlalchemy.orm import aliased
+from sentinelstack.database import read_session
 from sentinelstack.logging.models import RequestLog
+from sentinelstack.aggregation.models import RequestMetric, MetricRollup, hour_floor
+from sentinelstack.singleflight import SingleFlight
+
+# Sort keys accepted by the per-endpoint breakdown
+ENDPOINT_SORT_KEYS = ("rps", "errors", "error_rate", "p95")
+MAX_ENDPOINT_PAGE = 500
+
+# When an incident opens, every dashboard tab asks the same questions at once:
+# identical reads in flight share one query. A hung query fails its waiters
+# after COALESCE_TIMEOUT instead of holding every later identical request.
+COALESCE_TIMEOUT = 30.0
+stats_flights = SingleFlight("stats", timeout=COALESCE_TIMEOUT)
+
+def encode_cursor(values: list, sort: str, minutes: int) -> str:
+    """
+    Opaque keyset cursor: last row's (sort_value, method, path), tagged with
+    the sort and window it was issued for.
+    """
+    return base64.urlsafe_b64encode(json.dumps([sort, minutes, *values]).encode()).decode()
+
+def decode_cursor(cursor: str, sort: str, minutes: int) -> list:
+    """
+    Returns the cursor's (sort_value, method, path).
+    Raises ValueError for anything encode_cursor could not have produced, and
+    for a cursor issued under a different sort or window: its keyset values
+    would seek into an unrelated ordering and silently skip or repeat rows.
+    """
+    values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(values, list) or len(values) != 5:
+        raise ValueError("Malformed cursor")
+    cursor_sort, cursor_minutes, value, method, path = values
+    if isinstance(value, bool) or not isinstance(value, (int, float)) \
+            or not isinstance(method, str) or not isinstance(path, str):
+        raise ValueError("Malformed cursor")
+    if cursor_sort != sort or cursor_minutes != minutes:
+        raise ValueError("Cursor was issued for a different sort or window")
+    return [value, method, path]
+
+def _tier_columns():
+    return (
+        MetricRollup.total_requests.label("requests"),
+        MetricRollup.total_errors.label("errors"),
+        (MetricRollup.avg_latency_ms * MetricRollup.total_requests).label("latency_sum"),
+        (MetricRollup.p95_latency_ms * MetricRollup.total_requests).label("p95_sum")
+    )
+
+def rollup_tiers(cutoff: datetime.datetime, hour_from: datetime.datetime):
+    """
+    The rollup rows covering [cutoff, last written minute): every '1h' row from
+    hour_from on, plus the '1m' rows whose hour has no such '1h' row. Coverage is
+    decided per hour, so an hour the aggregator never rolled up (missed tick,
+    leader failover) is still counted from its minutes.
+    """
+    hour = aliased(MetricRollup)
+    hourly = (
+        select(*_tier_columns())
+        .where(MetricRollup.resolution == "1h", MetricRollup.bucket_time >= hour_from)
+    )
+    rolled_up = (
+        select(hour.id)
+        .where(
+            hour.resolution == "1h",
+            hour.bucket_time >= hour_from,
+            hour.bucket_time == hour_floor(MetricRollup.bucket_time)
+        )
+        .exists()
+    )
+    minutely = (
+        select(*_tier_columns())
+        .where(MetricRollup.resolution == "1m", MetricRollup.bucket_time >= cutoff, ~rolled_up)
+    )
+    return hourly, minutely
 
 class StatsService:
+    @stats_flights.coalesced()
     async def get_dashboard_metrics(self, minutes: int = 60):
+        """
+        Window summary in a single statement.
+        Whole hours come from the '1h' rollup tier, the ragged edges from the
+        '1m' tier, and only the not-yet-aggregated tail from request_logs.
+        A 30 day window touches ~800 small rows instead of every raw log.
+
+        p95_latency_ms is approximate: percentiles don't merge, so it is the
+        request-weighted mean of each bucket's p95 (and the tail's exact p95).
+        It tracks the true window p95 closely under steady traffic but can
+        understate it when one short burst holds the slow requests.
+        """
         try:
-            cutoff = datetime.datetime.utcnow() - datetime.timedelta(minutes=minutes)
-            
-            async with AsyncSessionLocal() as db:
-                # 1. Total Requests
-                result_total = await db.execute(
-                    select(func.count(RequestLog.id)).where(RequestLog.timestamp >= cutoff)
-                )
-                total_requests = result_total.scalar() or 0
-                
-                # 2. Error Count
-                result_error = await db.execute(
-                    select(func.count(RequestLog.id))
-                    .where(RequestLog.timestamp >= cutoff)
-                    .where(RequestLog.error_flag == True)
-                )
-                error_count = result_error.scalar() or 0
-                
-                # 3. Average Latency
-                result_latency = await db.execute(
-                    select(func.avg(RequestLog.latency_ms)).where(RequestLog.timestamp >= cutoff)
+            now = datetime.datetime.utcnow().replace(second=0, microsecond=0)
+            cutoff = now - datetime.timedelta(minutes=minutes)
+            # First hour boundary at or after the cutoff
+            hour_from = cutoff.replace(minute=0)
+            if hour_from < cutoff:
+                hour_from += datetime.timedelta(hours=1)
+
+            # Watermark: raw logs are only read past the last written minute
+            last_minute = (
+                select(func.max(MetricRollup.bucket_time))
+                .where(MetricRollup.resolution == "1m")
+                .where(MetricRollup.bucket_time >= cutoff)
+                .scalar_subquery()
+            )
+            bounds = select(
+                func.coalesce(last_minute + datetime.timedelta(minutes=1), cutoff).label("minute_end")
+            ).cte("bounds")
+
+            hourly, minutely = rollup_tiers(cutoff, hour_from)
+            raw_count = func.count(RequestLog.id)
+            tail = (
+                select(
+                    raw_count.label("requests"),
+                    func.sum(case((RequestLog.error_flag == True, 1), else_=0)).label("errors"),
+                    func.sum(RequestLog.latency_ms).label("latency_sum"),
+                    (func.percentile_cont(0.95).within_group(RequestLog.latency_ms) * raw_count).label("p95_sum")
                 )
-                avg_latency = result_latency.scalar() or 0.0
-                
-                # 4. Latency P95 (Approximate via SQL if supported, or simpler avg for v1)
-                # For strict v1 fast implementation, we stick to Average.
-                
-                rpm = total_requests / minutes if minutes > 0 else 0
-                
-                return {
-                    "window_minutes": minutes,
-                    "total_requests": total_requests,
-                    "error_rate_percent": round((error_count / total_requests * 100), 2) if total_requests > 0 else 0,
-                    "avg_latency_ms": round(avg_latency, 2),
-                    "rpm": round(rpm, 2)
-                }
+                .select_from(RequestLog)
+                .join(bounds, true())
+                .where(RequestLog.timestamp >= bounds.c.minute_end)
+            )
+
+            tiers = union_all(hourly, minutely, tail).subquery("tiers")
+            stmt = select(
+                func.coalesce(func.sum(tiers.c.requests), 0).label("requests"),
+                func.coalesce(func.sum(tiers.c.errors), 0).label("errors"),
+                func.coalesce(func.sum(tiers.c.latency_sum), 0.0).label("latency_sum"),
+                func.coalesce(func.sum(tiers.c.p95_sum), 0.0).label("p95_sum")
+            )
+
+            async with read_session() as db:
+                row = (await db.execute(stmt, execution_options={"query_name": "stats.summary"})).one()
+
+            total_requests = int(row.requests)
+            error_count = int(row.errors)
+            avg_latency = float(row.latency_sum) / total_requests if total_requests else 0.0
+            p95_latency = float(row.p95_sum) / total_requests if total_requests else 0.0
+            rpm = total_requests / minutes if minutes > 0 else 0
+
+            return {
+                "window_minutes": minutes,
+                "total_requests": total_requests,
+                "error_rate_percent": round((error_count / total_requests * 100), 2) if total_requests > 0 else 0,
+                "avg_latency_ms": round(avg_latency, 2),
+                "p95_latency_ms": round(p95_latency, 2),
+                "rpm": round(rpm, 2)
+            }
         except Exception as e:
             print(f"Stats Error: {e}")
             import traceback
             traceback.print_exc()
             return {"error": str(e)}
 
+    @stats_flights.coalesced()
+    async def get_endpoint_breakdown(
+        self,
+        minutes: int = 60,
+        sort: str = "rps",
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> dict:
+        """
+        Per-route RPS, error rate and p95 over a window.
+        Grouping, ranking and top-N all happen in Postgres against the covering
+        index on request_metrics; pages are walked with a keyset cursor so
+        deep pages cost the same as the first one.
+        """
+        cutoff = datetime.datetime.utcnow() - datetime.timedelta(minutes=minutes)
+        window_seconds = minutes * 60
+        limit = max(1, min(limit, MAX_ENDPOINT_PAGE))
+
+        requests = func.sum(RequestMetric.total_requests)
+        errors = func.sum(RequestMetric.total_errors)
+        # Request-weighted mean of the per-minute p95s (approximation across buckets)
+        p95 = (
+            func.sum(RequestMetric.p95_latency_ms * RequestMetric.total_requests)
+            / func.nullif(requests, 0)
+        )
+        sort_columns = {
+            "rps": requests,
+            "errors": errors,
+            "error_rate": cast(errors, Float) / func.nullif(requests, 0),
+            "p95": p95,
+        }
+        sort_expr = func.coalesce(sort_columns[sort], 0)
+
+        stmt = (
+            select(
+                RequestMetric.method,
+                RequestMetric.path,
+                requests.label("requests"),
+                errors.label("errors"),
+                p95.label("p95_latency"),
+                sort_expr.label("sort_value")
+            )
+            .where(RequestMetric.bucket_time >= cutoff)
+            .group_by(RequestMetric.method, RequestMetric.path)
+            .order_by(desc(sort_expr), desc(RequestMetric.method), desc(RequestMetric.path))
+            .limit(limit + 1)  # One extra row tells us if there is a next page
+        )
+
+        if cursor:
+            last_value, last_method, last_path = decode_cursor(cursor, sort, minutes)
+            stmt = stmt.having(
+                tuple_(sort_expr, RequestMetric.method, RequestMetric.path)
+                < tuple_(last_value, last_method, last_path)
+            )
+
+        async with read_session() as db:
+            rows = (await db.execute(stmt, execution_options={"query_name": "stats.endpoints"})).all()
+
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            next_cursor = encode_cursor([float(last.sort_value or 0), last.method, last.path], sort, minutes)
+
+        return {
+            "window_minutes": minutes,
+            "sort": sort,
+            "endpoints": [
+                {
+                    "method": row.method,
+                    "path": row.path,
+                    "requests": int(row.requests),
+                    "errors": int(row.errors or 0),
+                    "rps": round(row.requests / window_seconds, 3),
+                    "error_rate_percent": round(row.errors / row.requests * 100, 2) if row.requests else 0,
+                    "p95_latency_ms": round(row.p95_latency or 0.0, 2)
+                }
+                for row in page
+            ],
+            "next_cursor": next_cursor
+        }
+
+    @stats_flights.coalesced()
+    async def get_timeseries(self, minutes: int = 30, end: Optional[datetime.datetime] = None) -> dict:
+        """
+        Global requests/errors per minute for the charts, over the `minutes`
+        before `end` (naive UTC) or before now.
+        """
+        now = datetime.datetime.utcnow()
+        window_end = min(end, now) if end is not None else now
+        cutoff = window_end - datetime.timedelta(minutes=minutes)
+
+        # We need to aggregate by bucket_time across all paths/methods to get global RPS.
+        # Grouping in SQL returns one row per minute instead of one ORM object per route.
+        stmt = (
+            select(
+                RequestMetric.bucket_time,
+                func.sum(RequestMetric.total_requests).label("total"),
+                func.sum(RequestMetric.total_errors).label("errors")
+            )
+            .where(RequestMetric.bucket_time >= cutoff)
+            .where(RequestMetric.bucket_time < window_end)
+            .group_by(RequestMetric.bucket_time)
+            .order_by(RequestMetric.bucket_time)
+        )
+        async with read_session() as db:
+            rows = (await db.execute(stmt, execution_options={"query_name": "stats.timeseries"})).all()
+
+        # Transform for Chart.js
+        return {
+            "timeseries": [
+                {"time": row.bucket_time.isoformat(), "requests": int(row.total), "errors": int(row.errors)}
+                for row in rows
+            ]
+        }
+
 stats_service = StatsService()
\ No newline at end of file
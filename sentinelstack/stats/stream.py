@@ -0,0 +1,88 @@
+import asyncio
+from typing import AsyncIterator, Dict, Set
+from sentinelstack.cache import redis_client
+from sentinelstack import serialization
+
+# Configuration
+EVENTS_CHANNEL = "sentinel:events"
+SUBSCRIBER_QUEUE_SIZE = 100  # Per-viewer backlog before we drop the oldest events
+HEARTBEAT_INTERVAL = 15.0    # Seconds. Keeps proxies from closing idle streams
+RECONNECT_DELAY = 2.0        # Seconds between Redis re-subscribe attempts
+
+class EventBroadcaster:
+    """
+    Push channel for the live dashboard.
+    Producers (aggregator, incident manager) publish each event ONCE to Redis.
+    Every replica runs a single subscriber that copies the message into the
+    in-memory queue of each connected viewer, so DB work never scales with viewers.
+    """
+    def __init__(self):
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.is_running = False
+
+    async def publish(self, event_type: str, data: Dict):
+        """Fire a dashboard event to all replicas (best effort)."""
+        message = serialization.dumps_str({"type": event_type, "data": data})
+        try:
+            await redis_client.publish(EVENTS_CHANNEL, message)
+        except Exception as e:
+            # Dashboards fall back to polling, never fail the producer
+            print(f"ERROR:   Event publish failed: {e}")
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+    def _fan_out(self, message: str):
+        # Format the SSE frame once, then hand the same string to every viewer
+        event_type = serialization.loads(message).get("type", "message")
+        frame = f"event: {event_type}\ndata: {message}\n\n"
+        for queue in list(self.subscribers):
+            if queue.full():
+                # Slow viewer: drop its oldest event instead of blocking everyone
+                queue.get_nowait()
+            queue.put_nowait(frame)
+
+    async def worker(self):
+        """Background task: one Redis subscription per process."""
+        self.is_running = True
+        print("INFO:    Event Broadcaster Started")
+
+        while self.is_running:
+            pubsub = redis_client.pubsub()
+            try:
+                await pubsub.subscribe(EVENTS_CHANNEL)
+                while self.is_running:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message and message["type"] == "message":
+                        self._fan_out(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"ERROR:   Event Broadcaster Failed: {e}")
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                await pubsub.aclose()
+
+    async def stream(self) -> AsyncIterator[str]:
+        """Server-Sent Events body for a single viewer."""
+        queue = self.subscribe()
+        try:
+            # Tell EventSource how long to wait before reconnecting
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield frame
+        finally:
+            self.unsubscribe(queue)
+
+# Global Instance
+event_broadcaster = EventBroadcaster()
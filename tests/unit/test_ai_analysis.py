@@ -0,0 +1,171 @@
+import datetime
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sentinelstack.ai.service import AIService
+from sentinelstack.ai.worker import AnalysisQueue, QUEUE_SIZE
+from sentinelstack.incidents.models import Incident
+from sentinelstack import serialization
+
+# ---------------------------------------------------------
+# Test Suite for Background Incident Analysis (No Real DB)
+# ---------------------------------------------------------
+
+def make_session_factory(result):
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return factory
+
+class Sessions:
+    """Session factory stand-in that tracks how many sessions are open."""
+    def __init__(self, rows):
+        self.rows = rows  # Incident states returned by successive get() calls
+        self.open = 0
+        self.commits = 0
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        self.open += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.open -= 1
+        return False
+
+    async def get(self, model, key):
+        return self.rows.pop(0)
+
+    async def execute(self, stmt, execution_options=None):
+        result = MagicMock()
+        result.scalars.return_value.all.return_value = []
+        return result
+
+    async def commit(self):
+        self.commits += 1
+
+def make_incident(status="active"):
+    return Incident(id=5, status=status, severity="high", endpoint="GET /a",
+                    description="high_error_rate on GET /a", start_time=datetime.datetime(2026, 1, 1))
+
+@pytest.mark.asyncio
+class TestAnalysisQueue:
+
+    async def test_repeat_enqueues_collapse(self):
+        queue = AnalysisQueue()
+        queue.enqueue(1)
+        queue.enqueue(1)
+        queue.enqueue(2)
+        assert queue.queue.qsize() == 2
+
+    async def test_full_queue_drops_instead_of_blocking(self):
+        queue = AnalysisQueue()
+        for incident_id in range(QUEUE_SIZE + 5):
+            queue.enqueue(incident_id)
+        assert queue.queue.qsize() == QUEUE_SIZE
+        assert QUEUE_SIZE + 1 not in queue.pending  # Left for the sweep
+
+    async def test_run_stores_and_notifies(self):
+        queue = AnalysisQueue()
+        with patch("sentinelstack.ai.worker.redis_client") as redis, \
+             patch("sentinelstack.ai.worker.ai_service") as service, \
+             patch("sentinelstack.ai.worker.event_broadcaster") as broadcaster:
+            redis.set = AsyncMock(return_value=True)
+            redis.delete = AsyncMock()
+            service.analyze_incident = AsyncMock(return_value=True)
+            broadcaster.publish = AsyncMock()
+
+            await queue._run(7)
+
+            service.analyze_incident.assert_awaited_once_with(7)
+            broadcaster.publish.assert_awaited_once_with("analysis", {"incident_id": 7})
+            redis.delete.assert_awaited_once()
+
+    async def test_run_skips_incident_claimed_elsewhere(self):
+        queue = AnalysisQueue()
+        with patch("sentinelstack.ai.worker.redis_client") as redis, \
+             patch("sentinelstack.ai.worker.ai_service") as service:
+            redis.set = AsyncMock(return_value=None)  # NX failed
+            service.analyze_incident = AsyncMock()
+
+            await queue._run(7)
+
+            service.analyze_incident.assert_not_awaited()
+
+@pytest.mark.asyncio
+class TestAnalyzeIncident:
+
+    async def run(self, primary, replica):
+        service = AIService()
+        held_during_call = []
+
+        async def generate_insight(system_prompt, context):
+            held_during_call.append(primary.open + replica.open)
+            return {"explanation": "DB pool exhausted", "mitigation_steps": ["scale pool"]}
+
+        service.llm = MagicMock()
+        service.llm.generate_insight = generate_insight
+        with patch("sentinelstack.ai.service.AsyncSessionLocal", primary), \
+             patch("sentinelstack.ai.service.read_session", replica), \
+             patch("sentinelstack.ai.service.status_cache") as cache:
+            cache.invalidate = AsyncMock()
+            stored = await service.analyze_incident(5)
+        return stored, held_during_call
+
+    async def test_no_connection_is_held_during_the_llm_call(self):
+        fresh = make_incident()
+        primary, replica = Sessions([make_incident(), fresh]), Sessions([])
+
+        stored, held_during_call = await self.run(primary, replica)
+
+        assert stored is True
+        assert held_during_call == [0]
+        assert serialization.loads(fresh.ai_summary)["explanation"] == "DB pool exhausted"
+        assert serialization.loads(fresh.ai_action_items) == ["scale pool"]
+        assert primary.commits == 1
+
+    async def test_incident_resolved_during_the_call_is_not_written(self):
+        resolved = make_incident(status="resolved")
+        primary = Sessions([make_incident(), resolved])
+
+        stored, _ = await self.run(primary, Sessions([]))
+
+        assert stored is False
+        assert resolved.ai_summary is None
+        assert primary.commits == 0
+
+@pytest.mark.asyncio
+class TestSystemStatus:
+
+    async def test_status_serves_stored_analysis_without_llm(self):
+        incident = Incident(id=3, status="active", severity="high", endpoint="GET /a",
+                            description="high_error_rate on GET /a", start_time=datetime.datetime(2026, 1, 1),
+                            ai_summary=serialization.dumps_str({"explanation": "DB pool exhausted"}))
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = incident
+        service = AIService()
+        service.llm = MagicMock()
+        service.llm.generate_insight = AsyncMock()
+
+        with patch("sentinelstack.ai.service.AsyncSessionLocal", make_session_factory(result)):
+            status = await service._load_system_status()
+
+        assert status["analysis"] == {"explanation": "DB pool exhausted"}
+        assert status["analysis_status"] == "ready"
+        service.llm.generate_insight.assert_not_awaited()
+
+    async def test_status_reports_pending_analysis(self):
+        incident = Incident(id=4, status="active", severity="critical", endpoint="GET /b",
+                            description="critical_error_rate on GET /b", start_time=datetime.datetime(2026, 1, 1))
+        result = MagicMock()
+        result.scalar_one_or_none.return_value = incident
+
+        with patch("sentinelstack.ai.service.AsyncSessionLocal", make_session_factory(result)):
+            status = await AIService()._load_system_status()
+
+        assert status["health"] == "critical"
+        assert status["analysis"] is None
+        assert status["analysis_status"] == "pending"
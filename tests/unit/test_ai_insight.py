@@ -0,0 +1,116 @@
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi import FastAPI
+from sentinelstack.ai import service as ai_module
+from sentinelstack.ai.llm import LLMError, MockLLM
+from sentinelstack.ai.router import router
+from sentinelstack.ai.service import AIService
+from sentinelstack import serialization
+
+# ---------------------------------------------------------
+# Test Suite for /ai/insight (No Real DB / Redis)
+# ---------------------------------------------------------
+
+SUMMARY = {"window_minutes": 15, "total_requests": 9000, "error_rate_percent": 1.5,
+           "avg_latency_ms": 40.0, "p95_latency_ms": 180.0, "rpm": 600.0}
+
+def breakdown(sort, limit, **_):
+    return {"endpoints": [
+        {"method": "GET", "path": f"/{sort}/{i}", "requests": 1000, "errors": 50 - i, "rps": 1.1,
+         "error_rate_percent": 5.0 - i * 0.1, "p95_latency_ms": 900.0 - i}
+        for i in range(limit)
+    ]}
+
+@pytest.fixture
+def stats():
+    with patch.object(ai_module, "stats_service") as stats_service:
+        stats_service.get_dashboard_metrics = AsyncMock(return_value=SUMMARY)
+        stats_service.get_endpoint_breakdown = AsyncMock(side_effect=lambda minutes, **kw: breakdown(**kw))
+        yield stats_service
+
+@pytest.fixture
+def cache():
+    with patch.object(ai_module, "insight_cache") as insight_cache:
+        insight_cache.get = AsyncMock(return_value=None)
+        insight_cache.set = AsyncMock()
+        yield insight_cache
+
+@pytest.mark.asyncio
+class TestInsight:
+
+    async def test_context_is_ranked_and_compact(self, stats):
+        context = await AIService().build_traffic_context(15)
+
+        assert context["totals"]["total_requests"] == 9000
+        assert context["errors"][0] == {"endpoint": "GET /errors/0", "count": 50, "rate_pct": 5.0}
+        assert context["slowest"][0]["endpoint"] == "GET /p95/0"
+        assert len(context["errors"]) == ai_module.INSIGHT_TOP_K
+
+    async def test_error_counts_are_exact_not_rebuilt_from_rates(self, stats):
+        rare = {"method": "POST", "path": "/busy", "requests": 2_000_000, "errors": 7, "rps": 2222.2,
+                "error_rate_percent": 0.0, "p95_latency_ms": 30.0}  # 0.00035% rounds to 0
+        stats.get_endpoint_breakdown.side_effect = lambda minutes, **kw: {"endpoints": [rare]}
+
+        context = await AIService().build_traffic_context(15)
+
+        assert context["errors"] == [{"endpoint": "POST /busy", "count": 7, "rate_pct": 0.0}]
+
+    async def test_context_is_trimmed_to_budget(self, stats, monkeypatch):
+        monkeypatch.setattr(ai_module, "CONTEXT_TOKEN_BUDGET", 150)
+
+        context = await AIService().build_traffic_context(15)
+
+        assert len(serialization.dumps(context)) <= 150 * ai_module.CHARS_PER_TOKEN
+        assert context["errors"] and context["slowest"]  # Tails dropped, heads kept
+        assert context["errors"][0]["endpoint"] == "GET /errors/0"
+
+    async def test_streamed_answer_is_cached_once_complete(self, stats, cache):
+        service = AIService()
+        service.llm = MockLLM()
+
+        chunks = [chunk async for chunk in service.stream_insight(15)]
+
+        assert len(chunks) > 1
+        text = "".join(chunks)
+        assert serialization.loads(text)["severity"] in ("medium", "critical")
+        cache.set.assert_awaited_once()
+        assert cache.set.call_args[0][1] == text
+
+    async def test_endpoint_streams_then_serves_cache(self, stats, cache):
+        app = FastAPI()
+        app.include_router(router)
+        service = AIService()
+        service.llm = MockLLM()
+
+        with patch("sentinelstack.ai.router.ai_service", service):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                first = await client.get("/ai/insight?minutes=15")
+                cache.get.return_value = first.text
+                second = await client.get("/ai/insight?minutes=15")
+
+        assert first.status_code == 200
+        assert serialization.loads(first.text)["action_items"]
+        assert second.text == first.text
+        cache.set.assert_awaited_once()
+
+    async def test_provider_failure_is_503_without_provider_details(self, stats, cache, capsys):
+        app = FastAPI()
+        app.include_router(router)
+        service = AIService()
+
+        async def failing_stream(system_prompt, context):
+            raise LLMError("HTTP 401: invalid key sk-live-1234")
+            yield  # pragma: no cover
+
+        service.llm = MockLLM()
+        service.llm.stream_insight = failing_stream
+
+        with patch("sentinelstack.ai.router.ai_service", service):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.get("/ai/insight")
+
+        assert response.status_code == 503
+        assert response.json() == {"detail": "AI provider unavailable"}
+        assert "sk-live-1234" in capsys.readouterr().out  # Logged, not returned
+        cache.set.assert_not_awaited()
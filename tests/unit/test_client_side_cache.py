@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from sentinelstack.cache import ClientSideCache, INVALIDATE_CHANNEL
+
+# ---------------------------------------------------------
+# Test Suite for Redis Client-Side Caching (In-Memory Redis Stand-in)
+# ---------------------------------------------------------
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.reads = 0
+        self.delay = 0.0
+
+    async def get(self, key):
+        self.reads += 1
+        await asyncio.sleep(self.delay)
+        return self.data.get(key)
+
+    async def hget(self, key, field):
+        self.reads += 1
+        await asyncio.sleep(self.delay)
+        return self.data.get(key, {}).get(field)
+
+class FakeConnection:
+    """Replays scripted replies; records every command sent."""
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.sent = []
+
+    async def connect(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    async def send_command(self, *args):
+        self.sent.append(args)
+
+    async def read_response(self, timeout=None, disconnect_on_error=True):
+        if not self.replies:
+            await asyncio.sleep(3600)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+@pytest.fixture
+def fake_redis():
+    redis = FakeRedis()
+    with patch("sentinelstack.cache.redis_client", redis):
+        yield redis
+
+@pytest.fixture
+def tracked():
+    cache = ClientSideCache(prefixes=("cache:",), size=3)
+    cache.tracking = True
+    return cache
+
+def invalidation(*keys):
+    return ["message", INVALIDATE_CHANNEL, list(keys)]
+
+@pytest.mark.asyncio
+class TestClientSideCache:
+
+    async def test_repeat_reads_served_locally(self, fake_redis, tracked):
+        fake_redis.data["cache:a"] = "1"
+
+        assert await tracked.get("cache:a") == "1"
+        assert await tracked.get("cache:a") == "1"
+
+        assert fake_redis.reads == 1
+
+    async def test_missing_keys_are_cached_too(self, fake_redis, tracked):
+        assert await tracked.get("cache:none") is None
+        assert await tracked.get("cache:none") is None
+        assert fake_redis.reads == 1
+
+    async def test_invalidation_drops_key_and_hash_fields(self, fake_redis, tracked):
+        fake_redis.data["cache:a"] = "1"
+        fake_redis.data["cache:h"] = {"version": "v1"}
+        await tracked.get("cache:a")
+        await tracked.hget("cache:h", "version")
+
+        fake_redis.data["cache:a"] = "2"
+        fake_redis.data["cache:h"] = {"version": "v2"}
+        tracked._on_invalidate(invalidation("cache:a", "cache:h"))
+
+        assert await tracked.get("cache:a") == "2"
+        assert await tracked.hget("cache:h", "version") == "v2"
+
+    async def test_flush_message_clears_everything(self, fake_redis, tracked):
+        await tracked.get("cache:a")
+        tracked._on_invalidate(["message", INVALIDATE_CHANNEL, None])
+        assert not tracked.local
+
+    async def test_read_invalidated_in_flight_is_not_stored(self, fake_redis, tracked):
+        fake_redis.data["cache:a"] = "old"
+        fake_redis.delay = 0.05
+
+        async def write_during_read():
+            await asyncio.sleep(0.01)
+            fake_redis.data["cache:a"] = "new"
+            tracked._on_invalidate(invalidation("cache:a"))
+
+        await asyncio.gather(tracked.get("cache:a"), write_during_read())
+
+        assert ("cache:a", None) not in tracked.local
+        assert await tracked.get("cache:a") == "new"
+
+    async def test_untracked_or_disconnected_reads_go_to_redis(self, fake_redis, tracked):
+        await tracked.get("other:a")
+        await tracked.get("other:a")
+        tracked.tracking = False
+        await tracked.get("cache:a")
+        await tracked.get("cache:a")
+
+        assert fake_redis.reads == 4
+        assert not tracked.local
+
+    async def test_lru_bounded(self, fake_redis, tracked):
+        for key in ("cache:1", "cache:2", "cache:3", "cache:4"):
+            await tracked.get(key)
+
+        assert len(tracked.local) == 3
+        assert ("cache:1", None) not in tracked.local
+        assert "cache:1" not in tracked._fields
+
+    async def test_worker_enables_broadcast_tracking(self, fake_redis):
+        listener = FakeConnection([42, ["subscribe", INVALIDATE_CHANNEL, 1], invalidation("cache:a")])
+        tracker = FakeConnection(["OK"])
+        connections = iter([listener, tracker])
+
+        class Pool:
+            def make_connection(self):
+                return next(connections)
+
+        fake_redis.connection_pool = Pool()
+        cache = ClientSideCache(prefixes=("cache:", "rules:"))
+        cache.local[("cache:a", None)] = "stale"
+        cache._fields["cache:a"] = {None}
+
+        task = asyncio.create_task(cache.worker())
+        await asyncio.sleep(0.01)
+
+        assert cache.tracking is True
+        assert tracker.sent[0] == ("CLIENT", "TRACKING", "ON", "REDIRECT", 42, "BCAST",
+                                   "PREFIX", "cache:", "PREFIX", "rules:")
+        assert ("cache:a", None) not in cache.local
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert cache.tracking is False
@@ -0,0 +1,149 @@
+import asyncio
+import time
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from sentinelstack.gateway.concurrency import ConcurrencyLimiter, AUTHENTICATED, ANONYMOUS
+from sentinelstack.gateway.middleware import RequestContextMiddleware
+
+# ---------------------------------------------------------
+# Test Suite for the Adaptive Concurrency Limiter
+# ---------------------------------------------------------
+
+def limiter(**overrides):
+    options = dict(initial_limit=10, min_limit=2, max_limit=100, queue_timeout=0.05,
+                   anonymous_share=0.5, window=0)
+    options.update(overrides)
+    return ConcurrencyLimiter(**options)
+
+def feed(limiter, latency, requests):
+    """Run `requests` requests that each took `latency` seconds, at full concurrency."""
+    held = int(limiter.limit)
+    for _ in range(held):
+        limiter._admit()
+    for _ in range(requests):
+        limiter.release(time.monotonic() - latency, 200)
+        limiter._admit()
+    for _ in range(held):
+        limiter.release(time.monotonic(), 200, sample=False)
+
+@pytest.mark.asyncio
+class TestAdmission:
+
+    async def test_admits_up_to_the_limit(self):
+        lim = limiter(queue_timeout=0)
+        slots = [await lim.acquire(AUTHENTICATED) for _ in range(10)]
+        assert all(slot is not None for slot in slots)
+        assert await lim.acquire(AUTHENTICATED) is None
+
+        lim.release(slots.pop(), 200)
+        assert await lim.acquire(AUTHENTICATED) is not None
+
+    async def test_anonymous_gets_a_share_and_never_queues(self):
+        lim = limiter()
+        for _ in range(5):
+            assert await lim.acquire(ANONYMOUS) is not None
+        started = time.monotonic()
+        assert await lim.acquire(ANONYMOUS) is None
+        assert time.monotonic() - started < 0.01
+        # Authenticated traffic still has the headroom
+        assert await lim.acquire(AUTHENTICATED) is not None
+
+    async def test_queued_request_receives_freed_slot(self):
+        lim = limiter(queue_timeout=1.0)
+        slots = [await lim.acquire(AUTHENTICATED) for _ in range(10)]
+        waiting = asyncio.create_task(lim.acquire(AUTHENTICATED))
+        await asyncio.sleep(0)
+        assert len(lim.waiters) == 1
+
+        lim.release(slots.pop(), 200)
+        assert await waiting is not None
+        assert lim.inflight == 10
+
+    async def test_queue_timeout_sheds(self):
+        lim = limiter(queue_timeout=0.01)
+        for _ in range(10):
+            await lim.acquire(AUTHENTICATED)
+        assert await lim.acquire(AUTHENTICATED) is None
+        assert not lim.waiters and lim.inflight == 10
+
+    async def test_cancelled_waiter_returns_handed_slot(self):
+        lim = limiter(queue_timeout=1.0)
+        slots = [await lim.acquire(AUTHENTICATED) for _ in range(10)]
+        waiting = asyncio.create_task(lim.acquire(AUTHENTICATED))
+        await asyncio.sleep(0)
+
+        lim.release(slots.pop(), 200)  # Slot handed over...
+        waiting.cancel()               # ...but the client disconnected first
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert lim.inflight == 9
+
+class TestGradient:
+
+    def test_limit_grows_while_latency_holds(self):
+        lim = limiter()
+        feed(lim, 0.010, 200)
+        assert lim.limit > 18
+
+    def test_limit_shrinks_when_latency_climbs(self):
+        lim = limiter(initial_limit=50)
+        feed(lim, 0.010, 200)
+        grown = lim.limit
+        feed(lim, 0.100, 200)
+        assert lim.limit < grown / 2
+
+    def test_idle_traffic_does_not_raise_the_limit(self):
+        lim = limiter()
+        for _ in range(200):
+            lim.release(lim._admit() - 0.010, 200)
+        assert lim.limit == 10
+
+    def test_overload_status_backs_off(self):
+        lim = limiter(initial_limit=50)
+        lim.release(lim._admit(), 503)
+        assert lim.limit == 45
+
+    def test_limit_is_clamped(self):
+        lim = limiter(initial_limit=3)
+        for _ in range(50):
+            lim.release(lim._admit(), 504)
+        assert lim.limit == 2
+
+@pytest.mark.asyncio
+class TestMiddlewareShedding:
+
+    async def test_overloaded_gateway_sheds_with_retry_after(self):
+        lim = limiter(initial_limit=2, min_limit=2, queue_timeout=0)
+        release = asyncio.Event()
+
+        async def slow(request):
+            await release.wait()
+            return JSONResponse({"ok": True})
+
+        async def health(request):
+            return JSONResponse({"status": "ok"})
+
+        app = Starlette(routes=[Route("/slow", slow), Route("/health", health)])
+        app.add_middleware(RequestContextMiddleware)
+        with patch("sentinelstack.gateway.middleware.concurrency_limiter", lim), \
+             patch("sentinelstack.gateway.middleware.rate_limiter.check_request",
+                   AsyncMock(return_value=(True, {}))), \
+             patch("sentinelstack.gateway.middleware.log_service"):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                # Anonymous share of 2 is 1 slot
+                busy = asyncio.create_task(client.get("/slow"))
+                while lim.inflight < 1:
+                    await asyncio.sleep(0.001)
+
+                shed = await client.get("/slow")
+                assert shed.status_code == 503
+                assert shed.headers["retry-after"] == "1"
+                assert (await client.get("/health")).status_code == 200
+
+                release.set()
+                assert (await busy).status_code == 200
+        assert lim.inflight == 0
@@ -0,0 +1,77 @@
+import threading
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+from sentinelstack.database import PoolWaitTimer, instrument_engine, engine
+from sentinelstack.monitoring.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_WAIT_SECONDS,
+    DB_QUERY_DURATION_SECONDS
+)
+
+# ---------------------------------------------------------
+# Test Suite for Pool / Query Instrumentation (SQLite, No Postgres)
+# ---------------------------------------------------------
+
+class TimedQueuePool(PoolWaitTimer, QueuePool):
+    pass
+
+def sample(metric, name, labels):
+    for family in metric.collect():
+        for s in family.samples:
+            if s.name == name and all(s.labels.get(k) == v for k, v in labels.items()):
+                return s.value
+    return 0.0
+
+@pytest.fixture
+def sqlite_engine():
+    eng = create_engine("sqlite://", poolclass=TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=2)
+    instrument_engine(eng, "test")
+    yield eng
+    eng.dispose()
+
+class TestDbInstrumentation:
+
+    def test_named_queries_get_their_own_series(self, sqlite_engine):
+        before = sample(DB_QUERY_DURATION_SECONDS, "db_query_duration_seconds_count", {"query_name": "test.select_one"})
+
+        with sqlite_engine.connect() as conn:
+            conn.execute(text("SELECT 1"), execution_options={"query_name": "test.select_one"})
+            conn.execute(text("SELECT 2"))
+
+        assert sample(DB_QUERY_DURATION_SECONDS, "db_query_duration_seconds_count",
+                      {"query_name": "test.select_one"}) == before + 1
+
+    def test_failed_statements_are_timed_and_leave_nothing_behind(self, sqlite_engine):
+        labels = {"query_name": "test.broken"}
+        before = sample(DB_QUERY_DURATION_SECONDS, "db_query_duration_seconds_count", labels)
+
+        with sqlite_engine.connect() as conn:
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing"), execution_options=labels)
+            conn.execute(text("SELECT 1"), execution_options={"query_name": "test.after_error"})
+            assert "query_start" not in conn.info
+
+        assert sample(DB_QUERY_DURATION_SECONDS, "db_query_duration_seconds_count", labels) == before + 1
+        assert sample(DB_QUERY_DURATION_SECONDS, "db_query_duration_seconds_count",
+                      {"query_name": "test.after_error"}) >= 1
+
+    def test_checked_out_gauge_tracks_pool(self, sqlite_engine):
+        with sqlite_engine.connect():
+            assert sample(DB_POOL_CHECKED_OUT, "db_pool_checked_out", {"pool": "test"}) == 1
+        assert sample(DB_POOL_CHECKED_OUT, "db_pool_checked_out", {"pool": "test"}) == 0
+
+    def test_pool_wait_is_measured(self, sqlite_engine):
+        before = sample(DB_POOL_WAIT_SECONDS, "db_pool_wait_seconds_sum", {"pool": "test"})
+        held = sqlite_engine.connect()
+        threading.Timer(0.1, held.close).start()
+
+        with sqlite_engine.connect():  # Waits for the only connection
+            pass
+
+        assert sample(DB_POOL_WAIT_SECONDS, "db_pool_wait_seconds_sum", {"pool": "test"}) - before >= 0.09
+
+    def test_engine_uses_configured_pool_and_statement_cache(self):
+        assert isinstance(engine.pool, PoolWaitTimer)
+        assert "prepared_statement_cache_size" in engine.url.query
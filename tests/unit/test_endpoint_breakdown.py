@@ -0,0 +1,136 @@
+import base64
+import datetime
+import json
+import httpx
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from sqlalchemy import create_engine, insert
+from sentinelstack.aggregation.models import RequestMetric
+from sentinelstack.stats.router import router
+from sentinelstack.stats.service import StatsService, encode_cursor, decode_cursor
+
+# ---------------------------------------------------------
+# Test Suite for Endpoint Breakdown Paging (SQLite Stand-in)
+# ---------------------------------------------------------
+
+class SyncSession:
+    """read_session() stand-in running statements on a sync SQLite engine."""
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, execution_options=None):
+        with self.engine.connect() as conn:
+            return _Rows(conn.execute(stmt).all())
+
+class _Rows:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+@pytest.fixture
+def engine():
+    """Twelve endpoints; ten tie on 50 requests, so only method/path order them."""
+    eng = create_engine("sqlite://")
+    RequestMetric.__table__.create(eng)
+    bucket = datetime.datetime.utcnow() - datetime.timedelta(minutes=5)
+    counts = {f"/tie/{i:02d}": 50 for i in range(10)}
+    counts.update({"/busy": 90, "/quiet": 10})
+    rows = [
+        {"bucket_time": bucket, "method": method, "path": path, "status_code": 200,
+         "total_requests": total, "total_errors": 1, "avg_latency_ms": 5.0, "p95_latency_ms": 9.0}
+        for path, total in counts.items()
+        for method in (("GET", "POST") if path == "/tie/00" else ("GET",))
+    ]
+    with eng.begin() as conn:
+        conn.execute(insert(RequestMetric), rows)
+    yield eng
+    eng.dispose()
+
+@pytest.fixture
+def sessions(engine):
+    with patch("sentinelstack.stats.service.read_session", lambda: SyncSession(engine)):
+        yield
+
+def endpoints(page):
+    return [(row["method"], row["path"]) for row in page["endpoints"]]
+
+def cursor_for(values, sort="rps", minutes=60):
+    """Hand-built cursor, bypassing encode_cursor's shape."""
+    return base64.urlsafe_b64encode(json.dumps([sort, minutes, *values]).encode()).decode()
+
+class TestCursor:
+
+    def test_round_trip(self):
+        values = [12.5, "GET", "/api/ünïcode?x=1"]
+        assert decode_cursor(encode_cursor(values, "rps", 60), "rps", 60) == values
+
+    @pytest.mark.parametrize("cursor", [
+        "not base64!",
+        base64.urlsafe_b64encode(b"{not json").decode(),
+        base64.urlsafe_b64encode(b'{"value": 1.0}').decode(),
+        cursor_for([1.0, "GET"]),
+        cursor_for([{"x": 1}, "GET", "/a"]),
+        cursor_for([True, "GET", "/a"]),
+        cursor_for([1.0, None, "/a"]),
+    ])
+    def test_malformed_cursor_is_value_error(self, cursor):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, "rps", 60)
+
+    @pytest.mark.parametrize("sort, minutes", [("p95", 60), ("rps", 15)])
+    def test_cursor_from_another_sort_or_window_is_value_error(self, sort, minutes):
+        cursor = encode_cursor([12.5, "GET", "/a"], "rps", 60)
+        with pytest.raises(ValueError):
+            decode_cursor(cursor, sort, minutes)
+
+@pytest.mark.asyncio
+class TestPaging:
+
+    async def test_pages_are_stable_across_ties(self, sessions):
+        service = StatsService()
+        first = await service.get_endpoint_breakdown(60, "rps", 20)
+
+        seen, cursor = [], None
+        while True:
+            page = await service.get_endpoint_breakdown(60, "rps", 4, cursor)
+            seen += endpoints(page)
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        assert seen == endpoints(first)
+        assert len(seen) == len(set(seen)) == 13
+        assert seen[0] == ("GET", "/busy") and seen[-1] == ("GET", "/quiet")
+
+    async def test_malformed_cursor_is_400_not_500(self, sessions):
+        app = FastAPI()
+        app.include_router(router)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            garbage = await client.get("/stats/endpoints", params={"cursor": "%%%"})
+            wrong_shape = await client.get("/stats/endpoints", params={"cursor": cursor_for([[], "GET", "/a"])})
+
+        assert garbage.status_code == 400
+        assert wrong_shape.status_code == 400
+
+    async def test_cursor_reused_with_another_sort_is_400(self, sessions):
+        app = FastAPI()
+        app.include_router(router)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            first = await client.get("/stats/endpoints", params={"sort": "rps", "limit": 4})
+            cursor = first.json()["next_cursor"]
+            same = await client.get("/stats/endpoints", params={"sort": "rps", "limit": 4, "cursor": cursor})
+            resorted = await client.get("/stats/endpoints", params={"sort": "p95", "limit": 4, "cursor": cursor})
+            rewindowed = await client.get("/stats/endpoints", params={"sort": "rps", "minutes": 15, "limit": 4, "cursor": cursor})
+
+        assert same.status_code == 200
+        assert resorted.status_code == 400
+        assert rewindowed.status_code == 400
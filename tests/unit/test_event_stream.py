@@ -0,0 +1,113 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sentinelstack.stats.stream import EventBroadcaster, EVENTS_CHANNEL, SUBSCRIBER_QUEUE_SIZE
+
+# ---------------------------------------------------------
+# Test Suite for the Dashboard Event Broadcaster (No Real Redis)
+# ---------------------------------------------------------
+
+def message(event_type: str, **data) -> str:
+    return json.dumps({"type": event_type, "data": data})
+
+def payload(frame: str) -> dict:
+    return json.loads(frame.split("data: ", 1)[1])
+
+class FakePubSub:
+    """Delivers `messages` once, then stops the broadcaster."""
+    def __init__(self, broadcaster, messages):
+        self.broadcaster = broadcaster
+        self.messages = list(messages)
+        self.subscribe = AsyncMock()
+        self.aclose = AsyncMock()
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+        if not self.messages:
+            self.broadcaster.is_running = False
+            return None
+        return {"type": "message", "data": self.messages.pop(0)}
+
+@pytest.mark.asyncio
+class TestPublish:
+
+    async def test_event_is_published_once_to_redis(self):
+        redis = MagicMock()
+        redis.publish = AsyncMock()
+        with patch("sentinelstack.stats.stream.redis_client", redis):
+            await EventBroadcaster().publish("incident", {"id": 1})
+
+        channel, body = redis.publish.await_args.args
+        assert channel == EVENTS_CHANNEL
+        assert json.loads(body) == {"type": "incident", "data": {"id": 1}}
+
+    async def test_publish_failure_does_not_reach_the_producer(self):
+        redis = MagicMock()
+        redis.publish = AsyncMock(side_effect=ConnectionError("down"))
+        with patch("sentinelstack.stats.stream.redis_client", redis):
+            await EventBroadcaster().publish("incident", {"id": 1})
+
+@pytest.mark.asyncio
+class TestFanOut:
+
+    async def test_every_viewer_gets_the_same_frame(self):
+        broadcaster = EventBroadcaster()
+        viewers = [broadcaster.subscribe() for _ in range(3)]
+
+        broadcaster._fan_out(message("metrics", rps=5))
+
+        frames = [queue.get_nowait() for queue in viewers]
+        assert frames[0].startswith("event: metrics\n")
+        assert all(frame is frames[0] for frame in frames)
+        assert payload(frames[0])["data"] == {"rps": 5}
+
+    async def test_slow_viewer_drops_its_oldest_events(self):
+        broadcaster = EventBroadcaster()
+        slow, fast = broadcaster.subscribe(), broadcaster.subscribe()
+
+        for i in range(SUBSCRIBER_QUEUE_SIZE + 5):
+            broadcaster._fan_out(message("metrics", seq=i))
+            fast.get_nowait()
+
+        assert slow.qsize() == SUBSCRIBER_QUEUE_SIZE
+        assert payload(slow.get_nowait())["data"]["seq"] == 5
+        assert fast.empty()
+
+    async def test_worker_fans_out_redis_messages(self):
+        broadcaster = EventBroadcaster()
+        viewer = broadcaster.subscribe()
+        pubsub = FakePubSub(broadcaster, [message("incident", id=1), message("incident", id=2)])
+        redis = MagicMock()
+        redis.pubsub = MagicMock(return_value=pubsub)
+
+        with patch("sentinelstack.stats.stream.redis_client", redis):
+            await broadcaster.worker()
+
+        pubsub.subscribe.assert_awaited_once_with(EVENTS_CHANNEL)
+        pubsub.aclose.assert_awaited_once()
+        assert [payload(viewer.get_nowait())["data"]["id"] for _ in range(2)] == [1, 2]
+
+@pytest.mark.asyncio
+class TestViewerStream:
+
+    async def test_stream_delivers_events_then_unsubscribes_on_disconnect(self):
+        broadcaster = EventBroadcaster()
+        body = broadcaster.stream()
+
+        assert (await body.__anext__()).startswith("retry:")
+        assert len(broadcaster.subscribers) == 1
+
+        broadcaster._fan_out(message("metrics", rps=1))
+        assert payload(await body.__anext__())["data"] == {"rps": 1}
+
+        await body.aclose()  # Client went away
+        assert broadcaster.subscribers == set()
+
+    async def test_idle_stream_sends_heartbeats(self):
+        broadcaster = EventBroadcaster()
+        with patch("sentinelstack.stats.stream.HEARTBEAT_INTERVAL", 0.01):
+            body = broadcaster.stream()
+            await body.__anext__()
+            assert await asyncio.wait_for(body.__anext__(), 1.0) == ": ping\n\n"
+            await body.aclose()
+        assert broadcaster.subscribers == set()
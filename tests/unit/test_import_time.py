@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import pytest
+
+# ---------------------------------------------------------
+# Test Suite for Cold-Start Import Cost (Fresh Interpreter)
+# ---------------------------------------------------------
+
+# Seconds to import the ASGI app. Roughly 1.2x what a laptop needs today; CI
+# machines that are slower can raise it with SENTINEL_IMPORT_BUDGET.
+IMPORT_BUDGET = float(os.environ.get("SENTINEL_IMPORT_BUDGET", "1.6"))
+# Seconds spent in our own modules (third-party cost excluded). About 150ms
+# today, so a subsystem pulled in eagerly shows up here before the total moves.
+OWN_IMPORT_BUDGET = float(os.environ.get("SENTINEL_OWN_IMPORT_BUDGET", "0.25"))
+RUNS = 2  # Best of N, so one noisy run doesn't fail the suite
+
+# Only needed once a subsystem is actually used
+LAZY_MODULES = ("httpx", "h2")
+
+PROBE = """
+import sys
+import sentinelstack.gateway.main
+ai = sys.modules.get("sentinelstack.ai.service")  # Absent when ENABLE_AI is off
+print(",".join(m for m in {lazy!r} if m in sys.modules))
+print(ai is not None and ai.ai_service._llm is not None)
+"""
+
+def import_app(env=None):
+    """Returns (seconds, eagerly loaded lazy modules, llm built, importtime report)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE.format(lazy=LAZY_MODULES)],
+        capture_output=True, text=True, env={**os.environ, **(env or {})}, check=True
+    )
+    # -X importtime lines: "import time: self_us | cumulative_us | module"
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((int(self_us), int(cumulative_us), module.strip()))
+    total = next(c for _, c, m in rows if m == "sentinelstack.gateway.main")
+    loaded, llm_built = result.stdout.splitlines()
+    return total / 1e6, [m for m in loaded.split(",") if m], llm_built == "True", rows
+
+@pytest.fixture(scope="module")
+def default_runs():
+    return [import_app() for _ in range(RUNS)]
+
+class TestImportTime:
+
+    def test_app_import_within_budget(self, default_runs):
+        seconds, _, _, rows = min(default_runs, key=lambda run: run[0])
+        slowest = sorted(rows, reverse=True)[:10]
+        report = "\n".join(f"  {self_us / 1000:8.1f}ms  {module}" for self_us, _, module in slowest)
+        assert seconds <= IMPORT_BUDGET, f"Importing the app took {seconds:.2f}s (budget {IMPORT_BUDGET}s). Slowest modules:\n{report}"
+
+    def test_own_modules_within_budget(self, default_runs):
+        own = min(
+            sum(self_us for self_us, _, module in rows if module.startswith("sentinelstack")) / 1e6
+            for _, _, _, rows in default_runs
+        )
+        assert own <= OWN_IMPORT_BUDGET, f"sentinelstack modules took {own:.3f}s to import (budget {OWN_IMPORT_BUDGET}s)"
+
+    def test_optional_dependencies_stay_unloaded(self, default_runs):
+        _, loaded, llm_built, _ = default_runs[0]
+        assert loaded == []
+        assert llm_built is False  # The lifespan builds it
+
+    @pytest.mark.parametrize("flag, module", [
+        ("ENABLE_AI", "sentinelstack.ai.router"),
+        ("ENABLE_DASHBOARD", "sentinelstack.stats.router"),
+    ])
+    def test_disabled_subsystem_is_not_imported(self, flag, module):
+        _, _, _, rows = import_app({flag: "false"})
+        assert module not in {m for _, _, m in rows}
+
+    def test_disabled_subsystems_load_none_of_their_modules(self):
+        _, _, _, rows = import_app({"ENABLE_AI": "false", "ENABLE_DASHBOARD": "false"})
+        loaded = [m for _, _, m in rows if m.startswith(("sentinelstack.ai", "sentinelstack.stats"))]
+        assert loaded == []
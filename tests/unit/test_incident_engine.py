@@ -0,0 +1,173 @@
+import datetime
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sentinelstack.aggregation.buckets import EndpointAggregates
+from sentinelstack.incidents.models import Incident
+from sentinelstack.incidents.anomaly import AnomalyDetector, WARMUP_BUCKETS
+from sentinelstack.incidents.rules import RuleEngine
+from sentinelstack.incidents.service import IncidentService, QUIET_BUCKETS_TO_RESOLVE
+
+# ---------------------------------------------------------
+# Test Suite for Per-Endpoint Incident Detection (No Real DB)
+# ---------------------------------------------------------
+
+BUCKET = datetime.datetime(2026, 1, 1, 12, 0)
+
+def make_session(active_incidents):
+    session = MagicMock()
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = active_incidents
+    session.execute = AsyncMock(return_value=result)
+    session.commit = AsyncMock()
+    return session
+
+@pytest.mark.asyncio
+class TestIncidentEngine:
+
+    def setup_method(self):
+        self.patcher = patch("sentinelstack.incidents.service.event_broadcaster", AsyncMock())
+        self.broadcaster = self.patcher.start()
+        # Fresh, unpersisted baselines for every test
+        self.detector_patcher = patch("sentinelstack.incidents.service.anomaly_detector", AnomalyDetector())
+        self.detector = self.detector_patcher.start()
+        self.detector.load = AsyncMock()
+        self.detector.save = AsyncMock()
+        self.rules_patcher = patch("sentinelstack.incidents.service.rule_engine", RuleEngine())
+        self.rules = self.rules_patcher.start()
+        self.rules.refresh = AsyncMock()
+        self.queue_patcher = patch("sentinelstack.incidents.service.analysis_queue", MagicMock())
+        self.analysis_queue = self.queue_patcher.start()
+        self.cache_patcher = patch("sentinelstack.incidents.service.status_cache", AsyncMock())
+        self.status_cache = self.cache_patcher.start()
+        self.service = IncidentService()
+
+    def teardown_method(self):
+        self.patcher.stop()
+        self.detector_patcher.stop()
+        self.rules_patcher.stop()
+        self.queue_patcher.stop()
+        self.cache_patcher.stop()
+
+    async def test_low_traffic_failure_not_hidden_by_healthy_traffic(self):
+        aggregates = EndpointAggregates(BUCKET)
+        aggregates.append("GET", "/search", 10_000, 10, 20.0, 40.0)   # 0.1% errors
+        aggregates.append("POST", "/payments", 20, 8, 300.0, 900.0)   # 40% errors
+        session = make_session([])
+
+        await self.service.check_thresholds(session, aggregates)
+
+        opened = session.add_all.call_args[0][0]
+        assert [i.endpoint for i in opened] == ["POST /payments"]
+        assert opened[0].severity == "critical"
+        session.commit.assert_awaited_once()
+        # Analysis is queued for the background pool, not run inline
+        self.analysis_queue.enqueue.assert_called_once_with(opened[0].id)
+        self.status_cache.invalidate.assert_awaited_once_with("current")
+
+    async def test_endpoints_are_tracked_independently(self):
+        existing = Incident(id=1, status="active", severity="high", endpoint="GET /a",
+                            description="High Error Rate on GET /a", start_time=BUCKET)
+        aggregates = EndpointAggregates(BUCKET)
+        aggregates.append("GET", "/a", 100, 0, 10.0, 20.0)    # Recovered
+        aggregates.append("GET", "/b", 100, 50, 10.0, 20.0)   # New failure
+        session = make_session([existing])
+
+        await self.service.check_thresholds(session, aggregates)
+
+        assert existing.status == "resolved"
+        opened = session.add_all.call_args[0][0]
+        assert [i.endpoint for i in opened] == ["GET /b"]
+
+    async def test_no_change_means_no_write(self):
+        aggregates = EndpointAggregates(BUCKET)
+        aggregates.append("GET", "/quiet", 3, 3, 10.0, 20.0)  # Below volume floor
+        session = make_session([])
+
+        await self.service.check_thresholds(session, aggregates)
+
+        session.commit.assert_not_awaited()
+        self.broadcaster.publish.assert_not_awaited()
+        self.analysis_queue.enqueue.assert_not_called()
+
+    async def test_incident_on_endpoint_gone_quiet_resolves_after_quiet_buckets(self):
+        existing = Incident(id=1, status="active", severity="high", endpoint="POST /payments",
+                            description="High Error Rate on POST /payments", start_time=BUCKET)
+        session = make_session([existing])
+
+        for minute in range(QUIET_BUCKETS_TO_RESOLVE):
+            assert existing.status == "active"
+            aggregates = EndpointAggregates(BUCKET + datetime.timedelta(minutes=minute))
+            if minute % 2:
+                aggregates.append("POST", "/payments", 2, 0, 10.0, 20.0)  # Trickle below the floor
+            await self.service.check_thresholds(session, aggregates)
+
+        assert existing.status == "resolved"
+        assert "requests/min" in existing.description
+        assert self.service.quiet_buckets == {}
+
+    async def test_breach_resets_the_quiet_count(self):
+        existing = Incident(id=1, status="active", severity="high", endpoint="POST /payments",
+                            description="High Error Rate on POST /payments", start_time=BUCKET)
+        session = make_session([existing])
+
+        for _ in range(QUIET_BUCKETS_TO_RESOLVE - 1):
+            await self.service.check_thresholds(session, EndpointAggregates(BUCKET))
+        failing = EndpointAggregates(BUCKET)
+        failing.append("POST", "/payments", 20, 10, 10.0, 20.0)
+        await self.service.check_thresholds(session, failing)
+        await self.service.check_thresholds(session, EndpointAggregates(BUCKET))
+
+        assert existing.status == "active"
+        assert self.service.quiet_buckets == {"POST /payments": 1}
+
+    async def test_p95_ceiling_opens_incident(self):
+        aggregates = EndpointAggregates(BUCKET)
+        aggregates.append("GET", "/reports", 50, 0, 1500.0, 2500.0)
+        session = make_session([])
+
+        await self.service.check_thresholds(session, aggregates)
+
+        opened = session.add_all.call_args[0][0]
+        assert "high_latency" in opened[0].description
+
+# ---------------------------------------------------------
+# Test Suite for Streaming Baselines
+# ---------------------------------------------------------
+
+def bucket(requests, errors=0, p95=50.0, minute=0):
+    aggregates = EndpointAggregates(BUCKET + datetime.timedelta(minutes=minute))
+    if requests:
+        aggregates.append("GET", "/orders", requests, errors, p95 * 0.6, p95)
+    return aggregates
+
+def warm_detector():
+    detector = AnomalyDetector()
+    for minute in range(WARMUP_BUCKETS + 10):
+        # Realistic jitter so the variance isn't degenerate
+        detector.observe(bucket(100 + minute % 5, errors=minute % 2, p95=50.0 + minute % 3, minute=minute))
+    return detector
+
+def test_steady_traffic_raises_nothing():
+    detector = warm_detector()
+    assert detector.observe(bucket(102, errors=1, p95=51.0)) == []
+
+def test_latency_spike_detected():
+    detector = warm_detector()
+    signals = {a.signal for a in detector.observe(bucket(101, p95=400.0))}
+    assert signals == {"latency_spike"}
+
+def test_drop_to_zero_detected_for_missing_route():
+    detector = warm_detector()
+    anomalies = detector.observe(bucket(0))
+    assert [(a.endpoint, a.signal, a.severity) for a in anomalies] == [("GET /orders", "traffic_drop", "critical")]
+
+def test_snapshot_round_trip_preserves_baselines():
+    detector = warm_detector()
+    restored = AnomalyDetector()
+    restored.restore(detector.snapshot())
+
+    original = detector.baselines["GET /orders"]
+    copy = restored.baselines["GET /orders"]
+    assert copy.samples == original.samples
+    assert copy.latency.mean == pytest.approx(original.latency.mean)
+    assert copy.traffic.var == pytest.approx(original.traffic.var)
@@ -0,0 +1,113 @@
+import datetime
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sentinelstack.aggregation.buckets import EndpointAggregates
+from sentinelstack.incidents.rules import RuleEngine, RuleSyntaxError, compile_rule, compile_rules
+
+# ---------------------------------------------------------
+# Test Suite for the Incident Rule Language
+# ---------------------------------------------------------
+
+def bucket(minute=0):
+    aggregates = EndpointAggregates(datetime.datetime(2026, 1, 1, 12, minute))
+    aggregates.append("POST", "/payments", 100, 1, 400.0, 950.0)
+    aggregates.append("GET", "/payments", 100, 0, 50.0, 120.0)
+    aggregates.append("GET", "/api/users", 40, 10, 30.0, 60.0)
+    return aggregates
+
+def test_units_are_normalised():
+    assert compile_rule('p95() > 2s').test(2001) is True
+    assert compile_rule('p95() > 2s').test(1999) is False
+    assert compile_rule('error_rate() > 5%').test(0.06) is True
+
+def test_duration_maps_to_buckets():
+    assert compile_rule('p95(path="/payments") > 800ms for 3m').for_buckets == 3
+    assert compile_rule('p95(path="/payments") > 800ms for 90s').for_buckets == 2
+
+@pytest.mark.parametrize("source", [
+    'latency() > 5',                 # Unknown metric
+    'p95() > 5%',                    # Wrong unit
+    'p95(host="x") > 5ms',           # Unknown filter field
+    'p95() > 5ms severity urgent',   # Unknown severity
+    'p95(path=~"(") > 5ms',          # Bad regex
+])
+def test_syntax_errors_are_rejected(source):
+    with pytest.raises(RuleSyntaxError):
+        compile_rule(source)
+
+def test_comments_and_blank_lines_are_ignored():
+    rules = compile_rules("""
+        # Payments team
+        slow: p95(path="/payments") > 800ms  # checkout SLO
+
+        errors: error_rate(path=~"^/api/") > 10%
+    """)
+    assert [r.name for r in rules] == ["slow", "errors"]
+
+def test_filters_select_endpoints():
+    engine = RuleEngine()
+    engine.load_text(
+        'slow: p95(path="/payments", method="post") > 800ms\n'
+        'api: error_rate(path=~"^/api/") > 10%',
+        version="t"
+    )
+    matches = engine.evaluate(bucket())
+    assert sorted((m.rule.name, m.endpoint) for m in matches) == [
+        ("api", "GET /api/users"),
+        ("slow", "POST /payments"),
+    ]
+
+def test_for_clause_requires_consecutive_buckets():
+    engine = RuleEngine()
+    engine.load_text('slow: p95(path="/payments") > 800ms for 3m', version="t")
+
+    assert engine.evaluate(bucket(0)) == []
+    assert engine.evaluate(bucket(1)) == []
+    assert [m.endpoint for m in engine.evaluate(bucket(2))] == ["POST /payments"]
+
+def test_volume_floor_skips_quiet_endpoints_for_rate_metrics():
+    engine = RuleEngine()
+    engine.load_text('error_rate() > 10%\nerrors() > 5', version="t")
+    matches = engine.evaluate(bucket(), min_requests=50)
+    # error_rate on /api/users (40 req) is skipped; the raw error count still applies
+    assert [(m.rule.metric, m.endpoint) for m in matches] == [("errors", "GET /api/users")]
+
+@pytest.mark.asyncio
+class TestRefresh:
+
+    async def test_failed_publish_is_retried_next_bucket(self, tmp_path):
+        rules_file = tmp_path / "rules.txt"
+        rules_file.write_text('slow: p95(path="/payments") > 800ms\n', encoding="utf-8")
+        redis = MagicMock()
+        redis.hset = AsyncMock(side_effect=[ConnectionError("down"), None])
+        cache = MagicMock()
+        cache.hget = AsyncMock(return_value=None)
+
+        engine = RuleEngine()
+        with patch("sentinelstack.incidents.rules.settings.INCIDENT_RULES_FILE", str(rules_file)), \
+             patch("sentinelstack.incidents.rules.redis_client", redis), \
+             patch("sentinelstack.incidents.rules.client_cache", cache):
+            await engine.refresh()  # Redis down: nothing published
+            await engine.refresh()  # File unchanged, but still unpublished
+
+        assert redis.hset.await_count == 2
+        assert "slow: p95" in redis.hset.await_args.kwargs["mapping"]["text"]
+
+    async def test_rejected_file_is_not_recompiled_until_it_changes(self, tmp_path):
+        rules_file = tmp_path / "rules.txt"
+        rules_file.write_text("latency() > 5\n", encoding="utf-8")
+        redis = MagicMock()
+        redis.hset = AsyncMock()
+        cache = MagicMock()
+        cache.hget = AsyncMock(return_value=None)
+
+        engine = RuleEngine()
+        with patch("sentinelstack.incidents.rules.settings.INCIDENT_RULES_FILE", str(rules_file)), \
+             patch("sentinelstack.incidents.rules.redis_client", redis), \
+             patch("sentinelstack.incidents.rules.client_cache", cache), \
+             patch("sentinelstack.incidents.rules.compile_rules", wraps=compile_rules) as compiled:
+            await engine.refresh()
+            await engine.refresh()
+
+        assert compiled.call_count == 1
+        redis.hset.assert_not_awaited()
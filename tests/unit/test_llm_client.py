@@ -0,0 +1,136 @@
+import asyncio
+import json
+import httpx
+import pytest
+from sentinelstack.ai import llm
+from sentinelstack.ai.llm import OpenAI_LLM, LLMError, RetryBudget
+
+# ---------------------------------------------------------
+# Test Suite for the Pooled LLM Client (Local Stub Provider)
+# ---------------------------------------------------------
+
+class StubProvider:
+    """
+    In-process ASGI stand-in for the chat completions API.
+    `failures` is a list of status codes returned (in order) before succeeding.
+    """
+    def __init__(self, latency: float = 0.0, failures=None, headers=None):
+        self.latency = latency
+        self.failures = list(failures or [])
+        self.headers = headers or []
+        self.calls = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    async def __call__(self, scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        self.calls += 1
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.failures:
+                status, payload = self.failures.pop(0), b"{}"
+            else:
+                prompt = json.loads(body)["messages"][1]["content"]
+                content = json.dumps({"explanation": f"echo {len(prompt)}"})
+                status, payload = 200, json.dumps({"choices": [{"message": {"content": content}}]}).encode()
+        finally:
+            self.concurrent -= 1
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", b"application/json")] + self.headers})
+        await send({"type": "http.response.body", "body": payload})
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(llm, "RETRY_BASE_DELAY", 0.001)
+
+def make_client(provider: StubProvider) -> OpenAI_LLM:
+    return OpenAI_LLM("test-key", base_url="http://llm.test", transport=httpx.ASGITransport(app=provider))
+
+@pytest.mark.asyncio
+class TestPooledLLMClient:
+
+    async def test_reuses_one_client(self):
+        client = make_client(StubProvider())
+        await client.generate_insight("sys", {"q": 1})
+        pooled = client._client
+        await client.generate_insight("sys", {"q": 2})
+        assert client._client is pooled
+        await client.aclose()
+
+    async def test_identical_prompts_are_coalesced(self):
+        provider = StubProvider(latency=0.05)
+        client = make_client(provider)
+
+        results = await asyncio.gather(*[client.generate_insight("sys", {"q": 1}) for _ in range(10)])
+
+        assert provider.calls == 1
+        assert all(r == results[0] for r in results)
+        assert len(client._inflight) == 0
+
+    async def test_concurrency_is_capped(self):
+        provider = StubProvider(latency=0.02)
+        client = make_client(provider)
+
+        await asyncio.gather(*[client.generate_insight("sys", {"q": i}) for i in range(12)])
+
+        assert provider.calls == 12
+        assert provider.max_concurrent <= llm.MAX_CONCURRENCY
+
+    async def test_transient_failures_are_retried(self):
+        provider = StubProvider(failures=[503, 429], headers=[(b"retry-after", b"0")])
+        client = make_client(provider)
+
+        result = await client.generate_insight("sys", {"q": 1})
+
+        assert result["explanation"].startswith("echo")
+        assert provider.calls == 3
+
+    async def test_client_errors_are_not_retried(self):
+        provider = StubProvider(failures=[400])
+        client = make_client(provider)
+
+        with pytest.raises(LLMError):
+            await client.generate_insight("sys", {"q": 1})
+        assert provider.calls == 1
+
+    async def test_exhausted_budget_fails_fast(self):
+        provider = StubProvider(failures=[503] * 100)
+        client = make_client(provider)
+        client._budget = RetryBudget(minimum=0.0)
+
+        with pytest.raises(LLMError):
+            await client.generate_insight("sys", {"q": 1})
+        assert provider.calls == 1  # No token to spend on a retry
+
+    async def test_coalesced_callers_share_the_failure(self):
+        provider = StubProvider(latency=0.02, failures=[400])
+        client = make_client(provider)
+
+        results = await asyncio.gather(*[client.generate_insight("sys", {"q": 1}) for _ in range(3)],
+                                       return_exceptions=True)
+
+        assert provider.calls == 1
+        assert all(isinstance(r, LLMError) for r in results)
+
+    async def test_stream_yields_deltas(self):
+        async def sse_provider(scope, receive, send):
+            await receive()
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"text/event-stream")]})
+            for piece in ['{"summary":', ' "ok"}']:
+                delta = json.dumps({"choices": [{"delta": {"content": piece}}]})
+                await send({"type": "http.response.body", "body": f"data: {delta}\n\n".encode(), "more_body": True})
+            await send({"type": "http.response.body", "body": b"data: [DONE]\n\n"})
+
+        client = OpenAI_LLM("test-key", base_url="http://llm.test", transport=httpx.ASGITransport(app=sse_provider))
+
+        chunks = [chunk async for chunk in client.stream_insight("sys", {"q": 1})]
+
+        assert chunks == ['{"summary":', ' "ok"}']
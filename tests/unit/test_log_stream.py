@@ -0,0 +1,122 @@
+import datetime
+import uuid
+import pytest
+from unittest.mock import AsyncMock, patch
+from sentinelstack.logging import stream
+from sentinelstack.logging.stream import encode_record, decode_record, row_id, COPY_COLUMNS
+from sentinelstack.logging.ingest import LogIngestor
+from sentinelstack.logging.service import LogService
+
+# ---------------------------------------------------------
+# Test Suite for the Redis Stream Log Transport (No Real Redis/DB)
+# ---------------------------------------------------------
+
+def make_log(**overrides):
+    log = {
+        "request_id": "req-1",
+        "timestamp": datetime.datetime(2026, 5, 1, 12, 30, 15, 123456),
+        "client_ip": "10.0.0.1",
+        "user_id": None,
+        "method": "GET",
+        "path": "/health",
+        "status_code": 200,
+        "latency_ms": 3.25,
+        "error_flag": False
+    }
+    log.update(overrides)
+    return log
+
+class TestCodec:
+
+    def test_msgpack_round_trip(self):
+        fields = encode_record(make_log())
+        assert set(fields) == {b"m"}
+
+        row = decode_record(b"1714566615123-0", fields)
+
+        assert dict(zip(COPY_COLUMNS[1:], row[1:])) == make_log()
+
+    def test_json_fallback_round_trip(self):
+        with patch.object(stream, "msgpack", None):
+            fields = encode_record(make_log(user_id="u-7", error_flag=True))
+            assert set(fields) == {b"j"}
+            row = decode_record("1714566615123-3", fields)
+
+        assert dict(zip(COPY_COLUMNS[1:], row[1:])) == make_log(user_id="u-7", error_flag=True)
+
+    def test_row_id_is_deterministic_and_unique(self):
+        assert row_id(b"1714566615123-0") == row_id("1714566615123-0")
+        assert row_id("1714566615123-0") != row_id("1714566615123-1")
+        assert isinstance(row_id("1-0"), uuid.UUID)
+
+class FakeStream:
+    def __init__(self):
+        self.acked = []
+
+    async def xack(self, stream_name, group, *ids):
+        self.acked.extend(ids)
+        return len(ids)
+
+@pytest.mark.asyncio
+class TestIngest:
+
+    async def test_copies_batch_then_acks(self):
+        fake = FakeStream()
+        ingestor = LogIngestor("test")
+        entries = [(b"100-0", encode_record(make_log())), (b"100-1", encode_record(make_log(request_id="req-2")))]
+
+        with patch("sentinelstack.logging.ingest.stream_client", fake), \
+             patch.object(ingestor, "_copy", AsyncMock()) as copy:
+            await ingestor.ingest(entries)
+
+        (rows,) = copy.await_args.args
+        assert [row[1] for row in rows] == ["req-1", "req-2"]
+        assert fake.acked == [b"100-0", b"100-1"]
+
+    async def test_failed_copy_is_not_acked(self):
+        fake = FakeStream()
+        ingestor = LogIngestor("test")
+
+        with patch("sentinelstack.logging.ingest.stream_client", fake), \
+             patch.object(ingestor, "_copy", AsyncMock(side_effect=ConnectionError("db down"))):
+            with pytest.raises(ConnectionError):
+                await ingestor.ingest([(b"100-0", encode_record(make_log()))])
+
+        assert fake.acked == []
+
+    async def test_poison_and_trimmed_entries_are_acked_and_skipped(self):
+        fake = FakeStream()
+        ingestor = LogIngestor("test")
+        entries = [(b"100-0", {b"j": b"not json"}), (b"100-1", None), (b"100-2", encode_record(make_log()))]
+
+        with patch("sentinelstack.logging.ingest.stream_client", fake), \
+             patch.object(ingestor, "_copy", AsyncMock()) as copy:
+            await ingestor.ingest(entries)
+
+        assert len(copy.await_args.args[0]) == 1
+        assert fake.acked == [b"100-0", b"100-1", b"100-2"]
+
+@pytest.mark.asyncio
+class TestStreamTransport:
+
+    async def test_stream_mode_publishes_instead_of_inserting(self):
+        service = LogService()
+        with patch("sentinelstack.logging.service.settings.LOG_TRANSPORT", "stream"), \
+             patch("sentinelstack.logging.service.publish_batch", AsyncMock()) as publish, \
+             patch("sentinelstack.logging.service.AsyncSessionLocal") as session:
+            await service._flush_batch([make_log()])
+
+        publish.assert_awaited_once()
+        session.assert_not_called()
+
+    async def test_redis_failure_falls_back_to_db(self):
+        service = LogService()
+        db = AsyncMock()
+        with patch("sentinelstack.logging.service.settings.LOG_TRANSPORT", "stream"), \
+             patch("sentinelstack.logging.service.publish_batch", AsyncMock(side_effect=ConnectionError("redis down"))), \
+             patch("sentinelstack.logging.service.AsyncSessionLocal") as session:
+            session.return_value.__aenter__.return_value = db
+            await service._flush_batch([make_log()])
+
+        db.execute.assert_awaited_once()
+        db.commit.assert_awaited_once()
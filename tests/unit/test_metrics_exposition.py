@@ -0,0 +1,111 @@
+import asyncio
+import gzip
+import httpx
+import pytest
+from unittest.mock import patch
+from prometheus_client import CollectorRegistry, Counter
+from sentinelstack.monitoring.metrics import CardinalityGuard, METRICS_SERIES_DROPPED
+from sentinelstack.monitoring.exposition import MetricsExposition
+
+# ---------------------------------------------------------
+# Test Suite for /metrics Exposition + Cardinality Guard
+# ---------------------------------------------------------
+
+def dropped(metric):
+    for family in METRICS_SERIES_DROPPED.collect():
+        for s in family.samples:
+            if s.name == "metrics_series_dropped_total" and s.labels.get("metric") == metric:
+                return s.value
+    return 0.0
+
+@pytest.fixture
+def counter():
+    return Counter("guard_test_requests", "test", ["method", "path"], registry=CollectorRegistry())
+
+class TestCardinalityGuard:
+
+    def test_overflow_folds_into_other(self, counter):
+        guard = CardinalityGuard(limit=2)
+        before = dropped("guard_test_requests")
+
+        for path in ("/a", "/b", "/c", "/d"):
+            guard.labels(counter, method="GET", path=path).inc()
+
+        paths = {s.labels["path"]: s.value for s in counter.collect()[0].samples if s.name.endswith("_total")}
+        assert paths == {"/a": 1.0, "/b": 1.0, "__other__": 2.0}
+        assert dropped("guard_test_requests") == before + 2
+
+    def test_known_series_keep_recording_after_cap(self, counter):
+        guard = CardinalityGuard(limit=1)
+        guard.labels(counter, method="GET", path="/a").inc()
+        guard.labels(counter, method="GET", path="/b").inc()
+        guard.labels(counter, method="GET", path="/a").inc()
+
+        paths = {s.labels["path"]: s.value for s in counter.collect()[0].samples if s.name.endswith("_total")}
+        assert paths["/a"] == 2.0
+
+    def test_bounded_labels_are_kept(self, counter):
+        guard = CardinalityGuard(limit=0)
+        guard.labels(counter, method="POST", path="/x").inc()
+
+        (sample,) = [s for s in counter.collect()[0].samples if s.name.endswith("_total")]
+        assert sample.labels == {"method": "POST", "path": "__other__"}
+
+class CountingRender:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return b"# metrics %d\n" % self.calls
+
+@pytest.mark.asyncio
+class TestMetricsExposition:
+
+    async def test_cached_within_ttl(self):
+        render = CountingRender()
+        exposition = MetricsExposition(ttl=60)
+        with patch("sentinelstack.monitoring.exposition.render_metrics", render):
+            first = await exposition.get()
+            second = await exposition.get()
+        assert first == second == b"# metrics 1\n"
+        assert render.calls == 1
+
+    async def test_concurrent_scrapes_share_one_render(self):
+        render = CountingRender()
+        exposition = MetricsExposition(ttl=60)
+        with patch("sentinelstack.monitoring.exposition.render_metrics", render):
+            results = await asyncio.gather(*[exposition.get() for _ in range(5)])
+        assert render.calls == 1
+        assert len(set(results)) == 1
+
+    async def test_expired_cache_rerenders(self):
+        render = CountingRender()
+        exposition = MetricsExposition(ttl=0)
+        with patch("sentinelstack.monitoring.exposition.render_metrics", render):
+            await exposition.get()
+            assert await exposition.get() == b"# metrics 2\n"
+
+    async def test_gzip_variant(self):
+        exposition = MetricsExposition(ttl=60)
+        with patch("sentinelstack.monitoring.exposition.render_metrics", CountingRender()):
+            plain = await exposition.get()
+            assert gzip.decompress(await exposition.get(gzipped=True)) == plain
+
+    async def test_endpoint_serves_gzip_when_accepted(self):
+        from sentinelstack.gateway.main import app
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/metrics", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert b"http_requests_total" in response.content  # httpx decoded it
+
+    async def test_endpoint_honours_refused_gzip(self):
+        from sentinelstack.gateway.main import app
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/metrics", headers={"Accept-Encoding": "gzip;q=0, identity"})
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert b"http_requests_total" in response.content
@@ -0,0 +1,102 @@
+import os
+import subprocess
+import sys
+import pytest
+from unittest.mock import patch
+from sentinelstack.coordination import LeaderLease, RELEASE_SCRIPT
+
+# ---------------------------------------------------------
+# Test Suite for Multi-Worker Operation (No Real Redis)
+# ---------------------------------------------------------
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("redis down")
+
+    async def set(self, key, value, nx=False, ex=None):
+        self._check()
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def eval(self, script, numkeys, key, identity, *args):
+        self._check()
+        if self.data.get(key) != identity:
+            return 0
+        if script == RELEASE_SCRIPT:
+            del self.data[key]
+        return 1
+
+@pytest.fixture
+def fake_redis():
+    redis = FakeRedis()
+    with patch("sentinelstack.coordination.redis_client", redis):
+        yield redis
+
+@pytest.mark.asyncio
+class TestLeaderLease:
+
+    async def test_only_one_process_leads(self, fake_redis):
+        first, second = LeaderLease("job"), LeaderLease("job")
+
+        assert await first.try_acquire() is True
+        assert await second.try_acquire() is False
+        assert await first.try_acquire() is True  # Renewal
+        assert fake_redis.data["leader:job"] == first.identity
+
+    async def test_release_hands_over(self, fake_redis):
+        first, second = LeaderLease("job"), LeaderLease("job")
+        await first.try_acquire()
+
+        await first.release()
+
+        assert first.is_leader is False
+        assert await second.try_acquire() is True
+
+    async def test_expired_lease_is_lost_then_taken(self, fake_redis):
+        first, second = LeaderLease("job"), LeaderLease("job")
+        await first.try_acquire()
+
+        del fake_redis.data["leader:job"]  # TTL ran out (e.g. the leader stalled)
+        assert await second.try_acquire() is True
+        assert await first.try_acquire() is False
+
+    async def test_redis_outage_keeps_current_roles(self, fake_redis):
+        first, second = LeaderLease("job"), LeaderLease("job")
+        await first.try_acquire()
+        await second.try_acquire()
+
+        fake_redis.down = True
+        assert await first.try_acquire() is True
+        assert await second.try_acquire() is False
+
+# Each snippet runs in its own interpreter, like a gunicorn worker
+WORKER = """
+from sentinelstack.monitoring.metrics import HTTP_REQUESTS_TOTAL
+HTTP_REQUESTS_TOTAL.labels(method="GET", path="/health", status_code=200).inc({n})
+"""
+SCRAPE = """
+from sentinelstack.monitoring.exposition import render_metrics
+for line in render_metrics().decode().splitlines():
+    if line.startswith("http_requests_total{") and 'path="/health"' in line:
+        print(line.rsplit(" ", 1)[1])
+"""
+
+class TestMultiprocessMetrics:
+
+    def test_scrape_merges_every_worker(self, tmp_path):
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path / "metrics")}
+
+        def python(code):
+            return subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+
+        python(WORKER.format(n=3))
+        python(WORKER.format(n=4))
+
+        assert float(python(SCRAPE)) == 7.0
@@ -0,0 +1,71 @@
+import asyncio
+import time
+import bcrypt
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from fastapi import HTTPException
+from sentinelstack.auth.models import User
+from sentinelstack.auth.security import PasswordHasher, HasherSaturated, hash_rounds
+from sentinelstack.auth.service import AuthService
+from sentinelstack.config import settings
+
+# ---------------------------------------------------------
+# Test Suite for Off-Loop Password Hashing (No Real DB)
+# ---------------------------------------------------------
+
+@pytest.fixture(autouse=True)
+def cheap_rounds(monkeypatch):
+    # Minimum bcrypt cost keeps the suite fast
+    monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 4)
+
+def make_db(user):
+    db = MagicMock()
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = user
+    db.execute = AsyncMock(return_value=result)
+    db.commit = AsyncMock()
+    return db
+
+@pytest.mark.asyncio
+class TestPasswordHasher:
+
+    async def test_hash_and_verify_off_loop(self):
+        hasher = PasswordHasher(workers=1, max_pending=4)
+        hashed = await hasher.hash("s3cret")
+
+        assert hash_rounds(hashed) == 4
+        assert await hasher.verify("s3cret", hashed)
+        assert not await hasher.verify("wrong", hashed)
+        assert hasher.pending == 0
+
+    async def test_saturated_executor_sheds(self):
+        hasher = PasswordHasher(workers=1, max_pending=1)
+        slow = asyncio.create_task(hasher._run(time.sleep, 0.1))
+        await asyncio.sleep(0)
+
+        with pytest.raises(HasherSaturated):
+            await hasher.verify("s3cret", "$2b$04$invalid")
+        await slow
+
+    async def test_login_rehashes_when_cost_changes(self, monkeypatch):
+        old_hash = bcrypt.hashpw(b"s3cret", bcrypt.gensalt(rounds=4)).decode()
+        user = User(email="a@b.c", hashed_password=old_hash, role="user", is_active=True)
+        db = make_db(user)
+        monkeypatch.setattr(settings, "BCRYPT_ROUNDS", 5)
+
+        assert await AuthService(db).authenticate_user("a@b.c", "s3cret") is user
+
+        assert hash_rounds(user.hashed_password) == 5
+        assert bcrypt.checkpw(b"s3cret", user.hashed_password.encode())
+        db.commit.assert_awaited_once()
+
+    async def test_login_is_503_when_saturated(self, monkeypatch):
+        user = User(email="a@b.c", hashed_password="$2b$04$x", role="user", is_active=True)
+        busy = PasswordHasher(workers=1, max_pending=0)
+        monkeypatch.setattr("sentinelstack.auth.service.password_hasher", busy)
+
+        with pytest.raises(HTTPException) as exc:
+            await AuthService(make_db(user)).authenticate_user("a@b.c", "s3cret")
+
+        assert exc.value.status_code == 503
+        assert exc.value.headers["Retry-After"] == "1"
@@ -0,0 +1,134 @@
+import uuid
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import FastAPI, HTTPException
+from sentinelstack.auth.models import User
+from sentinelstack.auth.principals import PrincipalCache
+from sentinelstack.auth.schemas import UserUpdate
+from sentinelstack.auth.security import create_access_token
+from sentinelstack.auth.service import AuthService
+from sentinelstack.gateway.context import get_context
+from sentinelstack.gateway.middleware import RequestContextMiddleware
+
+# ---------------------------------------------------------
+# Test Suite for Gateway Account-State Enforcement (No Real DB / Redis)
+# ---------------------------------------------------------
+
+USER_ID = str(uuid.uuid4())
+
+@pytest.fixture
+def redis():
+    client = MagicMock()
+    client.get = AsyncMock(return_value=None)
+    client.set = AsyncMock(return_value=True)
+    client.delete = AsyncMock()
+    client.incr = AsyncMock(return_value=1)
+    client.expire = AsyncMock()
+    client.eval = AsyncMock(return_value=1)
+    client.publish = AsyncMock()
+    with patch("sentinelstack.cache.redis_client", client):
+        yield client
+
+@pytest.fixture
+def gateway():
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+
+    @app.get("/whoami")
+    async def whoami():
+        ctx = get_context()
+        return {"role": ctx.role, "tier": ctx.tier}
+
+    limiter = MagicMock()
+    limiter.check_request = AsyncMock(return_value=(True, {}))
+    with patch("sentinelstack.gateway.middleware.principal_cache") as principals, \
+         patch("sentinelstack.gateway.middleware.rate_limiter", limiter), \
+         patch("sentinelstack.gateway.middleware.log_service"):
+        yield app, principals
+
+async def call(app, token=None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.get("/whoami", headers=headers)
+
+@pytest.mark.asyncio
+class TestPrincipalCache:
+
+    async def test_repeat_lookups_hit_memory(self, redis):
+        principals = PrincipalCache()
+        principals._load = AsyncMock(return_value={"active": True, "role": "user", "tier": "free"})
+
+        for _ in range(5):
+            assert (await principals.get(USER_ID))["tier"] == "free"
+
+        principals._load.assert_awaited_once()
+
+    async def test_invalidate_forces_reload_everywhere(self, redis):
+        principals = PrincipalCache()
+        principals._load = AsyncMock(side_effect=[
+            {"active": True, "role": "user", "tier": "free"},
+            {"active": False, "role": "user", "tier": "free"}
+        ])
+        await principals.get(USER_ID)
+
+        await principals.invalidate(USER_ID)
+
+        assert (await principals.get(USER_ID))["active"] is False
+        redis.publish.assert_awaited_once_with("cache:invalidate:principal", USER_ID)
+
+    async def test_update_user_invalidates_principal(self):
+        user = User(id=uuid.UUID(USER_ID), email="a@b.c", hashed_password="x", role="user", tier="free", is_active=True)
+        db = MagicMock()
+        db.get = AsyncMock(return_value=user)
+        db.commit = AsyncMock()
+        db.refresh = AsyncMock()
+
+        with patch("sentinelstack.auth.service.principal_cache") as principals:
+            principals.invalidate = AsyncMock()
+            await AuthService(db).update_user(user.id, UserUpdate(is_active=False, tier="pro"))
+
+        assert user.is_active is False and user.tier == "pro"
+        principals.invalidate.assert_awaited_once_with(user.id)
+
+    async def test_update_user_rejects_unknown_tier(self):
+        with pytest.raises(HTTPException) as exc:
+            await AuthService(MagicMock()).update_user(uuid.UUID(USER_ID), UserUpdate(tier="platinum"))
+        assert exc.value.status_code == 400
+
+@pytest.mark.asyncio
+class TestGatewayEnforcement:
+
+    async def test_active_user_gets_cached_role_and_tier(self, gateway):
+        app, principals = gateway
+        principals.get = AsyncMock(return_value={"active": True, "role": "admin", "tier": "pro"})
+
+        response = await call(app, create_access_token(USER_ID, role="user"))
+
+        assert response.status_code == 200
+        assert response.json() == {"role": "admin", "tier": "pro"}  # Cache wins over token claims
+
+    async def test_disabled_user_is_rejected_despite_valid_token(self, gateway):
+        app, principals = gateway
+        principals.get = AsyncMock(return_value={"active": False, "role": "user", "tier": "free"})
+
+        response = await call(app, create_access_token(USER_ID, role="user"))
+
+        assert response.status_code == 403
+
+    async def test_deleted_user_is_rejected(self, gateway):
+        app, principals = gateway
+        principals.get = AsyncMock(return_value=None)
+
+        response = await call(app, create_access_token(USER_ID, role="user"))
+
+        assert response.status_code == 401
+
+    async def test_anonymous_requests_skip_lookup(self, gateway):
+        app, principals = gateway
+        principals.get = AsyncMock()
+
+        response = await call(app)
+
+        assert response.status_code == 200
+        principals.get.assert_not_awaited()
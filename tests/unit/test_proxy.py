@@ -0,0 +1,285 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch
+from starlette.applications import Starlette
+from sentinelstack.proxy.service import ProxyService
+from sentinelstack.proxy.upstream import UpstreamPool, UNHEALTHY_THRESHOLD
+from sentinelstack.proxy.http1 import Http1Pool, UpstreamConnectError, UpstreamTimeout
+
+# ---------------------------------------------------------
+# Test Suite for the Upstream Proxy (Local Stub Upstreams Only)
+# ---------------------------------------------------------
+
+class Body(httpx.AsyncByteStream):
+    """Unread body, like a real connection (bytes content would arrive pre-read)."""
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data
+
+class StubUpstream:
+    """Records what reached the upstream and answers like a small backend."""
+    def __init__(self):
+        self.requests = []
+        self.down = set()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host in self.down:
+            raise httpx.ConnectError("connection refused", request=request)
+        body = request.read()
+        self.requests.append((request.url.host, request, body))
+        if request.url.path == "/health":
+            return httpx.Response(200)
+        return httpx.Response(
+            201,
+            headers=[("set-cookie", "a=1"), ("set-cookie", "b=2"), ("connection", "close"), ("x-upstream", request.url.host)],
+            stream=Body(b"echo:" + body)
+        )
+
+@pytest.fixture
+def stub():
+    return StubUpstream()
+
+def make_client(stub, routes):
+    service = ProxyService(routes, transport=httpx.MockTransport(stub))
+    app = Starlette(routes=service.routes())
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://gateway")
+    return service, client
+
+class TestBalancing:
+
+    def test_least_outstanding_wins(self):
+        pool = UpstreamPool("/api", ["http://a", "http://b", "http://c"])
+        a, b, c = pool.upstreams
+        a.outstanding, b.outstanding, c.outstanding = 3, 1, 2
+        assert pool.choose() is b
+
+    def test_unhealthy_and_excluded_are_skipped(self):
+        pool = UpstreamPool("/api", ["http://a", "http://b"])
+        a, b = pool.upstreams
+        b.outstanding = 10
+        a.mark_down("test")
+        assert pool.choose() is b
+        assert pool.choose(exclude=[b]) is None
+
+    def test_ties_spread_across_idle_upstreams(self):
+        pool = UpstreamPool("/api", ["http://a", "http://b", "http://c"])
+        assert {pool.choose().url for _ in range(200)} == {"http://a", "http://b", "http://c"}
+
+@pytest.mark.asyncio
+class TestForwarding:
+
+    async def test_request_and_response_pass_through(self, stub):
+        _, client = make_client(stub, {"/api/orders": ["http://orders-1"]})
+        async with client:
+            response = await client.post(
+                "/api/orders/42/items?expand=1&q=a%2Fb",
+                content=b"payload",
+                headers={"X-Custom": "yes", "Connection": "keep-alive, X-Drop", "X-Drop": "hop"}
+            )
+
+        assert response.status_code == 201
+        assert response.content == b"echo:payload"
+        assert response.headers.get_list("set-cookie") == ["a=1", "b=2"]
+        assert "connection" not in response.headers
+
+        (host, request, _), = stub.requests
+        assert host == "orders-1"
+        assert request.url.raw_path == b"/api/orders/42/items?expand=1&q=a%2Fb"
+        assert request.headers["x-custom"] == "yes"
+        assert "x-drop" not in request.headers
+        assert request.headers["x-forwarded-host"] == "gateway"
+        assert request.headers["x-forwarded-for"] == "127.0.0.1"
+
+    async def test_longest_prefix_wins(self, stub):
+        _, client = make_client(stub, {"/api": ["http://general"], "/api/orders": ["http://orders"]})
+        async with client:
+            await client.get("/api/orders")
+            await client.get("/api/users/1")
+        assert [host for host, _, _ in stub.requests] == ["orders", "general"]
+
+    async def test_connect_error_retries_next_upstream(self, stub):
+        service, client = make_client(stub, {"/api": ["http://a", "http://b"]})
+        stub.down.add("a")
+        with patch("sentinelstack.proxy.upstream.random.random", return_value=0.5):  # Ties go to "a"
+            async with client:
+                for _ in range(3):
+                    assert (await client.get("/api/x")).status_code == 201
+
+        a, b = service.pools[0].upstreams
+        assert a.healthy is False
+        assert {host for host, _, _ in stub.requests} == {"b"}
+        assert a.outstanding == b.outstanding == 0
+
+    async def test_no_healthy_upstream_is_503(self, stub):
+        service, client = make_client(stub, {"/api": ["http://a"]})
+        service.pools[0].upstreams[0].mark_down("test")
+        async with client:
+            response = await client.get("/api/x")
+        assert response.status_code == 503
+
+    async def test_request_with_body_is_not_retried(self, stub):
+        _, client = make_client(stub, {"/api": ["http://a", "http://b"]})
+        stub.down.update({"a", "b"})
+        async with client:
+            response = await client.post("/api/x", content=b"once")
+        assert response.status_code == 502
+        assert stub.requests == []
+
+@pytest.mark.asyncio
+class TestHealthChecks:
+
+    async def test_repeated_failures_mark_down_then_recover(self, stub):
+        service, _ = make_client(stub, {"/api": ["http://a"]})
+        (upstream,) = service.pools[0].upstreams
+        stub.down.add("a")
+
+        for _ in range(UNHEALTHY_THRESHOLD - 1):
+            await service.check(upstream)
+        assert upstream.healthy is True
+
+        await service.check(upstream)
+        assert upstream.healthy is False
+
+        stub.down.clear()
+        await service.check(upstream)
+        assert upstream.healthy is True
+
+# ---------------------------------------------------------
+# Pooled HTTP/1.1 client against a local socket server
+# ---------------------------------------------------------
+
+class SocketUpstream:
+    """Tiny HTTP/1.1 server: echoes the request, optionally chunked or closing after each reply."""
+    def __init__(self, chunked=False, close_after_reply=False, silent=False):
+        self.chunked = chunked
+        self.close_after_reply = close_after_reply
+        self.silent = silent
+        self.connections = 0
+        self.received = []
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head[:-4].split(b"\r\n")
+                headers = dict(line.lower().split(b": ", 1) for line in lines[1:])
+                body = b""
+                if b"content-length" in headers:
+                    body = await reader.readexactly(int(headers[b"content-length"]))
+                elif headers.get(b"transfer-encoding") == b"chunked":
+                    while (size := int((await reader.readuntil(b"\r\n"))[:-2], 16)):
+                        body += (await reader.readexactly(size + 2))[:-2]
+                    await reader.readuntil(b"\r\n")
+                self.received.append((lines[0], headers, body))
+                if self.silent:
+                    await asyncio.sleep(10)
+                reply = b"echo:" + lines[0] + b":" + body
+                if self.chunked:
+                    writer.write(b"HTTP/1.1 200 OK\r\ntransfer-encoding: chunked\r\n\r\n")
+                    for piece in (reply[:5], reply[5:]):
+                        writer.write(b"%x\r\n%b\r\n" % (len(piece), piece))
+                    writer.write(b"0\r\n\r\n")
+                else:
+                    writer.write(b"HTTP/1.1 200 OK\r\ncontent-length: %d\r\n\r\n%b" % (len(reply), reply))
+                await writer.drain()
+                if self.close_after_reply:
+                    writer.close()
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+@pytest.fixture
+async def socket_upstream():
+    servers = []
+
+    async def start(**options):
+        upstream = SocketUpstream(**options)
+        server = await asyncio.start_server(upstream.handle, "127.0.0.1", 0)
+        servers.append(server)
+        return upstream, server.sockets[0].getsockname()[1]
+
+    yield start
+    for server in servers:
+        server.close()
+
+def http1_pool(port, read_timeout=5.0):
+    return Http1Pool(f"http://127.0.0.1:{port}", max_connections=4, keepalive_expiry=30.0,
+                     connect_timeout=1.0, pool_timeout=1.0, read_timeout=read_timeout)
+
+async def fetch(pool, method="GET", target=b"/x", headers=(), body=None):
+    response = await pool.send(method, target, list(headers), body)
+    data = b"".join([chunk async for chunk in response.aiter_raw()])
+    await response.aclose()
+    return response, data
+
+async def stream_of(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+@pytest.mark.asyncio
+class TestHttp1Pool:
+
+    async def test_connection_is_kept_alive(self, socket_upstream):
+        upstream, port = await socket_upstream()
+        pool = http1_pool(port)
+        for _ in range(3):
+            response, data = await fetch(pool)
+            assert response.status_code == 200
+            assert data == b"echo:GET /x HTTP/1.1:"
+        assert upstream.connections == 1
+        await pool.aclose()
+
+    async def test_chunked_response_is_decoded(self, socket_upstream):
+        upstream, port = await socket_upstream(chunked=True)
+        pool = http1_pool(port)
+        response, data = await fetch(pool, target=b"/y")
+        assert response.content_length is None
+        assert data == b"echo:GET /y HTTP/1.1:"
+        await fetch(pool)
+        assert upstream.connections == 1
+        await pool.aclose()
+
+    async def test_bodies_with_and_without_length(self, socket_upstream):
+        upstream, port = await socket_upstream()
+        pool = http1_pool(port)
+        await fetch(pool, "POST", headers=[(b"content-length", b"6")], body=stream_of(b"abc", b"def"))
+        await fetch(pool, "POST", body=stream_of(b"gh", b"", b"ij"))
+        assert [body for _, _, body in upstream.received] == [b"abcdef", b"ghij"]
+        assert upstream.received[1][1][b"transfer-encoding"] == b"chunked"
+        await pool.aclose()
+
+    async def test_stale_keepalive_connection_is_replaced(self, socket_upstream):
+        upstream, port = await socket_upstream(close_after_reply=True)
+        pool = http1_pool(port)
+        await fetch(pool)
+        await asyncio.sleep(0.05)  # Upstream has closed the idle connection
+        response, _ = await fetch(pool)
+        assert response.status_code == 200
+        assert upstream.connections == 2
+        await pool.aclose()
+
+    async def test_refused_connection(self):
+        pool = http1_pool(1)  # Nothing listens on port 1
+        with pytest.raises(UpstreamConnectError):
+            await pool.send("GET", b"/x", [])
+
+    async def test_read_timeout(self, socket_upstream):
+        _, port = await socket_upstream(silent=True)
+        pool = http1_pool(port, read_timeout=0.1)
+        with pytest.raises(UpstreamTimeout):
+            await pool.send("GET", b"/x", [])
+        await pool.aclose()
+
+    async def test_proxied_end_to_end(self, socket_upstream):
+        upstream, port = await socket_upstream(chunked=True)
+        service = ProxyService({"/api": [f"http://127.0.0.1:{port}"]})
+        app = Starlette(routes=service.routes())
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://gateway") as client:
+            response = await client.put("/api/items/1?x=%2F", content=b"data")
+        assert response.content == b"echo:PUT /api/items/1?x=%2F HTTP/1.1:data"
+        assert service.pools[0].upstreams[0].outstanding == 0
+        await service.close()
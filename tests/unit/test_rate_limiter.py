@@ -37,6 +37,7 @@ class TestRateLimitService:
         # 1. Setup Context (No User ID, just IP)
         ctx = MagicMock(spec=RequestCtx)
         ctx.user_id = None
+        ctx.api_key = None
         ctx.client_ip = "192.168.1.5"
 
         # 2. Mock Backend Response (Allowed)
@@ -64,6 +65,9 @@ class TestRateLimitService:
         # 1. Setup Context (Has User ID)
         ctx = MagicMock(spec=RequestCtx)
         ctx.user_id = "user_123"
+        ctx.api_key = None
+        ctx.role = "user"
+        ctx.tier = "free"
         ctx.client_ip = "192.168.1.5" # IP should be ignored for logic
 
         # 2. Mock Backend Response (Allowed)
@@ -87,6 +91,7 @@ class TestRateLimitService:
     async def test_handles_rejection_gracefully(self):
         ctx = MagicMock(spec=RequestCtx)
         ctx.user_id = None
+        ctx.api_key = None
         ctx.client_ip = "10.0.0.1"
 
         # 1. Mock Backend to say "Rejected, retry in 5s"
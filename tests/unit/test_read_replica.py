@@ -0,0 +1,107 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sentinelstack import database
+from sentinelstack.database import ReplicaLagMonitor, read_session
+from sentinelstack.monitoring.metrics import DB_READ_FALLBACKS
+
+# ---------------------------------------------------------
+# Test Suite for Read Replica Routing (No Real DB)
+# ---------------------------------------------------------
+
+def fallbacks(reason):
+    for family in DB_READ_FALLBACKS.collect():
+        for s in family.samples:
+            if s.name == "db_read_fallbacks_total" and s.labels.get("reason") == reason:
+                return s.value
+    return 0.0
+
+@pytest.fixture
+def replica():
+    """Two distinct session factories, as if DATABASE_READ_URL were set."""
+    primary = MagicMock(name="primary")
+    read = MagicMock(name="read")
+    monitor = ReplicaLagMonitor()
+    with patch.object(database, "AsyncSessionLocal", primary), \
+         patch.object(database, "ReadSessionLocal", read), \
+         patch.object(database, "replica_monitor", monitor):
+        yield primary, read, monitor
+
+@pytest.mark.asyncio
+class TestReadRouting:
+
+    async def test_no_replica_configured_uses_primary(self):
+        primary = MagicMock(name="primary")
+        with patch.object(database, "AsyncSessionLocal", primary), \
+             patch.object(database, "ReadSessionLocal", primary):
+            read_session()
+        primary.assert_called_once()
+
+    async def test_fresh_replica_serves_reads(self, replica):
+        primary, read, monitor = replica
+        monitor.lag = 0.5
+
+        read_session()
+
+        read.assert_called_once()
+        primary.assert_not_called()
+
+    async def test_lagging_replica_falls_back(self, replica):
+        primary, read, monitor = replica
+        monitor.lag = 30.0
+        before = fallbacks("lagging")
+
+        read_session()
+
+        primary.assert_called_once()
+        read.assert_not_called()
+        assert fallbacks("lagging") == before + 1
+
+    async def test_caller_can_demand_fresher_data(self, replica):
+        primary, read, monitor = replica
+        monitor.lag = 2.0
+
+        read_session(max_lag=1.0)
+
+        primary.assert_called_once()
+
+    async def test_unprobed_replica_falls_back(self, replica):
+        primary, read, monitor = replica
+        before = fallbacks("unavailable")
+
+        read_session()
+
+        primary.assert_called_once()
+        assert fallbacks("unavailable") == before + 1
+
+@pytest.mark.asyncio
+class TestReplicaLagMonitor:
+
+    def fake_engine(self, lag=None, error=None):
+        conn = AsyncMock()
+        if error:
+            conn.execute.side_effect = error
+        else:
+            result = MagicMock()
+            result.scalar.return_value = lag
+            conn.execute.return_value = result
+        engine = MagicMock()
+        engine.connect.return_value.__aenter__.return_value = conn
+        return engine
+
+    async def test_probe_records_lag(self):
+        monitor = ReplicaLagMonitor()
+        with patch.object(database, "read_engine", self.fake_engine(lag=3.25)):
+            await monitor.check()
+        assert monitor.lag == 3.25
+
+    async def test_failed_probe_marks_replica_unavailable(self):
+        monitor = ReplicaLagMonitor()
+        monitor.lag = 0.0
+        with patch.object(database, "read_engine", self.fake_engine(error=ConnectionError("down"))):
+            await monitor.check()
+        assert monitor.lag is None
+
+    async def test_worker_exits_without_replica(self):
+        monitor = ReplicaLagMonitor()
+        await monitor.worker()  # Would loop forever if it treated the primary as a replica
+        assert monitor.is_running is False
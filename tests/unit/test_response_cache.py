@@ -0,0 +1,264 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from sentinelstack.gateway.context import RequestCtx
+from sentinelstack.gateway.middleware import RequestContextMiddleware
+from sentinelstack.gateway.response_cache import (
+    ResponseCache, CachedResponse, VaryIndex, GET_OR_SET_INDEX, COMPARE_AND_SET_INDEX
+)
+
+# ---------------------------------------------------------
+# Test Suite for the Gateway Response Cache (No Real Redis)
+# ---------------------------------------------------------
+
+class Backend:
+    """Counts how often each endpoint really ran."""
+    def __init__(self):
+        self.calls = {}
+
+    def endpoint(self, headers=None):
+        async def handler(request: Request):
+            path = request.url.path
+            self.calls[path] = self.calls.get(path, 0) + 1
+            return JSONResponse({"path": path, "call": self.calls[path],
+                                 "lang": request.headers.get("accept-language")}, headers=headers)
+        return handler
+
+def make_app(backend):
+    return Starlette(routes=[
+        Route("/items", backend.endpoint()),
+        Route("/items", backend.endpoint(), methods=["POST"], name="create"),
+        Route("/nostore", backend.endpoint({"Cache-Control": "no-store"})),
+        Route("/cookie", backend.endpoint({"Set-Cookie": "session=1"})),
+        Route("/vary", backend.endpoint({"Vary": "Accept-Language"})),
+        Route("/vary", backend.endpoint(), methods=["POST"], name="update"),
+        Route("/swr", backend.endpoint({"Cache-Control": "max-age=0, stale-while-revalidate=30"})),
+        Route("/uncached", backend.endpoint()),
+    ], middleware=[])
+
+@pytest.fixture
+def backend():
+    return Backend()
+
+@pytest.fixture
+def cache():
+    return ResponseCache({"/items": "route", "/nostore": "route", "/cookie": "route",
+                          "/vary": "route", "/swr": "route"}, shared=False)
+
+@pytest.fixture
+def rate_limiter():
+    with patch("sentinelstack.gateway.middleware.rate_limiter.check_request",
+               AsyncMock(return_value=(True, {}))) as check:
+        yield check
+
+@pytest.fixture
+async def client(backend, cache, rate_limiter):
+    app = make_app(backend)
+    app.add_middleware(RequestContextMiddleware)
+    with patch("sentinelstack.gateway.middleware.response_cache", cache), \
+         patch("sentinelstack.gateway.middleware.log_service"):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            yield client
+
+@pytest.mark.asyncio
+class TestResponseCache:
+
+    async def test_second_request_is_a_hit(self, client, backend):
+        first = await client.get("/items")
+        second = await client.get("/items")
+
+        assert first.headers["x-cache"] == "MISS"
+        assert second.headers["x-cache"] == "HIT"
+        assert second.json() == first.json()
+        assert "age" in second.headers
+        assert second.headers["x-request-id"] != first.headers["x-request-id"]
+        assert backend.calls["/items"] == 1
+
+    async def test_hits_skip_rate_limiting(self, client, rate_limiter):
+        await client.get("/items")
+        await client.get("/items")
+        await client.get("/items")
+        assert rate_limiter.await_count == 1
+
+    async def test_query_is_part_of_the_key(self, client, backend):
+        await client.get("/items?page=1")
+        await client.get("/items?page=2")
+        assert backend.calls["/items"] == 2
+
+    async def test_uncacheable_responses_are_not_stored(self, client, backend):
+        for path in ("/nostore", "/cookie", "/uncached"):
+            await client.get(path)
+            await client.get(path)
+            assert backend.calls[path] == 2
+
+    async def test_request_no_cache_goes_to_app(self, client, backend):
+        await client.get("/items")
+        response = await client.get("/items", headers={"Cache-Control": "no-cache"})
+        assert response.headers["x-cache"] == "MISS"
+        assert backend.calls["/items"] == 2
+
+    async def test_vary_keeps_variants_apart(self, client, backend):
+        en = await client.get("/vary", headers={"Accept-Language": "en"})
+        de = await client.get("/vary", headers={"Accept-Language": "de"})
+        en_again = await client.get("/vary", headers={"Accept-Language": "en"})
+
+        assert de.json()["lang"] == "de"
+        assert en_again.headers["x-cache"] == "HIT"
+        assert en_again.json() == en.json()
+        assert backend.calls["/vary"] == 2
+
+    async def test_stale_while_revalidate(self, client, backend, cache):
+        await client.get("/swr")
+        stale = await client.get("/swr")
+        assert stale.headers["x-cache"] == "STALE"
+        assert stale.json()["call"] == 1
+
+        await asyncio.gather(*cache._tasks)  # Background refresh
+        assert backend.calls["/swr"] == 2
+        assert (await client.get("/swr")).json()["call"] == 2
+
+    async def test_unsafe_request_invalidates(self, client, backend):
+        await client.get("/items")
+        await client.post("/items")
+        response = await client.get("/items")
+        assert response.headers["x-cache"] == "MISS"
+        assert backend.calls["/items"] == 3
+
+    async def test_unsafe_request_invalidates_every_variant(self, client, backend):
+        await client.get("/vary", headers={"Accept-Language": "en"})
+        await client.get("/vary", headers={"Accept-Language": "de"})
+        await client.post("/vary")
+
+        en = await client.get("/vary", headers={"Accept-Language": "en"})
+        de = await client.get("/vary", headers={"Accept-Language": "de"})
+        assert en.headers["x-cache"] == "MISS"
+        assert de.headers["x-cache"] == "MISS"
+        assert backend.calls["/vary"] == 5
+
+    async def test_head_served_from_get_entry(self, client, backend):
+        body = (await client.get("/items")).content
+        head = await client.head("/items")
+        assert head.headers["x-cache"] == "HIT"
+        assert head.headers["content-length"] == str(len(body))
+        assert head.content == b""
+
+def ctx(**fields):
+    return RequestCtx(request_id="r", client_ip="10.0.0.1", path="/me", method="GET", **fields)
+
+def request(path="/me", query=b""):
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": query, "headers": []})
+
+class TestKeysAndStorage:
+
+    def test_user_scope_separates_callers(self):
+        cache = ResponseCache({"/me": "user"}, shared=False)
+        keys = {
+            cache.base_key(request(), ctx(user_id="u1")),
+            cache.base_key(request(), ctx(user_id="u2")),
+            cache.base_key(request(), ctx(api_key="sk_abc", user_id="u1")),
+            cache.base_key(request(), ctx()),
+        }
+        assert len(keys) == 4
+        assert cache.base_key(request("/other"), ctx()) is None
+
+    def test_route_scope_is_shared(self):
+        cache = ResponseCache({"/me": "route"}, shared=False)
+        assert cache.base_key(request(), ctx(user_id="u1")) == cache.base_key(request(), ctx(user_id="u2"))
+
+    def test_lru_is_bounded_by_bytes(self):
+        cache = ResponseCache({}, max_bytes=5000, shared=False)
+        for i in range(10):
+            cache._set_local(f"k{i}", CachedResponse(200, [], b"x" * 1000, 0, 1e12, 1e12))
+        assert cache.bytes <= 5000
+        assert "k9" in cache.local and "k0" not in cache.local
+
+    def test_entries_survive_redis_encoding(self):
+        entry = CachedResponse(200, [(b"content-type", b"application/json")], b"\x00\n{}", 1.0, 2.0, 3.0)
+        decoded = CachedResponse.unpack(entry.pack())
+        assert (decoded.status, decoded.headers, decoded.body, decoded.stale_until) == \
+            (200, entry.headers, entry.body, 3.0)
+        assert VaryIndex.unpack(VaryIndex(("accept-language",), 9.0).pack()).names == ("accept-language",)
+
+class FakeRedis:
+    """Shared Redis stand-in, including the index scripts."""
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def delete(self, key):
+        self.store.pop(key, None)
+
+    async def eval(self, script, numkeys, key, *args):
+        current = self.store.get(key)
+        if script == GET_OR_SET_INDEX:
+            if current is None:
+                self.store[key] = current = args[0]
+            return current
+        assert script == COMPARE_AND_SET_INDEX
+        if current != args[0]:
+            return 0
+        self.store[key] = args[1]
+        return 1
+
+def lang(value):
+    return Request({"type": "http", "method": "GET", "path": "/me", "query_string": b"",
+                    "headers": [(b"accept-language", value.encode())]})
+
+def page(body):
+    return CachedResponse(200, [], body, 0, 1e12, 1e12)
+
+@pytest.fixture
+def shared_redis():
+    redis = FakeRedis()
+    with patch("sentinelstack.gateway.response_cache.redis_binary_client", redis):
+        yield redis
+
+async def settle(*caches):
+    for cache in caches:
+        while cache._tasks:
+            await asyncio.gather(*cache._tasks)
+
+@pytest.mark.asyncio
+class TestSharedTier:
+
+    async def test_replicas_share_entries_through_redis(self, shared_redis):
+        first, second = ResponseCache({"/me": "route"}, shared=True), ResponseCache({"/me": "route"}, shared=True)
+        entry = CachedResponse(200, [], b"payload", 0, 1e12, 1e12)
+        first.store("route|/me", request(), (), entry)
+        await settle(first)
+
+        found, fresh = await second.lookup("route|/me", request())
+        assert found.body == b"payload" and fresh
+
+    async def test_replicas_share_one_vary_generation(self, shared_redis):
+        a, b, c = (ResponseCache({"/me": "route"}, shared=True) for _ in range(3))
+        a.store("route|/me", lang("en"), ("accept-language",), page(b"en"))
+        await settle(a)
+        b.store("route|/me", lang("de"), ("accept-language",), page(b"de"))  # B never saw the index
+        await settle(b)
+
+        assert (await c.lookup("route|/me", lang("en")))[0].body == b"en"
+        assert (await c.lookup("route|/me", lang("de")))[0].body == b"de"
+
+    async def test_invalidation_is_not_undone_by_a_replica_holding_the_old_index(self, shared_redis):
+        a, b, c = (ResponseCache({"/me": "route"}, shared=True) for _ in range(3))
+        a.store("route|/me", lang("en"), ("accept-language",), page(b"old en"))
+        await settle(a)
+        assert (await b.lookup("route|/me", lang("en")))[0].body == b"old en"  # B now holds the old index
+
+        await a.invalidate("route|/me")
+        b.store("route|/me", lang("de"), ("accept-language",), page(b"new de"))
+        await settle(b)
+
+        assert (await c.lookup("route|/me", lang("en")))[0] is None
+        assert (await c.lookup("route|/me", lang("de")))[0].body == b"new de"
@@ -0,0 +1,87 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from sentinelstack.gateway.compression import CompressionMiddleware, accepts_encoding, negotiate_encoding
+from sentinelstack.gateway.responses import conditional_json
+
+# ---------------------------------------------------------
+# Test Suite for Response Path (Compression + ETags)
+# ---------------------------------------------------------
+
+PAYLOAD = {"timeseries": [{"time": f"2026-01-01T00:{i % 60:02d}:00", "requests": i, "errors": 0} for i in range(500)]}
+
+async def big(request: Request):
+    return conditional_json(request, PAYLOAD, immutable=True)
+
+async def small(request: Request):
+    return PlainTextResponse("ok")
+
+async def events(request: Request):
+    async def gen():
+        yield "data: 1\n\n" * 200
+    return StreamingResponse(gen(), media_type="text/event-stream")
+
+app = Starlette(routes=[Route("/big", big), Route("/small", small), Route("/events", events)])
+app.add_middleware(CompressionMiddleware)
+
+@pytest.fixture
+async def client():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        yield ac
+
+def test_negotiation_prefers_brotli_and_respects_q():
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip, br;q=0") == "gzip"
+    assert negotiate_encoding("identity") is None
+
+def test_single_encoding_acceptance_respects_q():
+    assert accepts_encoding("gzip, deflate", "gzip")
+    assert accepts_encoding("*", "gzip")
+    assert not accepts_encoding("gzip;q=0", "gzip")
+    assert not accepts_encoding("*;q=0, br", "gzip")
+    assert not accepts_encoding("", "gzip")
+
+@pytest.mark.asyncio
+async def test_large_json_is_compressed(client):
+    response = await client.get("/big", headers={"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "br"
+    assert "Accept-Encoding" in response.headers["vary"]
+
+    raw = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert raw.headers["content-encoding"] == "gzip"
+    assert int(raw.headers["content-length"]) < len(str(PAYLOAD))
+
+@pytest.mark.asyncio
+async def test_small_and_sse_bodies_pass_through(client):
+    response = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    response = await client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+@pytest.mark.asyncio
+async def test_strong_etag_returns_304(client):
+    first = await client.get("/big")
+    etag = first.headers["etag"]
+    assert "immutable" in first.headers["cache-control"]
+
+    second = await client.get("/big", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+
+@pytest.mark.asyncio
+async def test_compressed_representations_get_their_own_etag(client):
+    identity = (await client.get("/big", headers={"Accept-Encoding": "identity"})).headers["etag"]
+    br = (await client.get("/big", headers={"Accept-Encoding": "br"})).headers["etag"]
+    gzip = (await client.get("/big", headers={"Accept-Encoding": "gzip"})).headers["etag"]
+
+    assert br == identity[:-1] + '-br"'
+    assert gzip == identity[:-1] + '-gzip"'
+
+    for tag, coding in ((br, "br"), (gzip, "gzip"), (identity, "identity")):
+        revalidated = await client.get("/big", headers={"Accept-Encoding": coding, "If-None-Match": tag})
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == tag
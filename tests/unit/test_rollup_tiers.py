@@ -0,0 +1,50 @@
+import datetime
+import pytest
+from sqlalchemy import create_engine, func, insert, select, union_all
+from sentinelstack.aggregation.models import MetricRollup
+from sentinelstack.aggregation.service import missing_hour_rollups
+from sentinelstack.stats.service import rollup_tiers
+
+# ---------------------------------------------------------
+# Test Suite for the Rollup Tiers (SQLite Stand-in)
+# ---------------------------------------------------------
+
+T0 = datetime.datetime(2024, 1, 1, 8, 30)
+
+@pytest.fixture
+def engine():
+    """1m rows from 08:30 to 11:04, one request each. Only 10:00 was rolled up:
+    the 09:00 roll-up was missed."""
+    eng = create_engine("sqlite://")
+    MetricRollup.__table__.create(eng)
+    rows = [
+        {"resolution": "1m", "bucket_time": T0 + datetime.timedelta(minutes=i),
+         "total_requests": 1, "total_errors": 0, "avg_latency_ms": 10.0, "p95_latency_ms": 20.0}
+        for i in range(155)
+    ]
+    rows.append({"resolution": "1h", "bucket_time": datetime.datetime(2024, 1, 1, 10),
+                 "total_requests": 60, "total_errors": 0, "avg_latency_ms": 10.0, "p95_latency_ms": 20.0})
+    with eng.begin() as conn:
+        conn.execute(insert(MetricRollup), rows)
+    yield eng
+    eng.dispose()
+
+class TestHourlyGaps:
+
+    def test_summary_counts_an_hour_missing_its_rollup(self, engine):
+        hourly, minutely = rollup_tiers(T0, datetime.datetime(2024, 1, 1, 9))
+        tiers = union_all(hourly, minutely).subquery()
+        with engine.connect() as conn:
+            total = conn.execute(select(func.sum(tiers.c.requests))).scalar()
+            minute_rows = conn.execute(select(func.count()).select_from(minutely.subquery())).scalar()
+
+        # Every minute counted once: 10:00-10:59 through its '1h' row, 09:xx from its minutes
+        assert total == 155
+        assert minute_rows == 155 - 60
+
+    def test_backfill_fills_every_closed_hour_without_a_rollup(self, engine):
+        with engine.connect() as conn:
+            rows = conn.execute(missing_hour_rollups(datetime.datetime(2024, 1, 1, 11))).all()
+
+        filled = {row[1]: row[2] for row in rows}
+        assert filled == {datetime.datetime(2024, 1, 1, 8): 30, datetime.datetime(2024, 1, 1, 9): 60}
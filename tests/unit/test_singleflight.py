@@ -0,0 +1,133 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from sentinelstack.singleflight import SingleFlight
+from sentinelstack.monitoring.metrics import SINGLEFLIGHT_CALLS
+from sentinelstack.stats.service import StatsService
+
+# ---------------------------------------------------------
+# Test Suite for Request Coalescing (Singleflight)
+# ---------------------------------------------------------
+
+class Work:
+    def __init__(self, delay: float = 0.02, error: Exception = None):
+        self.calls = 0
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self, value="result"):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {"value": value, "call": self.calls}
+
+def count(flight: str, role: str) -> float:
+    return SINGLEFLIGHT_CALLS.labels(flight=flight, role=role)._value.get()
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+
+    async def test_concurrent_identical_calls_share_one_execution(self):
+        flights, work = SingleFlight("test-share"), Work()
+        results = await asyncio.gather(*[flights.do("k", work) for _ in range(10)])
+
+        assert work.calls == 1
+        assert all(r is results[0] for r in results)
+        assert len(flights) == 0
+        assert count("test-share", "leader") == 1
+        assert count("test-share", "coalesced") == 9
+
+    async def test_distinct_keys_run_separately(self):
+        flights, work = SingleFlight("test-keys"), Work()
+        await asyncio.gather(flights.do("a", work), flights.do("b", work))
+        assert work.calls == 2
+
+    async def test_settled_calls_are_not_cached(self):
+        flights, work = SingleFlight("test-settled"), Work(delay=0)
+        await flights.do("k", work)
+        await flights.do("k", work)
+        assert work.calls == 2
+
+    async def test_errors_reach_every_waiter(self):
+        flights, work = SingleFlight("test-errors"), Work(error=ValueError("boom"))
+        results = await asyncio.gather(*[flights.do("k", work) for _ in range(3)], return_exceptions=True)
+
+        assert work.calls == 1
+        assert all(isinstance(r, ValueError) for r in results)
+        assert "k" not in flights
+
+    async def test_timeout_fails_all_waiters_and_frees_the_key(self):
+        flights, work = SingleFlight("test-timeout", timeout=0.01), Work(delay=1.0)
+        results = await asyncio.gather(*[flights.do("k", work) for _ in range(3)], return_exceptions=True)
+
+        assert all(isinstance(r, asyncio.TimeoutError) for r in results)
+        assert len(flights) == 0
+
+    async def test_cancelled_caller_does_not_cancel_the_others(self):
+        flights, work = SingleFlight("test-cancel"), Work(delay=0.05)
+        leader = asyncio.create_task(flights.do("k", work))
+        follower = asyncio.create_task(flights.do("k", work))
+        await asyncio.sleep(0.01)
+
+        leader.cancel()
+        assert (await follower)["value"] == "result"
+        assert work.calls == 1
+
+    async def test_decorator_keys_on_bound_arguments(self):
+        flights, work = SingleFlight("test-decorator"), Work()
+
+        @flights.coalesced()
+        async def fetch(value="result"):
+            return await work(value)
+
+        results = await asyncio.gather(fetch(), fetch("result"), fetch(value="result"), fetch("other"))
+        assert work.calls == 2
+        assert results[0] is results[1] is results[2]
+
+    async def test_decorator_custom_key(self):
+        flights, work = SingleFlight("test-custom"), Work()
+
+        @flights.coalesced(key=lambda value: value.lower())
+        async def fetch(value):
+            return await work(value)
+
+        await asyncio.gather(fetch("A"), fetch("a"))
+        assert work.calls == 1
+
+class FakeResult:
+    def all(self):
+        return []
+
+class FakeSession:
+    def __init__(self, counter):
+        self.counter = counter
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, stmt, execution_options=None):
+        self.counter.append(execution_options["query_name"])
+        await asyncio.sleep(0.02)
+        return FakeResult()
+
+@pytest.mark.asyncio
+class TestStatsCoalescing:
+
+    async def test_dashboard_burst_runs_one_query(self):
+        queries = []
+        with patch("sentinelstack.stats.service.read_session", lambda: FakeSession(queries)):
+            service = StatsService()
+            results = await asyncio.gather(
+                *[service.get_timeseries(30) for _ in range(20)],
+                *[service.get_endpoint_breakdown(60, "rps") for _ in range(5)],
+                service.get_endpoint_breakdown(minutes=60, sort="rps"),
+                service.get_timeseries(60)
+            )
+
+        assert queries.count("stats.timeseries") == 2
+        assert queries.count("stats.endpoints") == 1
+        assert results[0] == {"timeseries": []}
@@ -0,0 +1,150 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+from sentinelstack.cache import TwoTierCache
+from sentinelstack import serialization
+
+# ---------------------------------------------------------
+# Test Suite for the Two-Tier Cache (In-Memory Redis Stand-in)
+# ---------------------------------------------------------
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.published = []
+        self.gets = 0
+
+    async def get(self, key):
+        self.gets += 1
+        return self.data.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1)
+        return int(self.data[key])
+
+    async def expire(self, key, seconds):
+        return True
+
+    async def eval(self, script, numkeys, key, version_key, version, value, ex):
+        # CONDITIONAL_SET
+        if self.data.get(version_key, "0") != version:
+            return 0
+        self.data[key] = value
+        return 1
+
+    async def publish(self, channel, message):
+        self.published.append((channel, message))
+
+class CountingLoader:
+    def __init__(self, delay: float = 0.0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"version": self.calls}
+
+@pytest.fixture
+def fake_redis():
+    redis = FakeRedis()
+    with patch("sentinelstack.cache.redis_client", redis):
+        yield redis
+
+@pytest.mark.asyncio
+class TestTwoTierCache:
+
+    async def test_local_hit_skips_redis_and_loader(self, fake_redis):
+        cache = TwoTierCache("t", ttl=60, stale_ttl=60, beta=0.0)
+        loader = CountingLoader()
+        await cache.get_or_load("k", loader)
+        gets = fake_redis.gets
+
+        assert await cache.get_or_load("k", loader) == {"version": 1}
+        assert loader.calls == 1
+        assert fake_redis.gets == gets
+
+    async def test_concurrent_misses_load_once(self, fake_redis):
+        cache = TwoTierCache("t", ttl=60, stale_ttl=60, beta=0.0)
+        loader = CountingLoader(delay=0.02)
+
+        results = await asyncio.gather(*[cache.get_or_load("k", loader) for _ in range(20)])
+
+        assert loader.calls == 1
+        assert all(r == {"version": 1} for r in results)
+
+    async def test_stale_value_served_while_one_refresh_runs(self, fake_redis):
+        cache = TwoTierCache("t", ttl=60, stale_ttl=60, beta=0.0)
+        cache.local["k"] = ({"version": 0}, time.time() - 1, 0.01)  # Just expired
+        loader = CountingLoader(delay=0.02)
+
+        results = await asyncio.gather(*[cache.get_or_load("k", loader) for _ in range(5)])
+        await asyncio.gather(*cache._tasks)
+
+        assert all(r == {"version": 0} for r in results)
+        assert loader.calls == 1
+        assert cache.local["k"][0] == {"version": 1}
+
+    async def test_early_refresh_near_expiry(self, fake_redis):
+        cache = TwoTierCache("t", ttl=60, stale_ttl=60, beta=1.0)
+        # Rebuilding takes far longer than the time left: XFetch always fires
+        cache.local["k"] = ({"version": 0}, time.time() + 0.001, 1000.0)
+        loader = CountingLoader()
+
+        assert await cache.get_or_load("k", loader) == {"version": 0}
+        await asyncio.gather(*cache._tasks)
+
+        assert loader.calls == 1
+
+    async def test_miss_waits_for_peer_rebuild(self, fake_redis):
+        cache = TwoTierCache("t", ttl=60, stale_ttl=60, beta=0.0)
+        fake_redis.data["cache:t:k:lock"] = "1"  # Another replica is rebuilding
+        loader = CountingLoader()
+
+        async def peer_finishes():
+            await asyncio.sleep(0.06)
+            fake_redis.data["cache:t:k"] = serialization.dumps_str([{"version": "peer"}, time.time() + 60, 0.01])
+
+        result, _ = await asyncio.gather(cache.get_or_load("k", loader), peer_finishes())
+
+        assert result == {"version": "peer"}
+        assert loader.calls == 0
+
+    async def test_invalidate_drops_all_tiers_and_broadcasts(self, fake_redis):
+        cache = TwoTierCache("t", ttl=60, stale_ttl=60, beta=0.0)
+        loader = CountingLoader()
+        await cache.get_or_load("k", loader)
+
+        await cache.invalidate("k")
+
+        assert "k" not in cache.local
+        assert "cache:t:k" not in fake_redis.data
+        assert fake_redis.published == [("cache:invalidate:t", "k")]
+        assert await cache.get_or_load("k", loader) == {"version": 2}
+
+    async def test_load_racing_another_replicas_invalidation_is_not_stored(self, fake_redis):
+        loading, writer = TwoTierCache("t", ttl=60, stale_ttl=0, beta=0.0), TwoTierCache("t", ttl=60, stale_ttl=0, beta=0.0)
+        read_old_state = asyncio.Event()
+
+        async def slow_loader():
+            read_old_state.set()
+            await asyncio.sleep(0.02)  # The update commits meanwhile
+            return {"role": "admin"}
+
+        load = asyncio.create_task(loading.get_or_load("k", slow_loader))
+        await read_old_state.wait()
+        await writer.invalidate("k")  # Published; the loading replica hasn't seen it yet
+        assert await load == {"role": "admin"}
+
+        assert "cache:t:k" not in fake_redis.data
+        assert await writer.get_or_load("k", CountingLoader()) == {"version": 1}